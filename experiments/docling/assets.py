@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+assets.py — Move base64-embedded images out of converted HTML.
+
+Docling runs with --image-export-mode embedded, so every picture, and every
+repeat of a logo or watermark, is inlined as a data: URI: a third larger
+than the image, once per occurrence, and large enough that evaluate.py's
+MAX_HTML_CHARS truncation cuts the document text. This rewrites each
+
+  src="data:image/png;base64,iVBORw0..."
+
+to src="assets/<sha256 prefix>.png", writing the decoded image there once.
+Files are named by content, so an image repeated on every page, or in
+every document sharing the assets directory, is stored a single time.
+
+The HTML is streamed in CHUNK_CHARS pieces and each payload is decoded as
+it is read, so neither a document nor an image is ever held whole. Only
+base64 image URIs starting an attribute value or url( ) are rewritten;
+anything else is copied through unchanged.
+
+Usage:
+  python3 assets.py [--assets-dir DIR] [--output-dir DIR] [--report FILE] <file.html> ...
+
+  Files are rewritten in place unless --output-dir is given. The assets
+  directory defaults to assets/ next to the rewritten HTML.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TextIO
+
+CHUNK_CHARS = 1 << 16  # characters read from the HTML at a time
+HASH_CHARS = 16        # hex digits of the SHA-256 kept in file names
+EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/jpg": "jpg", "image/gif": "gif",
+              "image/webp": "webp", "image/svg+xml": "svg", "image/bmp": "bmp", "image/tiff": "tif"}
+
+_START = re.compile(r"(?<=[\"'(=])data:(image/[A-Za-z0-9.+-]{1,40});base64,")
+_START_MAX = len("data:image/;base64,") + 40 + 1  # longest match plus the character before it
+_PAYLOAD_END = re.compile(r"[^A-Za-z0-9+/=]")
+
+
+@dataclass
+class DocumentReport:
+    document: str
+    output: str
+    images: int = 0        # data: URIs rewritten
+    new_assets: int = 0    # of which stored for the first time
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+class AssetStore:
+    """Content-addressed image files in one directory."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def begin(self, mime: str) -> "_Asset":
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return _Asset(self, mime)
+
+
+class _Asset:
+    """One image being decoded: bytes go to a temporary file and into the hash."""
+
+    def __init__(self, store: AssetStore, mime: str):
+        self.store = store
+        self.mime = mime
+        self.digest = hashlib.sha256()
+        self.pending = ""   # base64 text not decoded yet
+        self.broken = False
+        self.padded = False
+        fd, self.tmp = tempfile.mkstemp(dir=store.directory, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+
+    def feed(self, text: str) -> None:
+        if text and self.padded:
+            self.broken = True  # data after the padding
+        self.pending += text
+        whole = len(self.pending) - len(self.pending) % 4
+        if whole and not self.broken:
+            groups = self.pending[:whole]
+            try:
+                if "=" in groups.rstrip("="):
+                    raise binascii.Error("padding inside the payload")
+                data = base64.b64decode(groups, validate=True)
+            except binascii.Error:
+                self.broken = True  # keep the rest as text for original()
+                return
+            self._write(data)
+            self.padded = groups.endswith("=")
+            self.pending = self.pending[whole:]
+
+    def _write(self, data: bytes) -> None:
+        self.digest.update(data)
+        self.file.write(data)
+
+    def finish(self) -> tuple[Path | None, bool]:
+        """(path, created), or (None, False) and the original URI is kept when the payload is not valid base64."""
+        try:
+            if self.pending and not self.broken:
+                self._write(base64.b64decode(self.pending + "=" * (-len(self.pending) % 4), validate=True))
+                self.pending = ""
+        except binascii.Error:
+            self.broken = True
+        self.file.close()
+        if self.broken:
+            return None, False
+        name = f"{self.digest.hexdigest()[:HASH_CHARS]}.{EXTENSIONS.get(self.mime, 'bin')}"
+        path = self.store.directory / name
+        if path.exists():
+            os.unlink(self.tmp)
+            return path, False
+        os.chmod(self.tmp, 0o644)  # mkstemp creates the file owner-only
+        os.replace(self.tmp, path)
+        return path, True
+
+    def original(self) -> str:
+        """The data: URI this asset was read from (decoded groups re-encode to the same text)."""
+        with open(self.tmp, "rb") as f:
+            data = f.read()
+        os.unlink(self.tmp)
+        return f"data:{self.mime};base64,{base64.b64encode(data).decode('ascii')}{self.pending}"
+
+
+def rewrite(src: TextIO, dst: TextIO, store: AssetStore, prefix: str, report: DocumentReport,
+            chunk: int = CHUNK_CHARS) -> None:
+    """Copy HTML from `src` to `dst`, replacing image data: URIs with `prefix` + file name."""
+    buf = ""
+    eof = False
+    while True:
+        if not eof and len(buf) < max(chunk, 2 * _START_MAX):
+            more = src.read(chunk)
+            eof = not more
+            buf += more
+        match = _START.search(buf)
+        if not match:
+            # A URI may start in the last few characters; keep them for the next read.
+            cut = len(buf) if eof else max(len(buf) - _START_MAX, 0)
+            dst.write(buf[:cut])
+            buf = buf[cut:]
+            if eof:
+                return
+            continue
+        dst.write(buf[:match.start()])
+        buf = buf[match.end():]
+        asset = store.begin(match.group(1))
+        while True:
+            end = _PAYLOAD_END.search(buf)
+            if end:
+                asset.feed(buf[:end.start()])
+                buf = buf[end.start():]
+                break
+            asset.feed(buf)
+            buf = src.read(chunk)
+            if not buf:
+                eof = True
+                break
+        path, created = asset.finish()
+        if path is None:
+            dst.write(asset.original())
+            continue
+        dst.write(prefix + path.name)
+        report.images += 1
+        report.new_assets += created
+
+
+def rewrite_file(html_path: Path, output: Path, assets_dir: Path) -> DocumentReport:
+    """Rewrite one HTML file (output may be html_path itself) with images under assets_dir."""
+    report = DocumentReport(html_path.name, str(output), bytes_before=html_path.stat().st_size)
+    prefix = os.path.relpath(assets_dir, output.parent).replace(os.sep, "/") + "/"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output.parent, suffix=".tmp")
+    try:
+        with open(html_path, "r", encoding="utf-8", newline="") as src, \
+                os.fdopen(fd, "w", encoding="utf-8", newline="") as dst:
+            rewrite(src, dst, AssetStore(assets_dir), prefix, report)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    report.bytes_after = output.stat().st_size
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move base64-embedded images out of HTML files.")
+    parser.add_argument("html", nargs="+", type=Path)
+    parser.add_argument("--output-dir", type=Path, default=None, help="write here instead of in place")
+    parser.add_argument("--assets-dir", type=Path, default=None, help="default: assets/ next to the output")
+    parser.add_argument("--report", type=Path, default=None, help="write per-document results as JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for html_path in args.html:
+        output = args.output_dir / html_path.name if args.output_dir else html_path
+        assets_dir = args.assets_dir or output.parent / "assets"
+        start = time.perf_counter()
+        report = rewrite_file(html_path, output, assets_dir)
+        reports.append({**asdict(report), "bytes_saved": report.bytes_saved,
+                        "duration": round(time.perf_counter() - start, 4)})
+        if report.images:
+            print(f"[assets] {report.document}: {report.images} images ({report.new_assets} new), "
+                  f"{report.bytes_before} → {report.bytes_after} bytes, saved {report.bytes_saved} "
+                  f"({report.bytes_saved / max(report.bytes_before, 1):.0%})")
+    saved = sum(r["bytes_saved"] for r in reports)
+    before = sum(r["bytes_before"] for r in reports)
+    print(f"[assets] {sum(r['images'] for r in reports)} images in {len(reports)} documents, "
+          f"saved {saved} of {before} bytes ({saved / max(before, 1):.0%})")
+    if args.report:
+        args.report.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+"""
+chunks.py — Split a source and a converted document into aligned chunk pairs.
+
+evaluate.py used to cut both documents at MAX_HTML_CHARS, so a long report
+was judged on its first few pages, and the two cuts fell at unrelated
+places: the model saw source sections the conversion excerpt did not reach,
+or the reverse. Here both documents are cut at the same places:
+
+1. Each document is reduced to its <body>, and base64 image payloads are
+   elided (Docling's embedded images alone exceed the budget).
+2. Headings (h1–h6) are matched across the two documents by text, in
+   order; levels are ignored, since converters flatten them. Headings
+   unique on both sides anchor the match, as in similarity.py's token
+   backend, and only the short runs between anchors are compared by
+   fuzzy similarity, so matching stays near-linear in the heading count.
+3. Matched headings split both documents into aligned sections. A section
+   larger than the budget is cut into near-equal parts, at block-element
+   starts where that keeps every part within the budget and otherwise
+   outside any tag or character reference; consecutive small sections
+   are merged until a pair would overflow.
+
+Each pair is at most `budget` characters per side, so the number of pairs,
+and the cost of evaluating them, grows linearly with the document.
+text_length() gives the weight of a pair when its scores are averaged.
+
+Usage:
+  for pair in chunk_pairs(source_html, converted_html, budget):
+      pair.heading, pair.source, pair.converted
+"""
+from __future__ import annotations
+
+import html as htmllib
+import math
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from html.parser import HTMLParser
+
+from similarity import longest_chain, unique_positions  # parsr/, put on sys.path by evaluate.py
+
+HEADING_MATCH = 0.8  # SequenceMatcher ratio above which two headings anchor the same boundary
+FUZZY_MAX = 10_000   # heading pairs: largest run between anchors compared by fuzzy similarity
+
+_BODY = re.compile(r"<body\b[^>]*>(.*)</body\s*>", re.S | re.I)
+_DATA_URI = re.compile(r"(data:[\w.+-]+/[\w.+-]+;base64,)[A-Za-z0-9+/=]+")
+_BLOCK_START = re.compile(r"<(?:h[1-6]|p|li|dt|tr|table|pre|blockquote|figure|section|div|ul|ol|dl)\b", re.I)
+_TAG = re.compile(r"<[^>]*>")
+_ENTITY_TAIL = re.compile(r"&#?[A-Za-z0-9]*$")
+ENTITY_MAX = 32  # characters: longest character reference a cut is moved across
+_NON_WORD = re.compile(r"\W+")
+
+
+@dataclass
+class ChunkPair:
+    heading: str    # first matched heading in the pair, "" before the first one
+    source: str
+    converted: str
+
+
+def prepare(html: str) -> str:
+    """The body of a document, with the payload of every base64 data: URI removed."""
+    match = _BODY.search(html)
+    body = match.group(1) if match else html
+    return _DATA_URI.sub(r"\1…", body)
+
+
+def text_length(html: str) -> int:
+    """Characters of visible text, whitespace collapsed."""
+    return len(" ".join(htmllib.unescape(_TAG.sub(" ", html)).split()))
+
+
+class _HeadingParser(HTMLParser):
+    def __init__(self, text: str):
+        super().__init__(convert_charrefs=True)
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+        self.headings: list[tuple[int, str]] = []  # (offset of <hN>, text)
+        self._open: tuple[int, list[str]] | None = None
+
+    def handle_starttag(self, tag, attrs):
+        if re.fullmatch(r"h[1-6]", tag):
+            line, col = self.getpos()
+            self._open = (self.line_starts[line - 1] + col, [])
+
+    def handle_endtag(self, tag):
+        if self._open and re.fullmatch(r"h[1-6]", tag):
+            offset, parts = self._open
+            self.headings.append((offset, " ".join("".join(parts).split())))
+            self._open = None
+
+    def handle_data(self, data):
+        if self._open:
+            self._open[1].append(data)
+
+
+def headings(html: str) -> list[tuple[int, str]]:
+    """(offset, text) of each non-empty heading, in document order."""
+    parser = _HeadingParser(html)
+    parser.feed(html)
+    parser.close()
+    return [(offset, text) for offset, text in parser.headings if _key(text)]
+
+
+def _key(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def align(a: list[str], b: list[str]) -> list[tuple[int, int]]:
+    """Index pairs of headings matched in order.
+
+    Headings whose key occurs once on each side are matched exactly, keeping
+    the longest chain that is in order on both sides; the runs between those
+    anchors are searched the same way, and a run with no such key is matched
+    by fuzzy similarity when it has at most FUZZY_MAX heading pairs.
+    """
+    ka, kb = [_key(t) for t in a], [_key(t) for t in b]
+    pairs: list[tuple[int, int]] = []
+    stack = [(0, len(ka), 0, len(kb))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        if alo >= ahi or blo >= bhi:
+            continue
+        ua, ub = unique_positions(ka, alo, ahi), unique_positions(kb, blo, bhi)
+        anchors = longest_chain(sorted((i, ub[k]) for k, i in ua.items() if k in ub))
+        if not anchors:
+            if (ahi - alo) * (bhi - blo) <= FUZZY_MAX:
+                pairs.extend(_align_fuzzy(ka, kb, alo, ahi, blo, bhi))
+            continue
+        prev_i, prev_j = alo, blo
+        for i, j in anchors:
+            pairs.append((i, j))
+            stack.append((prev_i, i, prev_j, j))
+            prev_i, prev_j = i + 1, j + 1
+        stack.append((prev_i, ahi, prev_j, bhi))
+    return sorted(pairs)
+
+
+def _align_fuzzy(ka: list[str], kb: list[str], alo: int, ahi: int, blo: int, bhi: int) -> list[tuple[int, int]]:
+    """Pairs from ka[alo:ahi] and kb[blo:bhi] matched in order, maximising the total similarity."""
+    n, m = ahi - alo, bhi - blo
+    best = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        for j in range(m - 1, -1, -1):
+            value = max(best[i + 1][j], best[i][j + 1])
+            matcher = SequenceMatcher(None, ka[alo + i], kb[blo + j])
+            if matcher.real_quick_ratio() >= HEADING_MATCH and matcher.quick_ratio() >= HEADING_MATCH:
+                ratio = matcher.ratio()
+                if ratio >= HEADING_MATCH:
+                    value = max(value, best[i + 1][j + 1] + ratio)
+            best[i][j] = value
+    pairs = []
+    i = j = 0
+    while i < n and j < m:
+        if best[i][j] == best[i + 1][j]:
+            i += 1
+        elif best[i][j] == best[i][j + 1]:
+            j += 1
+        else:
+            pairs.append((alo + i, blo + j))
+            i += 1
+            j += 1
+    return pairs
+
+
+def _clean_cut(text: str, cut: int, lo: int, hi: int) -> int:
+    """`cut` moved out of a tag or character reference it falls inside, staying within [lo, hi].
+
+    It moves back to the `<` or `&` that opens it, or else forward past the
+    `>` or `;` that closes it; with neither in range it stays.
+    """
+    opened = text.rfind("<", 0, cut)
+    if opened > text.rfind(">", 0, cut):
+        closed = text.find(">", cut, hi)
+        if opened >= lo:
+            cut = opened
+        elif closed != -1:
+            cut = closed + 1
+    entity = _ENTITY_TAIL.search(text, max(cut - ENTITY_MAX, 0), cut)
+    if entity:
+        closed = text.find(";", cut, min(cut + ENTITY_MAX, hi))
+        if entity.start() >= lo:
+            cut = entity.start()
+        elif closed != -1:
+            cut = closed + 1
+    return cut
+
+
+def _cuts(text: str, parts: int, budget: int) -> list[int]:
+    """Offsets splitting `text` into `parts` pieces of at most `budget` characters.
+
+    Each cut aims at an equal share and moves back to the block start before
+    it, but never so far that the rest no longer fits in the remaining parts;
+    with no block start in range it falls inside a block, clear of any tag
+    or character reference where the range allows.
+    """
+    starts = [m.start() for m in _BLOCK_START.finditer(text)]
+    cuts = [0]
+    for k in range(1, parts):
+        lo = max(cuts[-1], len(text) - budget * (parts - k))  # the rest must fit
+        hi = cuts[-1] + budget                                 # this piece must fit
+        target = min(max(len(text) * k // parts, lo), hi)
+        snapped = [s for s in starts if lo <= s <= target and s > cuts[-1]]
+        cuts.append(snapped[-1] if snapped else _clean_cut(text, target, max(lo, cuts[-1] + 1), hi))
+    return cuts + [len(text)]
+
+
+def _split(pair: ChunkPair, budget: int) -> list[ChunkPair]:
+    parts = math.ceil(max(len(pair.source), len(pair.converted)) / budget)
+    if parts <= 1:
+        return [pair]
+    cs, cc = _cuts(pair.source, parts, budget), _cuts(pair.converted, parts, budget)
+    return [ChunkPair(pair.heading, pair.source[cs[k]:cs[k + 1]], pair.converted[cc[k]:cc[k + 1]])
+            for k in range(parts)]
+
+
+def chunk_pairs(source_html: str, converted_html: str, budget: int) -> list[ChunkPair]:
+    """Aligned (source, converted) chunk pairs of at most `budget` characters per side."""
+    source, converted = prepare(source_html), prepare(converted_html)
+    hs, hc = headings(source), headings(converted)
+    anchors = [(0, 0, "")]
+    for i, j in align([t for _, t in hs], [t for _, t in hc]):
+        if hs[i][0] > anchors[-1][0] and hc[j][0] > anchors[-1][1]:
+            anchors.append((hs[i][0], hc[j][0], hs[i][1]))
+        elif hs[i][0] == 0 and hc[j][0] == 0:
+            anchors[0] = (0, 0, hs[i][1])  # both documents open with the same heading
+    anchors.append((len(source), len(converted), ""))
+
+    sections = []
+    for (s0, c0, heading), (s1, c1, _) in zip(anchors, anchors[1:]):
+        sections.extend(_split(ChunkPair(heading, source[s0:s1], converted[c0:c1]), budget))
+
+    chunks: list[ChunkPair] = []
+    for section in sections:
+        last = chunks[-1] if chunks else None
+        if (last and len(last.source) + len(section.source) <= budget
+                and len(last.converted) + len(section.converted) <= budget):
+            chunks[-1] = ChunkPair(last.heading or section.heading, last.source + section.source,
+                                   last.converted + section.converted)
+        else:
+            chunks.append(section)
+    over = [(len(c.source), len(c.converted)) for c in chunks if max(len(c.source), len(c.converted)) > budget]
+    if over:
+        raise ValueError(f"chunk pairs over the {budget}-character budget (source, converted): {over}")
+    return chunks
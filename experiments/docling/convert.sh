@@ -4,6 +4,11 @@
 #   With no argument: converts all 50 fixtures.
 #   With argument: converts only that fixture (e.g. 01-basic-paragraphs).
 # Requires: Docker
+#
+# Each fixture starts a new container and reloads the models. For repeated
+# runs, start the persistent worker once and convert through it instead:
+#   docker run -p 8765:8765 --entrypoint python3 pdf-to-html-docling /app/worker.py serve --host 0.0.0.0
+#   python3 worker.py convert [fixture ...]
 
 set -euo pipefail
 
@@ -11,6 +16,9 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 FIXTURES_DIR="$(cd "$SCRIPT_DIR/../../benchmark/fixtures" && pwd)"
 OUTPUT_DIR="$SCRIPT_DIR/output"
 RESULTS_FILE="$SCRIPT_DIR/conversion-results.json"
+# Results are appended to the results store as they come; RESULTS_FILE is
+# exported from the run at the end.
+RESULTS_CLI="$SCRIPT_DIR/../parsr/results-db.py"
 
 # Docker image name and model cache directory
 IMAGE_NAME="pdf-to-html-docling"
@@ -31,7 +39,7 @@ else
   FIXTURE_DIRS=("$FIXTURES_DIR"/*/)
 fi
 
-echo "[]" > "$RESULTS_FILE"
+RUN_ID=$(python3 "$RESULTS_CLI" begin --tool docling/output --metric convert)
 
 # ── Convert one fixture ──────────────────────────────────────────────────────
 convert_one() {
@@ -52,6 +60,7 @@ convert_one() {
   # Run docling in Docker:
   #   --to html        → native HTML export
   #   --image-export-mode embedded → base64-embed images into HTML
+  #                                  (assets.py moves them to output/assets/)
   #   /workspace/source.pdf → the input file (bind-mounted)
   #   --output /output → write output here (bind-mounted)
   #
@@ -97,8 +106,18 @@ convert_one() {
 
   cp "$generated_html" "$local_html"
   rm -rf "$tmp_out"
+  # Store each embedded image once under output/assets/ and link to it.
+  local assets_code=0
+  python3 "$SCRIPT_DIR/assets.py" "$local_html" 2>&1 | sed "s/^/[docling]   /" \
+    || assets_code=$?
 
   local size
+  if [ $assets_code -ne 0 ]; then
+    echo "[docling] ERROR: assets.py exited with code $assets_code for $fixture"
+    size=$(wc -c < "$local_html" 2>/dev/null || echo 0)
+    append_result "$fixture" "assets-failed" "$local_html" "$size"
+    return
+  fi
   size=$(wc -c < "$local_html" 2>/dev/null || echo 0)
   echo "[docling] OK $fixture → ${fixture}.html ($size bytes)"
   append_result "$fixture" "done" "$local_html" "$size"
@@ -109,12 +128,8 @@ append_result() {
   local status="$2"
   local output="$3"
   local bytes="$4"
-  python3 -c "
-import json, sys
-results = json.load(open('$RESULTS_FILE'))
-results.append({'fixture': '$fixture', 'status': '$status', 'output': '$output', 'bytes': $bytes})
-json.dump(results, open('$RESULTS_FILE','w'), indent=2)
-"
+  python3 "$RESULTS_CLI" record "$RUN_ID" "$fixture" "$status" \
+    --data "{\"output\": \"$output\", \"bytes\": $bytes}"
 }
 
 # ── Main loop ───────────────────────────────────────────────────────────────
@@ -125,8 +140,9 @@ done
 
 echo ""
 echo "[docling] ══════════════════════════════════════════"
+python3 "$RESULTS_CLI" export "$RUN_ID" > "$RESULTS_FILE"
 echo "[docling] Conversion complete."
-echo "[docling] Results: $RESULTS_FILE"
+echo "[docling] Results: $RESULTS_FILE (run $RUN_ID)"
 
 python3 -c "
 import json
@@ -10,14 +10,37 @@ Scoring rubric (same as parsr experiment for apples-to-apples comparison):
 
 Usage:
   export ANTHROPIC_API_KEY=sk-ant-...
-  python3 evaluate.py [fixture-name]
+  python3 evaluate.py [--concurrency N] [--rpm N] [fixture-name ...]
 
   With no argument: evaluates all fixtures that have output HTML.
-  With argument: evaluates only that fixture.
+  With arguments: evaluates only those fixtures.
+
+Documents up to MAX_HTML_CHARS are sent whole. Longer ones are split by
+chunks.py into source/converted pairs cut at matching headings, each pair
+is scored on its own, and the fixture's scores are the means over the
+pairs weighted by the source text each covers. Every part of a long report
+is read, at one request per CHUNK_CHARS.
+
+Evaluations run concurrently behind a token-bucket rate limiter and are
+cached under a hash of (source HTML, converted HTML, model, system prompt),
+per chunk pair for long documents, so a re-run only pays for outputs (or
+sections) that changed, whichever tool produced them. ANTHROPIC_BASE_URL
+points the client at stubserver.py for testing; EVALUATION_CACHE,
+EVALUATIONS_FILE and RESULTS_DB then keep the stub's scores out of the
+real cache, snapshot and history (see stubserver.py for the full command).
+
+Each result is appended to the results store (parsr/resultstore.py) as it
+arrives, so an interrupted run keeps what it finished; all-evaluations.json
+is a snapshot of the latest score per fixture, written once at the end.
+Query the history with parsr/results-db.py.
 """
 
+import argparse
+import asyncio
+import hashlib
 import json
 import os
+import random
 import sys
 import time
 import urllib.request
@@ -25,13 +48,31 @@ import urllib.error
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
+PARSR_DIR = SCRIPT_DIR.resolve().parent / "parsr"
 FIXTURES_DIR = SCRIPT_DIR / "../../benchmark/fixtures"
 OUTPUT_DIR = SCRIPT_DIR / "output"
-EVALUATIONS_FILE = SCRIPT_DIR / "evaluations" / "all-evaluations.json"
+EVALUATIONS_FILE = Path(os.environ.get("EVALUATIONS_FILE", SCRIPT_DIR / "evaluations" / "all-evaluations.json"))
+CACHE_DIR = Path(os.environ.get("EVALUATION_CACHE", SCRIPT_DIR / "../.cache/evaluations"))
+TOOL = "docling/output"  # results store name of OUTPUT_DIR
+
+sys.path.insert(0, str(PARSR_DIR))
+
+from chunks import chunk_pairs, text_length  # noqa: E402
+from resultstore import ResultStore, Run  # noqa: E402
 
 API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+API_URL = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/") + "/v1/messages"
 MODEL = "claude-haiku-4-5-20251001"
-MAX_HTML_CHARS = 12_000   # truncate very large HTML files to stay within context
+MAX_HTML_CHARS = 12_000   # larger documents are evaluated in chunks to stay within context
+CHUNK_CHARS = MAX_HTML_CHARS  # per side of a chunk pair, image data elided
+
+CONCURRENCY = 4           # evaluations in flight
+REQUESTS_PER_MINUTE = 50  # token-bucket refill rate
+BURST = 4                 # token-bucket capacity
+MAX_RETRIES = 5
+RETRY_BASE = 2.0          # s: backoff before jitter, doubled per attempt
+RETRY_CAP = 60.0          # s
+RETRY_STATUSES = {429, 529}
 
 SYSTEM_PROMPT = """You are an expert HTML document evaluator. You compare a PDF-to-HTML
 conversion output against the original source HTML to assess quality.
@@ -74,25 +115,86 @@ def truncate(html: str, max_chars: int) -> str:
     return html[:max_chars] + f"\n... [TRUNCATED at {max_chars} chars]"
 
 
-def call_claude(source_html: str, converted_html: str, fixture: str) -> dict:
-    if not API_KEY:
-        raise RuntimeError("ANTHROPIC_API_KEY not set")
+class TokenBucket:
+    """Allow `rate` requests per second on average, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def cache_key(source_html: str, converted_html: str, part: str = "") -> str:
+    h = hashlib.sha256()
+    for field in (source_html, converted_html, MODEL, SYSTEM_PROMPT, str(MAX_HTML_CHARS)) + ((part,) if part else ()):
+        h.update(field.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
 
+
+def load_cached(key: str) -> dict | None:
+    path = CACHE_DIR / f"{key}.json"
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+
+
+def store_cached(key: str, result: dict) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_DIR / f"{key}.json.tmp"
+    tmp.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    tmp.replace(CACHE_DIR / f"{key}.json")
+
+
+def build_payload(source_html: str, converted_html: str, fixture: str, part: str = "") -> bytes:
+    header = f"Fixture: {fixture}\n\n"
+    if part:
+        header = (f"Fixture: {fixture}, {part}. Both documents were cut at the same section "
+                  f"boundaries and embedded image data was removed; score this part only.\n\n")
     user_content = (
-        f"Fixture: {fixture}\n\n"
+        f"{header}"
         f"=== GROUND-TRUTH HTML (source) ===\n{truncate(source_html, MAX_HTML_CHARS)}\n\n"
         f"=== DOCLING CONVERTED HTML ===\n{truncate(converted_html, MAX_HTML_CHARS)}"
     )
-
-    payload = json.dumps({
+    return json.dumps({
         "model": MODEL,
         "max_tokens": 512,
         "system": SYSTEM_PROMPT,
         "messages": [{"role": "user", "content": user_content}],
     }).encode()
 
+
+def parse_reply(raw: bytes) -> dict:
+    body = json.loads(raw)
+    text = body["content"][0]["text"].strip()
+    # strip possible markdown code fences
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return json.loads(text)
+
+
+def post_messages(payload: bytes) -> tuple[int, dict, bytes]:
+    """Blocking POST to the messages API; HTTP errors are returned, not raised."""
     req = urllib.request.Request(
-        "https://api.anthropic.com/v1/messages",
+        API_URL,
         data=payload,
         headers={
             "x-api-key": API_KEY,
@@ -101,49 +203,122 @@ def call_claude(source_html: str, converted_html: str, fixture: str) -> dict:
         },
         method="POST",
     )
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, dict(resp.headers), resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers or {}), e.read()
+
 
-    for attempt in range(3):
+def retry_delay(attempt: int, retry_after: str | None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's retry-after."""
+    delay = random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+    if retry_after:
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                body = json.loads(resp.read())
-                text = body["content"][0]["text"].strip()
-                # strip possible markdown code fences
-                if text.startswith("```"):
-                    text = text.split("```")[1]
-                    if text.startswith("json"):
-                        text = text[4:]
-                return json.loads(text)
-        except urllib.error.HTTPError as e:
-            err = e.read().decode()
-            if e.code == 529 or "overloaded" in err.lower():
-                wait = 20 * (attempt + 1)
-                print(f"  [overloaded] retry {attempt+1}/3 in {wait}s…")
-                time.sleep(wait)
-            else:
-                raise
-    raise RuntimeError("API call failed after 3 retries")
-
-
-def evaluate_fixture(fixture: str) -> dict | None:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+async def call_claude(source_html: str, converted_html: str, fixture: str, bucket: TokenBucket,
+                      part: str = "") -> dict:
+    if not API_KEY:
+        raise RuntimeError("ANTHROPIC_API_KEY not set")
+
+    payload = build_payload(source_html, converted_html, fixture, part)
+    for attempt in range(MAX_RETRIES):
+        await bucket.acquire()
+        status, headers, raw = await asyncio.to_thread(post_messages, payload)
+        if status == 200:
+            return parse_reply(raw)
+        if status in RETRY_STATUSES or b"overloaded" in raw.lower():
+            headers = {k.lower(): v for k, v in headers.items()}
+            wait = retry_delay(attempt, headers.get("retry-after"))
+            print(f"  [{fixture}] HTTP {status}, retry {attempt+1}/{MAX_RETRIES} in {wait:.1f}s…")
+            await asyncio.sleep(wait)
+            continue
+        raise RuntimeError(f"API error {status} for {fixture}: {raw[:200].decode(errors='replace')}")
+    raise RuntimeError(f"API call failed after {MAX_RETRIES} retries")
+
+
+async def evaluate_fixture(fixture: str, bucket: TokenBucket, slots: asyncio.Semaphore,
+                           run: Run) -> tuple[dict | None, bool]:
+    """Returns (result, cached); the result is also recorded in `run`."""
     source_html_path = FIXTURES_DIR / fixture / "source.html"
     converted_html_path = OUTPUT_DIR / f"{fixture}.html"
 
     if not source_html_path.exists():
         print(f"[eval] SKIP {fixture} — no source.html")
-        return None
+        return None, False
     if not converted_html_path.exists():
         print(f"[eval] SKIP {fixture} — no converted HTML (run convert.sh first)")
-        return None
+        return None, False
 
     source_html = source_html_path.read_text(encoding="utf-8", errors="replace")
     converted_html = converted_html_path.read_text(encoding="utf-8", errors="replace")
 
-    print(f"[eval] Evaluating {fixture}…", end=" ", flush=True)
-    result = call_claude(source_html, converted_html, fixture)
-    result["fixture"] = fixture
-    print(f"score={result['score']} (text={result['text_fidelity']}, "
-          f"struct={result['structure']}, fmt={result['formatting']})")
-    return result
+    try:
+        if len(source_html) <= MAX_HTML_CHARS and len(converted_html) <= MAX_HTML_CHARS:
+            result, cached = await score_pair(source_html, converted_html, fixture, "", bucket, slots)
+        else:
+            result, cached = await score_chunks(source_html, converted_html, fixture, bucket, slots)
+    except Exception as e:
+        print(f"[eval] ERROR {fixture}: {e}")
+        run.record(fixture, "error", data={"error": str(e)})
+        return None, False
+    run.record(fixture, "done", result.get("score"), {**result, "cached": cached})
+    result = {"fixture": fixture, **result}
+    if cached:
+        print(f"[eval] CACHED {fixture} score={result['score']}")
+    else:
+        chunked = f", chunks={len(result['chunks'])}" if "chunks" in result else ""
+        print(f"[eval] {fixture} score={result['score']} (text={result['text_fidelity']}, "
+              f"struct={result['structure']}, fmt={result['formatting']}{chunked})")
+    return result, cached
+
+
+async def score_pair(source_html: str, converted_html: str, fixture: str, part: str,
+                     bucket: TokenBucket, slots: asyncio.Semaphore) -> tuple[dict, bool]:
+    """Returns (scores, cached) for one source/converted pair; API errors propagate."""
+    key = cache_key(source_html, converted_html, part)
+    cached = load_cached(key)
+    if cached is not None:
+        return cached, True
+    async with slots:
+        result = await call_claude(source_html, converted_html, fixture, bucket, part)
+    result.pop("fixture", None)
+    store_cached(key, result)
+    return result, False
+
+
+async def score_chunks(source_html: str, converted_html: str, fixture: str,
+                       bucket: TokenBucket, slots: asyncio.Semaphore) -> tuple[dict, bool]:
+    """Score aligned chunk pairs concurrently and average them, weighted by length."""
+    pairs = chunk_pairs(source_html, converted_html, CHUNK_CHARS)
+    parts = [f"part {k} of {len(pairs)}" + (f", from the section \"{p.heading}\"" if p.heading else "")
+             for k, p in enumerate(pairs, 1)]
+    outcomes = await asyncio.gather(*(score_pair(p.source, p.converted, fixture, part, bucket, slots)
+                                      for p, part in zip(pairs, parts)))
+    # A pair weighs the source text it covers; converted text the source lacks still counts.
+    weights = [text_length(p.source) or text_length(p.converted) or 1 for p in pairs]
+    scores = [s for s, _ in outcomes]
+    total = sum(weights)
+
+    def mean(field: str) -> float:
+        return sum(w * s[field] for w, s in zip(weights, scores)) / total
+
+    text, struct, fmt = mean("text_fidelity"), mean("structure"), mean("formatting")
+    worst = min(range(len(scores)), key=lambda k: scores[k]["score"])
+    result = {
+        "text_fidelity": round(text, 2),
+        "structure": round(struct, 2),
+        "formatting": round(fmt, 2),
+        "score": round((text + struct + fmt) / 8 * 10, 1),
+        "notes": f"lowest is {parts[worst]}: {scores[worst].get('notes', '')}",
+        "chunks": [{"part": part, "weight": w, **s} for part, w, s in zip(parts, weights, scores)],
+    }
+    return result, all(cached for _, cached in outcomes)
 
 
 def load_existing() -> list:
@@ -154,40 +329,57 @@ def load_existing() -> list:
 
 def save_results(results: list):
     EVALUATIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    EVALUATIONS_FILE.write_text(json.dumps(results, indent=2))
+    tmp = EVALUATIONS_FILE.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(results, indent=2))
+    tmp.replace(EVALUATIONS_FILE)
+
+
+async def evaluate_all(fixture_names: list[str], concurrency: int, rpm: float, run: Run) -> tuple[list[dict], int]:
+    bucket = TokenBucket(rpm / 60.0, BURST)
+    slots = asyncio.Semaphore(concurrency)
+    outcomes = await asyncio.gather(*(evaluate_fixture(f, bucket, slots, run) for f in fixture_names))
+    results = [r for r, _ in outcomes if r]
+    hits = sum(1 for r, cached in outcomes if r and cached)
+    return results, hits
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Score converted HTML against the fixture sources.")
+    parser.add_argument("fixtures", nargs="*", help="fixture names (default: all)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE, help="requests per minute")
+    args = parser.parse_args()
+
     if not API_KEY:
         print("ERROR: ANTHROPIC_API_KEY environment variable not set.", file=sys.stderr)
         sys.exit(1)
 
     # Select fixtures
-    if len(sys.argv) > 1:
-        fixture_names = [sys.argv[1]]
+    if args.fixtures:
+        fixture_names = args.fixtures
     else:
         fixture_names = sorted(
             d.name for d in FIXTURES_DIR.iterdir()
             if d.is_dir() and d.name[0].isdigit()
         )
 
-    existing = load_existing()
-    existing_fixtures = {r["fixture"] for r in existing}
+    store = ResultStore()
+    run = store.begin(TOOL, "evaluate", label=MODEL)
+    try:
+        fresh, hits = asyncio.run(evaluate_all(fixture_names, args.concurrency, args.rpm, run))
+    finally:
+        store.close()
 
-    results = list(existing)
-    for fixture in fixture_names:
-        if fixture in existing_fixtures:
-            print(f"[eval] SKIP {fixture} — already evaluated")
-            continue
-        result = evaluate_fixture(fixture)
-        if result:
-            results.append(result)
-            save_results(results)
-            time.sleep(0.5)  # gentle rate limit
+    # Fixtures outside this run keep their previous evaluation.
+    by_fixture = {r["fixture"]: r for r in load_existing()}
+    by_fixture.update((r["fixture"], r) for r in fresh)
+    results = [by_fixture[k] for k in sorted(by_fixture)]
+    save_results(results)
+    print(f"[eval] cache hits: {hits}/{len(fresh)}")
 
     print()
     print("═" * 50)
-    print(f"Evaluations saved to: {EVALUATIONS_FILE}")
+    print(f"Evaluations saved to: {EVALUATIONS_FILE} (run {run.run})")
 
     done = [r for r in results if "score" in r]
     if done:
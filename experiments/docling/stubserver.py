@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+stubserver.py — Canned Messages API for testing evaluate.py without a key or network.
+
+Answers POST /v1/messages with a reply in the API's shape whose text is a
+score in evaluate.py's rubric, so every path of the client can be
+reproduced locally:
+
+  retry      --rate-limit-every N answers every Nth request with 429 and a
+             retry-after of --retry-after seconds; --overload-every N with
+             529 overloaded_error
+  rate limit --rpm N answers 429 to requests beyond N in the trailing
+             minute, which evaluate.py's token bucket should never trigger
+             when its --rpm is lower
+  parsing    --fenced wraps every reply in a ```json code fence
+  cache      scores are a hash of the request, so a repeated request gets
+             the same reply; the request count printed on exit shows how
+             many evaluate.py sent, and so what its cache saved
+
+Usage:
+  python3 stubserver.py [--port P] [--rate-limit-every N] [--retry-after S]
+                        [--overload-every N] [--rpm N] [--fenced]
+
+  Point evaluate.py at it, with its cache, snapshot and results store
+  redirected so the stub's scores stay out of the real ones:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8766 ANTHROPIC_API_KEY=stub \\
+    EVALUATION_CACHE=/tmp/eval-cache EVALUATIONS_FILE=/tmp/evaluations.json \\
+    RESULTS_DB=/tmp/results.sqlite python3 evaluate.py [fixture ...]
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST = "127.0.0.1"
+PORT = 8766
+RETRY_AFTER = 1.0  # s: retry-after sent with a scheduled 429
+
+
+class StubAPI:
+    """Request counter and rate-limit window shared by the request threads."""
+
+    def __init__(self, rate_limit_every: int, retry_after: float, overload_every: int, rpm: int, fenced: bool):
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.overload_every = overload_every
+        self.rpm = rpm
+        self.fenced = fenced
+        self.requests = 0
+        self.statuses: collections.Counter = collections.Counter()
+        self._recent: collections.deque = collections.deque()  # monotonic times of accepted requests
+        self._lock = threading.Lock()
+
+    def answer(self, request: dict) -> tuple[int, dict, dict]:
+        """(status, extra headers, body) for one messages request."""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            over_rpm = self.rpm and len(self._recent) >= self.rpm
+            if not over_rpm:
+                self._recent.append(now)
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            status, headers, body = 429, {"retry-after": f"{self.retry_after:g}"}, error("rate_limit_error")
+        elif over_rpm:
+            status, headers, body = 429, {"retry-after": "60"}, error("rate_limit_error")
+        elif self.overload_every and n % self.overload_every == 0:
+            status, headers, body = 529, {}, error("overloaded_error")
+        else:
+            status, headers, body = 200, {}, self.reply(request)
+        with self._lock:
+            self.statuses[status] += 1
+        return status, headers, body
+
+    def reply(self, request: dict) -> dict:
+        content = json.dumps(request.get("messages", []), sort_keys=True)
+        digest = hashlib.sha256(content.encode()).digest()
+        text_fidelity, structure, formatting = digest[0] % 4, digest[1] % 4, digest[2] % 3
+        text = json.dumps({
+            "text_fidelity": text_fidelity,
+            "structure": structure,
+            "formatting": formatting,
+            "score": round((text_fidelity + structure + formatting) / 8 * 10, 1),
+            "notes": f"stub score {digest[:4].hex()}",
+        })
+        if self.fenced:
+            text = f"```json\n{text}\n```"
+        return {
+            "id": f"msg_stub_{digest[:8].hex()}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", ""),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(content) // 4, "output_tokens": len(text) // 4},
+        }
+
+
+def error(kind: str) -> dict:
+    return {"type": "error", "error": {"type": kind, "message": f"stub {kind}"}}
+
+
+def handler(api: StubAPI) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != "/v1/messages":
+                return self._send(404, {}, error("not_found_error"))
+            if not self.headers.get("x-api-key"):
+                return self._send(401, {}, error("authentication_error"))
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                return self._send(400, {}, error("invalid_request_error"))
+            self._send(*api.answer(request))
+
+        def _send(self, status: int, headers: dict, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            print(f"[stub] {format % args}")
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Canned Messages API for testing evaluate.py.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--retry-after", type=float, default=RETRY_AFTER, help="retry-after of those 429s")
+    parser.add_argument("--overload-every", type=int, default=0, help="answer every Nth request with 529")
+    parser.add_argument("--rpm", type=int, default=0, help="answer 429 beyond N requests a minute")
+    parser.add_argument("--fenced", action="store_true", help="wrap replies in a ```json code fence")
+    args = parser.parse_args()
+
+    api = StubAPI(args.rate_limit_every, args.retry_after, args.overload_every, args.rpm, args.fenced)
+    server = ThreadingHTTPServer((args.host, args.port), handler(api))
+    server.daemon_threads = True
+    print(f"[stub] listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[stub] {api.requests} requests: "
+              + ", ".join(f"HTTP {s} × {n}" for s, n in sorted(api.statuses.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+worker.py — Long-lived Docling conversion server and its client.
+
+convert.sh starts a fresh container, and so builds a DocumentConverter and
+loads the layout models, for every fixture. `serve` builds the converter
+once per pool process and then answers conversion jobs over a local TCP
+socket, one JSON object per line:
+
+  request:  {"id": 1, "op": "convert", "name": "01-basic", "pdf": "<base64>"}
+  response: {"id": 1, "status": "done", "html": "...", "pages": 2,
+             "seconds": 3.1, "seconds_per_page": 1.55, "worker": 4242}
+
+  {"op": "stats"} returns model-load time per pool process and the totals
+  of converted pages and conversion time; {"op": "shutdown"} stops the server.
+
+PDFs travel in the request, so the client needs no shared paths with a
+containerized server. Model loading happens in the pool initializer and is
+reported on its own, never folded into per-page times.
+
+`--converter stub` swaps in a converter with the same interface that needs
+neither docling nor its models (STUB_LOAD_SECONDS and STUB_PAGE_SECONDS
+simulate the costs), so the server and client can be exercised anywhere.
+
+Usage:
+  python3 worker.py serve [--host H] [--port P] [--workers N] [--converter docling|stub]
+  python3 worker.py convert [--host H] [--port P] [--concurrency N] [--output-dir DIR]
+                            [--embedded-images] [fixture ...]
+
+  The client moves embedded images to <output-dir>/assets/ (assets.py)
+  unless --embedded-images is given.
+
+  In the image: docker run -p 8765:8765 --entrypoint python3 pdf-to-html-docling \
+                  /app/worker.py serve --host 0.0.0.0
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import assets
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = SCRIPT_DIR / "../../benchmark/fixtures"
+OUTPUT_DIR = SCRIPT_DIR / "output"
+RESULTS_FILE = SCRIPT_DIR / "conversion-results.json"
+
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = 1               # pool processes, each with its own models
+CONCURRENCY = 2           # client: jobs in flight
+LINE_LIMIT = 1 << 28      # bytes: largest request/response line
+STUB_LOAD_SECONDS = 0.5
+STUB_PAGE_SECONDS = 0.05
+
+
+# ── Converters ──────────────────────────────────────────────────────────────
+
+class DoclingConverter:
+    """DocumentConverter configured like the CLI call in convert.sh."""
+
+    def __init__(self):
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling_core.types.doc import ImageRefMode
+
+        options = PdfPipelineOptions()
+        options.do_ocr = False  # --no-ocr
+        options.generate_picture_images = True  # needed for embedded images
+        self._converter = DocumentConverter(
+            format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=options)}
+        )
+        self._image_mode = ImageRefMode.EMBEDDED
+
+    def convert(self, pdf_path: Path) -> tuple[str, int]:
+        result = self._converter.convert(pdf_path)
+        html = result.document.export_to_html(image_mode=self._image_mode)
+        return html, len(result.pages)
+
+
+class StubConverter:
+    """Stand-in with DoclingConverter's interface and simulated costs."""
+
+    _PAGE = re.compile(rb"/Type\s*/Page(?!s)")
+
+    def __init__(self, load_seconds: float = STUB_LOAD_SECONDS, page_seconds: float = STUB_PAGE_SECONDS):
+        time.sleep(load_seconds)
+        self._page_seconds = page_seconds
+
+    def convert(self, pdf_path: Path) -> tuple[str, int]:
+        data = pdf_path.read_bytes()
+        if not data.startswith(b"%PDF"):
+            raise ValueError("not a PDF")
+        pages = max(len(self._PAGE.findall(data)), 1)
+        time.sleep(pages * self._page_seconds)
+        return f"<html><body><p>stub: {pages} page(s), {len(data)} bytes</p></body></html>\n", pages
+
+
+CONVERTERS = {"docling": DoclingConverter, "stub": StubConverter}
+
+# Per pool process, set by _init_worker.
+_converter = None
+_load_seconds = 0.0
+
+
+def _init_worker(kind: str) -> None:
+    global _converter, _load_seconds
+    start = time.perf_counter()
+    _converter = CONVERTERS[kind]()
+    _load_seconds = time.perf_counter() - start
+
+
+def _worker_info() -> tuple[int, float]:
+    return os.getpid(), _load_seconds
+
+
+def convert_job(pdf: bytes) -> dict:
+    """Runs in a pool process with the converter already loaded."""
+    with tempfile.TemporaryDirectory() as work:
+        path = Path(work) / "source.pdf"
+        path.write_bytes(pdf)
+        start = time.perf_counter()
+        html, pages = _converter.convert(path)
+        seconds = time.perf_counter() - start
+    return {"html": html, "pages": pages, "seconds": round(seconds, 4),
+            "seconds_per_page": round(seconds / pages, 4) if pages else None,
+            "worker": os.getpid(), "model_load_seconds": round(_load_seconds, 4)}
+
+
+# ── Server ──────────────────────────────────────────────────────────────────
+
+class Server:
+    def __init__(self, pool: ProcessPoolExecutor):
+        self.pool = pool
+        self.model_load: dict[int, float] = {}
+        self.jobs = 0
+        self.failed = 0
+        self.pages = 0
+        self.convert_seconds = 0.0
+        self.stopped = asyncio.Event()
+
+    async def warm_up(self, workers: int) -> None:
+        """Start every pool process so models load before the first job."""
+        loop = asyncio.get_running_loop()
+        infos = await asyncio.gather(*(loop.run_in_executor(self.pool, _worker_info) for _ in range(workers)))
+        for pid, seconds in infos:
+            self.model_load[pid] = round(seconds, 4)
+        for pid, seconds in sorted(self.model_load.items()):
+            print(f"[docling-worker] model load: {seconds:.2f}s (pid {pid})")
+
+    def stats(self) -> dict:
+        return {
+            "model_load_seconds": self.model_load,
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "pages": self.pages,
+            "convert_seconds": round(self.convert_seconds, 4),
+            "seconds_per_page": round(self.convert_seconds / self.pages, 4) if self.pages else None,
+        }
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op", "convert")
+        if op == "stats":
+            return {"id": request.get("id"), "status": "done", **self.stats()}
+        if op == "shutdown":
+            self.stopped.set()
+            return {"id": request.get("id"), "status": "done"}
+        if op != "convert":
+            return {"id": request.get("id"), "status": "error", "error": f"unknown op {op!r}"}
+
+        loop = asyncio.get_running_loop()
+        self.jobs += 1
+        try:
+            pdf = base64.b64decode(request["pdf"])
+            result = await loop.run_in_executor(self.pool, convert_job, pdf)
+        except Exception as e:
+            self.failed += 1
+            print(f"[docling-worker] ERROR {request.get('name', '?')}: {type(e).__name__}: {e}")
+            return {"id": request.get("id"), "status": "error", "error": f"{type(e).__name__}: {e}"}
+        self.model_load.setdefault(result["worker"], result.pop("model_load_seconds"))
+        result.pop("model_load_seconds", None)
+        self.pages += result["pages"]
+        self.convert_seconds += result["seconds"]
+        print(f"[docling-worker] OK {request.get('name', '?')}: {result['pages']} page(s) in {result['seconds']:.2f}s")
+        return {"id": request.get("id"), "status": "done", **result}
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(line: bytes) -> None:
+            try:
+                response = await self.handle(json.loads(line))
+            except ValueError as e:
+                response = {"id": None, "status": "error", "error": f"bad request: {e}"}
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            # Requests on one connection run concurrently; responses carry the id.
+            while line := await reader.readline():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except (asyncio.CancelledError, ConnectionError):
+            pass  # server shutting down, or the client went away
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, workers: int, kind: str) -> None:
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(kind,)) as pool:
+        server = Server(pool)
+        await server.warm_up(workers)
+        listener = await asyncio.start_server(server.connection, host, port, limit=LINE_LIMIT)
+        print(f"[docling-worker] listening on {host}:{port} with {workers} {kind} worker(s)")
+        async with listener:
+            await server.stopped.wait()
+        print(f"[docling-worker] stopped: {json.dumps(server.stats())}")
+
+
+# ── Client ──────────────────────────────────────────────────────────────────
+
+class WorkerClient:
+    """One connection to a running server; requests may overlap."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._waiting: dict[int, asyncio.Future] = {}
+        self._pump = asyncio.create_task(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host: str = HOST, port: int = PORT) -> "WorkerClient":
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def _read_responses(self) -> None:
+        error: Exception = ConnectionError("worker closed the connection")
+        try:
+            while line := await self._reader.readline():
+                response = json.loads(line)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as e:  # a malformed or oversized line: nothing after it can be matched to a request
+            error = ConnectionError(f"bad response from worker: {type(e).__name__}: {e}")
+        finally:
+            # Whatever ended the pump, no request still waiting will get an answer.
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._waiting.clear()
+
+    async def request(self, payload: dict) -> dict:
+        if self._pump.done():
+            raise ConnectionError("worker connection is closed")
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[self._next_id] = future
+        self._writer.write(json.dumps({**payload, "id": self._next_id}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def convert(self, pdf: Path, name: str = "") -> dict:
+        return await self.request({"op": "convert", "name": name or pdf.stem,
+                                   "pdf": base64.b64encode(pdf.read_bytes()).decode("ascii")})
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._pump.cancel()
+
+
+async def convert_fixtures(fixture_dirs: list[Path], output_dir: Path, host: str, port: int,
+                           concurrency: int, extract_images: bool = True) -> tuple[list[dict], dict]:
+    client = await WorkerClient.connect(host, port)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(fixture_dir: Path) -> dict:
+        fixture = fixture_dir.name
+        local_html = output_dir / f"{fixture}.html"
+        if not (fixture_dir / "source.pdf").exists():
+            print(f"[docling] SKIP {fixture}: no source.pdf")
+            return {"fixture": fixture, "status": "missing", "output": "", "bytes": 0, "duration": 0}
+        start = time.perf_counter()
+        async with slots:
+            response = await client.convert(fixture_dir / "source.pdf", fixture)
+        record = {"fixture": fixture, "duration": round(time.perf_counter() - start, 3)}
+        if response["status"] != "done":
+            print(f"[docling] ERROR {fixture}: {response.get('error')}")
+            return {**record, "status": "failed", "output": "", "bytes": 0}
+        local_html.write_text(response["html"], encoding="utf-8")
+        if extract_images:
+            saved = assets.rewrite_file(local_html, local_html, output_dir / "assets").bytes_saved
+            record["image_bytes_saved"] = saved
+        size = local_html.stat().st_size
+        print(f"[docling] OK {fixture} → {fixture}.html ({size} bytes, {response['seconds_per_page']:.2f}s/page)")
+        return {**record, "status": "done", "output": str(local_html), "bytes": size,
+                "pages": response["pages"], "seconds_per_page": response["seconds_per_page"]}
+
+    def failure(fixture_dir: Path, error: BaseException) -> dict:
+        print(f"[docling] ERROR {fixture_dir.name}: {type(error).__name__}: {error}")
+        return {"fixture": fixture_dir.name, "status": "failed", "output": "", "bytes": 0,
+                "error": f"{type(error).__name__}: {error}"}
+
+    try:
+        outcomes = await asyncio.gather(*(one(d) for d in fixture_dirs), return_exceptions=True)
+        results = [failure(d, r) if isinstance(r, BaseException) else r for d, r in zip(fixture_dirs, outcomes)]
+        try:
+            stats = await client.request({"op": "stats"})
+        except ConnectionError as e:
+            print(f"[docling] no stats: {e}")
+            stats = {"model_load_seconds": {}, "pages": 0}
+    finally:
+        await client.close()
+    return sorted(results, key=lambda r: r["fixture"]), stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Persistent Docling conversion worker.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_p = sub.add_parser("serve", help="load the models once and answer conversion jobs")
+    serve_p.add_argument("--workers", type=int, default=WORKERS)
+    serve_p.add_argument("--converter", choices=sorted(CONVERTERS), default="docling")
+    convert_p = sub.add_parser("convert", help="convert fixtures through a running server")
+    convert_p.add_argument("fixtures", nargs="*", help="fixture names (default: all)")
+    convert_p.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    convert_p.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    convert_p.add_argument("--results", type=Path, default=RESULTS_FILE)
+    convert_p.add_argument("--embedded-images", action="store_true",
+                           help="keep images base64-embedded instead of writing them to <output-dir>/assets")
+    for p in (serve_p, convert_p):
+        p.add_argument("--host", default=HOST)
+        p.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(serve(args.host, args.port, args.workers, args.converter))
+        return 0
+
+    if args.fixtures:
+        fixture_dirs = [FIXTURES_DIR / name for name in args.fixtures]
+    else:
+        fixture_dirs = sorted(d for d in FIXTURES_DIR.iterdir() if d.is_dir())
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    results, stats = asyncio.run(convert_fixtures(fixture_dirs, args.output_dir, args.host, args.port,
+                                                  args.concurrency, not args.embedded_images))
+    args.results.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    done = [r for r in results if r["status"] == "done"]
+    failed = [r for r in results if r["status"] != "done"]
+    print(f"[docling] Results: {args.results}")
+    print(f"  done:   {len(done)}/{len(results)} in {time.perf_counter() - start:.1f}s")
+    loads = ", ".join(f"{s:.2f}s" for s in stats["model_load_seconds"].values())
+    print(f"  model load (once per worker): {loads or '-'}")
+    if stats["pages"]:
+        print(f"  conversion: {stats['pages']} pages, {stats['seconds_per_page']:.3f}s/page")
+    if failed:
+        print(f"  failed: {[(r['fixture'], r['status']) for r in failed]}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+batch-convert.py — Convert many Parsr JSON files in one invocation.
+
+Replaces the per-fixture `python3 json-to-html.py` / `json-to-markdown.py` /
+`md-to-html.py` launches in convert.sh and convert-via-markdown.sh with a
+process pool: interpreter startup and imports are paid once per worker, and
+all cores are used.
+
+Usage:
+  python3 batch-convert.py [--mode html|markdown] [--workers N]
+                           [--max-tasks-per-child N] [input ...]
+
+  Each input is a directory (all *.parsr.json inside) or a manifest file
+  listing one Parsr JSON path per line. Default: ./output.
+
+  --mode html      writes output/<fixture>.html and conversion-results.json
+  --mode markdown  writes output-markdown/<fixture>.parsr.md + .html and
+                   conversion-results-markdown.json
+
+  Each result is appended to the results store (resultstore.py) as it
+  completes, under the output directory's name; the results JSON is a
+  snapshot of the run, written at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+import scriptloader
+from resultstore import ResultStore, Run, tool_name
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+JSON_SUFFIX = ".parsr.json"
+
+MODES = {
+    "html": (SCRIPT_DIR / "output", SCRIPT_DIR / "conversion-results.json"),
+    "markdown": (SCRIPT_DIR / "output-markdown", SCRIPT_DIR / "conversion-results-markdown.json"),
+}
+
+
+@dataclass
+class Job:
+    fixture: str
+    json_path: Path
+    output_dir: Path
+    mode: str
+
+
+def fixture_name(json_path: Path) -> str:
+    name = json_path.name
+    return name[: -len(JSON_SUFFIX)] if name.endswith(JSON_SUFFIX) else json_path.stem
+
+
+def collect_inputs(inputs: list[str]) -> list[Path]:
+    paths: list[Path] = []
+    for raw in inputs:
+        p = Path(raw)
+        if p.is_dir():
+            paths.extend(sorted(p.glob(f"*{JSON_SUFFIX}")))
+        else:
+            for line in p.read_text(encoding="utf-8").splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    entry = Path(line)
+                    paths.append(entry if entry.is_absolute() else p.parent / entry)
+    return paths
+
+
+def convert_html(job: Job) -> dict:
+    j2h = scriptloader.load("json-to-html")
+    out = job.output_dir / f"{job.fixture}.html"
+    out.write_text(j2h.parsr_json_to_html(str(job.json_path), job.fixture), encoding="utf-8")
+    return {"fixture": job.fixture, "status": "done", "output": str(out), "bytes": out.stat().st_size}
+
+
+def convert_markdown(job: Job) -> dict:
+    j2m = scriptloader.load("json-to-markdown")
+    m2h = scriptloader.load("md-to-html")
+    local_md = job.output_dir / f"{job.fixture}.parsr.md"
+    local_html = job.output_dir / f"{job.fixture}.html"
+
+    # Reuse Parsr's own markdown when it was fetched alongside the JSON.
+    existing_md = job.json_path.with_name(f"{job.fixture}.parsr.md")
+    if not local_md.exists() and existing_md.exists():
+        shutil.copyfile(existing_md, local_md)
+
+    # If markdown is missing or empty, recover it from the Parsr JSON. The
+    # HTML then comes from the same document model, not from re-parsing it.
+    if (not local_md.exists() or local_md.stat().st_size == 0) and job.json_path.exists():
+        md, page = j2m.json_to_markdown_and_html(job.json_path, job.fixture)
+        local_md.write_text(md, encoding="utf-8")
+        local_html.write_text(page, encoding="utf-8")
+        return {"fixture": job.fixture, "status": "done", "markdown": str(local_md), "html": str(local_html),
+                "engine": "docmodel", "bytes": local_html.stat().st_size}
+
+    if not local_md.exists() or local_md.stat().st_size == 0:
+        return {"fixture": job.fixture, "status": "no-markdown", "markdown": "", "html": "", "engine": "", "bytes": 0}
+
+    try:
+        md = local_md.read_text(encoding="utf-8", errors="replace")
+        body, engine = m2h.markdown_to_html(md, job.fixture)
+        local_html.write_text(m2h.wrap_html(body, job.fixture), encoding="utf-8")
+    except Exception:
+        return {"fixture": job.fixture, "status": "md-to-html-failed", "markdown": str(local_md),
+                "html": str(local_html), "engine": "failed", "bytes": 0}
+    return {"fixture": job.fixture, "status": "done", "markdown": str(local_md), "html": str(local_html),
+            "engine": engine, "bytes": local_html.stat().st_size}
+
+
+CONVERTERS = {"html": convert_html, "markdown": convert_markdown}
+
+
+def error_record(job: Job, error: Exception) -> dict:
+    """A conversion that raised, with the same fields as the mode's other records and its shell script's."""
+    local_html = str(job.output_dir / f"{job.fixture}.html")
+    if job.mode == "markdown":
+        fields = {"markdown": str(job.output_dir / f"{job.fixture}.parsr.md"), "html": local_html, "engine": ""}
+    else:
+        fields = {"output": local_html}
+    return {"fixture": job.fixture, "status": "conversion-error", **fields, "bytes": 0,
+            "error": f"{type(error).__name__}: {error}"}
+
+
+def convert_document(job: Job) -> dict:
+    """Worker entry point: convert one document and time it."""
+    start = time.perf_counter()
+    try:
+        record = CONVERTERS[job.mode](job)
+    except Exception as e:
+        record = error_record(job, e)
+    record["duration"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(jobs: list[Job], workers: int, max_tasks_per_child: int | None = None,
+              run: Run | None = None) -> list[dict]:
+    # Recycling workers bounds RSS on long corpora. ProcessPoolExecutor's own
+    # max_tasks_per_child can deadlock on Python 3.11 when a worker retires,
+    # so jobs run in waves of workers * N, each on a fresh pool.
+    wave = workers * max_tasks_per_child if max_tasks_per_child else max(len(jobs), 1)
+    results = []
+    for i in range(0, len(jobs), wave):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(convert_document, job): job for job in jobs[i:i + wave]}
+            for f in as_completed(futures):
+                record = f.result()
+                if record["status"] == "done":
+                    print(f"[batch] OK {record['fixture']} ({record['bytes']} bytes, {record['duration']:.3f}s)")
+                else:
+                    print(f"[batch] {record['status'].upper()} {record['fixture']}")
+                if run:
+                    run.record(record["fixture"], record["status"], data=record)
+                results.append(record)
+    results.sort(key=lambda r: r["fixture"])
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert Parsr JSON files in a process pool.")
+    parser.add_argument("inputs", nargs="*", default=[str(SCRIPT_DIR / "output")],
+                        help="directories of *.parsr.json files or manifest files")
+    parser.add_argument("--mode", choices=sorted(MODES), default="html")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-tasks-per-child", type=int, default=None,
+                        help="recycle each worker after N documents")
+    parser.add_argument("--output-dir", type=Path, default=None)
+    parser.add_argument("--results", type=Path, default=None)
+    args = parser.parse_args()
+
+    default_out, default_results = MODES[args.mode]
+    output_dir = (args.output_dir or default_out).resolve()
+    results_file = args.results or default_results
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = [Job(fixture_name(p), p.resolve(), output_dir, args.mode) for p in collect_inputs(args.inputs)]
+    store = ResultStore()
+    run = store.begin(tool_name(output_dir), "convert")
+    start = time.perf_counter()
+    try:
+        results = run_batch(jobs, args.workers, args.max_tasks_per_child, run)
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    results_file.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    done = [r for r in results if r["status"] == "done"]
+    failed = [r for r in results if r["status"] != "done"]
+    print(f"[batch] Results: {results_file} (run {run.run})")
+    print(f"  done:   {len(done)}/{len(results)} in {elapsed:.2f}s with {args.workers} workers")
+    if failed:
+        print(f"  failed: {[(r['fixture'], r['status']) for r in failed]}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+bench-stages.py — Throughput and memory benchmark for the Python stages.
+
+The fixture scores say how good the output is; this says how fast each
+stage gets there. Every stage is run over the fixtures and, where it takes
+Parsr JSON, over synthetic documents made by cycling the pages of
+SYNTHETIC_SOURCE up to a given page count:
+
+  json-to-html      parsr_json_to_html on output/*.parsr.json
+  json-to-markdown  json_to_markdown on output/*.parsr.json
+  md-to-html        markdown_to_html on output/*.parsr.md (or json_to_markdown's)
+  markdown-and-html json_to_markdown_and_html (both formats from one model)
+  pdf2json-to-html  iter_pdf2json_html on benchmark/fixtures/*/source.json
+  compare           compare_files on source.html vs output/*.html
+
+Each (stage, input set) gets `--warmup` untimed passes, then `--trials`
+timed passes. Latency is per document over all trials (median, p95);
+throughput is pages and words over the median pass time. Peak memory comes
+from one more pass under tracemalloc, kept apart so that tracing never
+slows the timed passes.
+
+Runs are stored in RESULTS_FILE keyed by git commit (with "-dirty" when
+experiments/ has uncommitted edits). Each run is checked against a
+baseline run, by default the most recent other commit: a stage whose median
+pass time grew by more than --budget fails the check and the exit status.
+
+Usage:
+  python3 bench-stages.py [--stage NAME ...] [--warmup N] [--trials N]
+                          [--synthetic-pages 100,500] [--budget 0.15]
+                          [--baseline COMMIT] [--no-save] [fixture ...]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+import scriptloader
+from resultstore import git_commit
+from wordtable import WordTable
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parents[1]
+FIXTURES_DIR = ROOT / "benchmark" / "fixtures"
+PARSR_OUTPUT = SCRIPT_DIR / "output"
+PDF2JSON_DIR = SCRIPT_DIR.parent / "pdf2json"
+RESULTS_FILE = SCRIPT_DIR / "bench-results.json"
+
+SYNTHETIC_SOURCE = "50-comprehensive-mixed"  # longest fixture; its pages are cycled
+WARMUP = 1
+TRIALS = 5
+BUDGET = 0.15  # fraction: allowed growth of a stage's median pass time
+
+
+@dataclass
+class BenchInput:
+    name: str
+    pages: int
+    words: int
+    payload: object
+
+
+@dataclass
+class BenchStage:
+    name: str
+    run: Callable[[object], object]
+    fixture_inputs: Callable[[list[str]], list[BenchInput]]
+    # Scaled input of n pages, for stages that read Parsr JSON.
+    synthetic_input: Callable[[int, Path], BenchInput] | None = None
+
+
+# ── Inputs ──────────────────────────────────────────────────────────────────
+
+def parsr_size(path: Path) -> tuple[int, int]:
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    pages = doc.get("pages", [])
+    return len(pages), sum(len(WordTable.from_page(p)) for p in pages)
+
+
+def parsr_inputs(fixtures: list[str], payload: Callable[[str, Path], object],
+                 suffix: str = ".parsr.json") -> list[BenchInput]:
+    inputs = []
+    for fixture in fixtures:
+        json_path = PARSR_OUTPUT / f"{fixture}.parsr.json"
+        path = PARSR_OUTPUT / f"{fixture}{suffix}"
+        if json_path.exists() and path.exists():
+            inputs.append(BenchInput(fixture, *parsr_size(json_path), payload(fixture, path)))
+    return inputs
+
+
+def markdown_of(fixture: str, md_path: Path) -> tuple[str, str]:
+    """Parsr's markdown, or the markdown recovered from the JSON when it is empty (as run-pipeline.py does)."""
+    md = md_path.read_text(encoding="utf-8", errors="replace")
+    if not md.strip():
+        md = scriptloader.load("json-to-markdown").json_to_markdown(PARSR_OUTPUT / f"{fixture}.parsr.json")
+    return fixture, md
+
+
+def synthetic_parsr(pages: int, work_dir: Path) -> BenchInput:
+    """A Parsr document of `pages` pages cycled from SYNTHETIC_SOURCE (written once per size)."""
+    path = work_dir / f"synthetic-{pages}.parsr.json"
+    source = json.loads((PARSR_OUTPUT / f"{SYNTHETIC_SOURCE}.parsr.json").read_text(encoding="utf-8"))
+    if not path.exists():
+        doc = dict(source)
+        doc["pages"] = [dict(p, pageNumber=n + 1) for n, p in
+                        zip(range(pages), itertools.cycle(source["pages"]))]
+        path.write_text(json.dumps(doc), encoding="utf-8")
+    per_page = [len(WordTable.from_page(p)) for p in source["pages"]]
+    words = sum(w for _, w in zip(range(pages), itertools.cycle(per_page)))
+    return BenchInput(f"synthetic-{pages}", pages, words, (f"synthetic-{pages}", path))
+
+
+def synthetic_markdown(pages: int, work_dir: Path) -> BenchInput:
+    doc = synthetic_parsr(pages, work_dir)
+    md = scriptloader.load("json-to-markdown").json_to_markdown(doc.payload[1])
+    return BenchInput(doc.name, doc.pages, doc.words, (doc.name, md))
+
+
+def pdf2json_inputs(fixtures: list[str]) -> list[BenchInput]:
+    reader = scriptloader.load("pdf2json-to-html", PDF2JSON_DIR)
+    inputs = []
+    for fixture in fixtures:
+        path = FIXTURES_DIR / fixture / "source.json"
+        if not path.exists():
+            continue
+        styles = reader.StyleTable()
+        pages = list(reader.jsonstream.iter_pages(path, key="Pages"))
+        words = sum(len(reader.page_words(p, styles, i)) for i, p in enumerate(pages))
+        inputs.append(BenchInput(fixture, len(pages), words, (fixture, path)))
+    return inputs
+
+
+def compare_inputs(fixtures: list[str]) -> list[BenchInput]:
+    return [i for i in parsr_inputs(fixtures, lambda f, p: (f, FIXTURES_DIR / f / "source.html", p), ".html")
+            if i.payload[1].exists()]
+
+
+# ── Stages ──────────────────────────────────────────────────────────────────
+
+def run_json_to_html(payload) -> str:
+    fixture, path = payload
+    return scriptloader.load("json-to-html").parsr_json_to_html(str(path), fixture)
+
+
+def run_json_to_markdown(payload) -> str:
+    return scriptloader.load("json-to-markdown").json_to_markdown(payload[1])
+
+
+def run_markdown_and_html(payload) -> tuple[str, str]:
+    fixture, path = payload
+    return scriptloader.load("json-to-markdown").json_to_markdown_and_html(path, fixture)
+
+
+def run_md_to_html(payload) -> str:
+    fixture, md = payload
+    return scriptloader.load("md-to-html").markdown_to_html(md, fixture)[0]
+
+
+def run_pdf2json_to_html(payload) -> str:
+    fixture, path = payload
+    return "".join(scriptloader.load("pdf2json-to-html", PDF2JSON_DIR).iter_pdf2json_html(path, fixture))
+
+
+def run_compare(payload):
+    return scriptloader.load("compare-with-subagents").compare_files(*payload)
+
+
+STAGES = [
+    BenchStage("json-to-html", run_json_to_html,
+               lambda fixtures: parsr_inputs(fixtures, lambda f, p: (f, p)), synthetic_parsr),
+    BenchStage("json-to-markdown", run_json_to_markdown,
+               lambda fixtures: parsr_inputs(fixtures, lambda f, p: (f, p)), synthetic_parsr),
+    BenchStage("md-to-html", run_md_to_html,
+               lambda fixtures: parsr_inputs(fixtures, markdown_of, ".parsr.md"),
+               synthetic_markdown),
+    BenchStage("markdown-and-html", run_markdown_and_html,
+               lambda fixtures: parsr_inputs(fixtures, lambda f, p: (f, p)), synthetic_parsr),
+    BenchStage("pdf2json-to-html", run_pdf2json_to_html, pdf2json_inputs),
+    BenchStage("compare", run_compare, compare_inputs),
+]
+BY_NAME = {s.name: s for s in STAGES}
+
+
+# ── Measurement ─────────────────────────────────────────────────────────────
+
+def measure(stage: BenchStage, inputs: list[BenchInput], warmup: int, trials: int) -> dict:
+    for _ in range(warmup):
+        for item in inputs:
+            stage.run(item.payload)
+
+    latencies: list[float] = []
+    passes: list[float] = []
+    for _ in range(trials):
+        gc.collect()
+        pass_start = time.perf_counter()
+        for item in inputs:
+            start = time.perf_counter()
+            stage.run(item.payload)
+            latencies.append(time.perf_counter() - start)
+        passes.append(time.perf_counter() - pass_start)
+
+    peak = 0
+    for item in inputs:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            stage.run(item.payload)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    pass_time = float(np.median(passes))
+    pages = sum(i.pages for i in inputs)
+    words = sum(i.words for i in inputs)
+    return {
+        "documents": len(inputs),
+        "pages": pages,
+        "words": words,
+        "pass_seconds": round(pass_time, 5),
+        "latency_median_ms": round(float(np.median(latencies)) * 1000, 3),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "pages_per_second": round(pages / pass_time, 1) if pass_time else None,
+        "words_per_second": round(words / pass_time, 1) if pass_time else None,
+        "peak_memory_mb": round(peak / 2**20, 3),
+    }
+
+
+# ── Results ─────────────────────────────────────────────────────────────────
+
+def load_results(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def pick_baseline(results: dict, commit: str, requested: str | None) -> tuple[str, dict] | None:
+    if requested:
+        matches = [k for k in results if k.startswith(requested)]
+        return (matches[0], results[matches[0]]) if matches else None
+    earlier = sorted(((run["timestamp"], key) for key, run in results.items() if key != commit), reverse=True)
+    return (earlier[0][1], results[earlier[0][1]]) if earlier else None
+
+
+def regressions(current: dict, baseline: dict, budget: float) -> list[str]:
+    found = []
+    for stage, sets in current.items():
+        for set_name, stats in sets.items():
+            before = baseline.get(stage, {}).get(set_name)
+            if not before or not before.get("pass_seconds"):
+                continue
+            growth = stats["pass_seconds"] / before["pass_seconds"] - 1
+            if growth > budget:
+                found.append(f"{stage} [{set_name}]: {before['pass_seconds']:.4f}s → "
+                             f"{stats['pass_seconds']:.4f}s ({growth:+.0%}, budget {budget:.0%})")
+    return found
+
+
+def report(stages: dict) -> None:
+    print(f"[bench] {'stage':17s} {'set':15s} {'docs':>4s} {'median':>9s} {'p95':>9s} "
+          f"{'pages/s':>9s} {'words/s':>10s} {'peak MB':>8s}")
+    for stage, sets in stages.items():
+        for set_name, s in sets.items():
+            print(f"[bench] {stage:17s} {set_name:15s} {s['documents']:4d} {s['latency_median_ms']:7.2f}ms "
+                  f"{s['latency_p95_ms']:7.2f}ms {s['pages_per_second']:9.1f} {s['words_per_second']:10.0f} "
+                  f"{s['peak_memory_mb']:8.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the conversion stages.")
+    parser.add_argument("fixtures", nargs="*", help="fixture names (default: all)")
+    parser.add_argument("--stage", action="append", choices=[s.name for s in STAGES],
+                        help="stage to benchmark; repeatable (default: all)")
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--synthetic-pages", default="100,500",
+                        help="comma-separated page counts of the synthetic documents ('' for none)")
+    parser.add_argument("--budget", type=float, default=BUDGET,
+                        help="allowed slowdown of a stage's median pass vs the baseline (0.15 = 15%%)")
+    parser.add_argument("--baseline", help="commit to compare against (default: most recent other run)")
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE)
+    parser.add_argument("--no-save", dest="save", action="store_false", help="do not record this run")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(d.name for d in FIXTURES_DIR.iterdir() if d.is_dir())
+    sizes = [int(n) for n in args.synthetic_pages.split(",") if n.strip()]
+    stages: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as work:
+        for stage in [BY_NAME[n] for n in args.stage] if args.stage else STAGES:
+            sets = {"fixtures": stage.fixture_inputs(fixtures)}
+            if stage.synthetic_input:
+                for n in sizes:
+                    sets[f"synthetic-{n}"] = [stage.synthetic_input(n, Path(work))]
+            stages[stage.name] = {}
+            for set_name, inputs in sets.items():
+                if inputs:
+                    stages[stage.name][set_name] = measure(stage, inputs, args.warmup, args.trials)
+                    print(f"[bench] {stage.name} [{set_name}] {stages[stage.name][set_name]['pass_seconds']:.4f}s/pass")
+    report(stages)
+
+    commit = git_commit()
+    results = load_results(args.results)
+    baseline = pick_baseline(results, commit, args.baseline)
+    if args.save:
+        results[commit] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "warmup": args.warmup,
+            "trials": args.trials,
+            "stages": stages,
+        }
+        args.results.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"[bench] Results: {args.results} ({commit})")
+
+    if baseline is None:
+        print("[bench] no baseline run to compare against")
+        return 0
+    found = regressions(stages, baseline[1]["stages"], args.budget)
+    print(f"[bench] baseline {baseline[0]}: {len(found)} regression(s)")
+    for line in found:
+        print(f"[bench] REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
 """Compare generated HTML vs source fixture HTML using parallel 'subagent' workers."""
 from __future__ import annotations
+import argparse
 import json
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, asdict
-from difflib import SequenceMatcher
+from functools import partial
 from pathlib import Path
 
+import tracing
+from resultstore import EXPERIMENTS_DIR, ResultStore
+from htmlfeatures import cached_features, extract_features, extract_file
+from similarity import BACKENDS, text_similarity
+from treedist import tree_similarity
+
 ROOT = Path(__file__).resolve().parents[2]
 FIXTURES = ROOT / "benchmark" / "fixtures"
 GENERATED = ROOT / "experiments" / "parsr" / "output-markdown"
 OUT = ROOT / "experiments" / "parsr" / "markdown-compare-results.json"
+CALIBRATION_OUT = ROOT / "experiments" / "parsr" / "similarity-calibration.json"
+CALIBRATION_EXACT_MAX_CHARS = 16_000  # the exact reference is quadratic; skip longer pairs
 
 
 @dataclass
@@ -20,42 +29,41 @@ class Comparison:
     status: str
     text_similarity: float
     tag_similarity: float
+    tree_similarity: float
     overall_score: float
     notes: str
 
 
 def strip_html(html: str) -> str:
-    text = re.sub(r"<script[\s\S]*?</script>", " ", html, flags=re.I)
-    text = re.sub(r"<style[\s\S]*?</style>", " ", text, flags=re.I)
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return extract_features(html).text
 
 
 def tag_histogram(html: str) -> dict[str, int]:
-    tags = re.findall(r"<\s*([a-zA-Z0-9]+)(?:\s|>)", html)
-    hist: dict[str, int] = {}
-    for t in tags:
-        t = t.lower()
-        hist[t] = hist.get(t, 0) + 1
-    return hist
+    return extract_features(html).tags
 
 
-def compare_fixture(fixture_dir: Path) -> Comparison:
+def compare_fixture(fixture_dir: Path, generated: Path = GENERATED, backend: str = "auto") -> Comparison:
     fixture = fixture_dir.name
     src = fixture_dir / "source.html"
-    gen = GENERATED / f"{fixture}.html"
+    gen = generated / f"{fixture}.html"
     if not src.exists() or not gen.exists():
-        return Comparison(fixture, "missing", 0.0, 0.0, 0.0, "Missing source or generated HTML")
+        return Comparison(fixture, "missing", 0.0, 0.0, 0.0, 0.0, "Missing source or generated HTML")
+    return compare_files(fixture, src, gen, backend)
+
 
-    s_html = src.read_text(encoding="utf-8", errors="replace")
-    g_html = gen.read_text(encoding="utf-8", errors="replace")
+def compare_files(fixture: str, src: Path, gen: Path, backend: str = "auto") -> Comparison:
+    # Fixture sources never change: their features come from the disk cache.
+    with tracing.span("source-features", fixture=fixture):
+        s_feat = cached_features(src)
+    with tracing.span("generated-features", fixture=fixture):
+        g_feat = extract_file(gen)
+    tracing.count("chars", len(s_feat.text) + len(g_feat.text))
 
-    s_text, g_text = strip_html(s_html), strip_html(g_html)
-    text_sim = SequenceMatcher(None, s_text, g_text).ratio()
+    with tracing.span("text-similarity", fixture=fixture, backend=backend):
+        text_sim = text_similarity(s_feat.text, g_feat.text, backend)
 
-    s_hist = tag_histogram(s_html)
-    g_hist = tag_histogram(g_html)
+    s_hist = s_feat.tags
+    g_hist = g_feat.tags
     keys = set(s_hist) | set(g_hist)
     if keys:
         max_sum = sum(max(s_hist.get(k, 0), g_hist.get(k, 0)) for k in keys)
@@ -64,28 +72,113 @@ def compare_fixture(fixture_dir: Path) -> Comparison:
     else:
         tag_sim = 1.0
 
+    # Nesting and order, which the histogram cannot see.
+    with tracing.span("tree-similarity", fixture=fixture):
+        tree_sim = tree_similarity(s_feat.outline, g_feat.outline)
+
     overall = (0.7 * text_sim) + (0.3 * tag_sim)
     notes = ""
     if text_sim < 0.5:
         notes += "low-text-sim;"
     if tag_sim < 0.3:
         notes += "low-structure-sim;"
+    if tree_sim < 0.3:
+        notes += "low-tree-sim;"
     if not notes:
         notes = "ok"
-    return Comparison(fixture, "compared", round(text_sim, 4), round(tag_sim, 4), round(overall, 4), notes)
+    return Comparison(fixture, "compared", round(text_sim, 4), round(tag_sim, 4), round(tree_sim, 4),
+                      round(overall, 4), notes)
+
+
+def calibrate_fixture(fixture_dir: Path, generated: Path, backends: list[str]) -> dict | None:
+    """Score one fixture with every backend (exact only where affordable)."""
+    src = fixture_dir / "source.html"
+    gen = generated / f"{fixture_dir.name}.html"
+    if not src.exists() or not gen.exists():
+        return None
+    s_text = cached_features(src).text
+    g_text = extract_file(gen).text
+    row = {"fixture": fixture_dir.name, "chars": len(s_text) + len(g_text)}
+    for name in backends:
+        if name == "exact" and row["chars"] > CALIBRATION_EXACT_MAX_CHARS:
+            row[name] = None
+            continue
+        row[name] = round(text_similarity(s_text, g_text, name), 4)
+    return row
+
+
+def calibrate(fixture_dirs: list[Path], generated: Path, workers: int) -> int:
+    """Report how far each backend lands from the legacy and exact scores."""
+    backends = ["legacy", "exact", "token", "minhash", "auto"]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = [r for r in pool.map(partial(calibrate_fixture, generated=generated, backends=backends), fixture_dirs) if r]
+    rows.sort(key=lambda r: r["fixture"])
+
+    summary = {}
+    for name in ("token", "minhash", "auto"):
+        for ref in ("legacy", "exact"):
+            diffs = [abs(r[name] - r[ref]) for r in rows if r[ref] is not None]
+            if diffs:
+                summary[f"{name}_vs_{ref}"] = {
+                    "mean_abs_diff": round(sum(diffs) / len(diffs), 4),
+                    "max_abs_diff": round(max(diffs), 4),
+                    "fixtures": len(diffs),
+                }
+    CALIBRATION_OUT.write_text(json.dumps({"generated": generated.name, "summary": summary, "fixtures": rows}, indent=2),
+                               encoding="utf-8")
+    for key, stats in summary.items():
+        print(f"{key:20s} mean|Δ|={stats['mean_abs_diff']:.4f} max|Δ|={stats['max_abs_diff']:.4f} (n={stats['fixtures']})")
+    print(f"Calibration written to {CALIBRATION_OUT}")
+    return 0
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare generated HTML against the fixture sources.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="auto", help="text similarity backend")
+    parser.add_argument("--generated", type=Path, default=GENERATED, help="directory of <fixture>.html outputs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--calibrate", action="store_true",
+                        help="score every fixture with all backends and write a calibration report")
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace of the comparisons (runs in-process)")
+    parser.add_argument("--tool", default=None,
+                        help="name in the results store (default: the --generated directory under experiments/)")
+    parser.add_argument("--min-tree-similarity", type=float, default=None, metavar="SCORE",
+                        help="exit 1 if any compared fixture's tree similarity is below SCORE")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable(args.trace)
+
     fixture_dirs = sorted([p for p in FIXTURES.iterdir() if p.is_dir()])
+    if args.calibrate:
+        return calibrate(fixture_dirs, args.generated, args.workers)
     results: list[Comparison] = []
-
-    # Parallel 'subagents': each worker evaluates one fixture independently.
-    with ThreadPoolExecutor(max_workers=8) as pool:
-        futures = {pool.submit(compare_fixture, d): d.name for d in fixture_dirs}
-        for f in as_completed(futures):
-            result = f.result()
-            print(f"[subagent:{result.fixture}] {result.status} score={result.overall_score}")
-            results.append(result)
+    generated = args.generated.resolve()
+    tool = args.tool or (generated.relative_to(EXPERIMENTS_DIR).as_posix()
+                         if generated.is_relative_to(EXPERIMENTS_DIR) else generated.name)
+    store = ResultStore()
+    run = store.begin(tool, "compare")
+
+    def report(result: Comparison) -> None:
+        print(f"[subagent:{result.fixture}] {result.status} score={result.overall_score}")
+        fields = asdict(result)
+        del fields["fixture"], fields["status"]
+        run.record(result.fixture, result.status,
+                   result.overall_score if result.status == "compared" else None, fields)
+        results.append(result)
+
+    if tracing.enabled():
+        # Spans are recorded per process, so trace in this one.
+        for d in fixture_dirs:
+            with tracing.span("compare", fixture=d.name):
+                result = compare_fixture(d, args.generated, args.backend)
+            report(result)
+    else:
+        # Parallel 'subagents': each worker process evaluates one fixture independently.
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(compare_fixture, d, args.generated, args.backend): d.name for d in fixture_dirs}
+            for f in as_completed(futures):
+                report(f.result())
+    store.close()
 
     results.sort(key=lambda r: r.fixture)
     payload = [asdict(r) for r in results]
@@ -93,8 +186,16 @@ def main() -> int:
 
     done = [r for r in results if r.status == "compared"]
     avg = sum(r.overall_score for r in done) / len(done) if done else 0.0
-    print(f"Compared: {len(done)}/{len(results)}")
+    print(f"Compared: {len(done)}/{len(results)} (run {run.run})")
     print(f"Average overall score: {avg:.4f}")
+    if done:
+        print(f"Average tree similarity: {sum(r.tree_similarity for r in done) / len(done):.4f}")
+    if args.min_tree_similarity is not None:
+        below = [r for r in done if r.tree_similarity < args.min_tree_similarity]
+        for r in below:
+            print(f"[gate] {r.fixture}: tree similarity {r.tree_similarity} < {args.min_tree_similarity}")
+        if below:
+            return 1
     return 0
 
 
@@ -1,5 +1,7 @@
 #!/usr/bin/env bash
 # PDF -> Parsr markdown -> HTML (without using Parsr JSON in conversion)
+# To rebuild output-markdown/ from existing Parsr output without Docker, use
+#   python3 batch-convert.py --mode markdown
 set -euo pipefail
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
@@ -10,9 +12,11 @@ PARSR_URL="http://localhost:3001"
 RESULTS_FILE="$SCRIPT_DIR/conversion-results-markdown.json"
 EXISTING_MD_DIR="$SCRIPT_DIR/output"
 EXISTING_JSON_DIR="$SCRIPT_DIR/output"
+# Results are appended to the results store as they come; RESULTS_FILE is
+# exported from the run at the end.
+RESULTS_CLI="$SCRIPT_DIR/results-db.py"
 
 mkdir -p "$OUTPUT_DIR"
-echo "[]" > "$RESULTS_FILE"
 
 HAVE_DOCKER=true
 if ! command -v docker >/dev/null 2>&1; then
@@ -34,15 +38,11 @@ if [ "$HAVE_DOCKER" = true ]; then
   fi
 fi
 
+RUN_ID=$(python3 "$RESULTS_CLI" begin --tool parsr/output-markdown --metric convert)
+
 append_result() {
-  python3 - <<PY
-import json
-from pathlib import Path
-p=Path("$RESULTS_FILE")
-rows=json.loads(p.read_text())
-rows.append({"fixture":"$1","status":"$2","markdown":"$3","html":"$4","engine":"$5","bytes":$6})
-p.write_text(json.dumps(rows,indent=2))
-PY
+  python3 "$RESULTS_CLI" record "$RUN_ID" "$1" "$2" \
+    --data "{\"markdown\": \"$3\", \"html\": \"$4\", \"engine\": \"$5\", \"bytes\": $6}"
 }
 
 convert_from_markdown() {
@@ -100,9 +100,15 @@ convert_one() {
     cp "$EXISTING_MD_DIR/${fixture}.parsr.md" "$local_md"
   fi
 
-  # If markdown is missing or empty, recover markdown from existing Parsr JSON.
+  # If markdown is missing or empty, recover markdown and HTML from existing
+  # Parsr JSON in one pass (docmodel.py), without a Markdown engine.
   if [ ! -s "$local_md" ] && [ -f "$EXISTING_JSON_DIR/${fixture}.parsr.json" ]; then
-    python3 "$SCRIPT_DIR/json-to-markdown.py" "$EXISTING_JSON_DIR/${fixture}.parsr.json" "$local_md" || true
+    local local_html="$OUTPUT_DIR/${fixture}.html"
+    if python3 "$SCRIPT_DIR/json-to-markdown.py" --html "$local_html" \
+        "$EXISTING_JSON_DIR/${fixture}.parsr.json" "$local_md" && [ -s "$local_md" ]; then
+      append_result "$fixture" "done" "$local_md" "$local_html" "docmodel" "$(wc -c < "$local_html")"
+      return
+    fi
   fi
 
   if [ ! -s "$local_md" ]; then
@@ -119,4 +125,5 @@ else
   for d in "$FIXTURES_DIR"/*/; do convert_one "$d"; done
 fi
 
-echo "[parsr-md] done -> $RESULTS_FILE"
+python3 "$RESULTS_CLI" export "$RUN_ID" > "$RESULTS_FILE"
+echo "[parsr-md] done -> $RESULTS_FILE (run $RUN_ID)"
@@ -3,7 +3,13 @@
 # Usage: ./convert.sh [fixture-name]
 #   With no argument: converts all 50 fixtures.
 #   With argument: converts only that fixture (e.g. 01-basic-paragraphs).
-# Requires: Docker (axarev/parsr image), curl, python3
+# Requires: Docker (axarev/parsr image), curl, python3 (with numpy)
+#
+# To re-run only the JSON -> HTML step over already-downloaded Parsr JSON,
+# use batch-convert.py, which converts the whole corpus in a process pool.
+# parsr-client.py does the whole run (submit, poll, download, convert) with
+# several jobs in flight over the Parsr HTTP API. run-pipeline.py reruns
+# only the stages whose inputs or scripts changed (content-addressed cache).
 
 set -euo pipefail
 
@@ -13,6 +19,9 @@ OUTPUT_DIR="$SCRIPT_DIR/output"
 CONFIG="$SCRIPT_DIR/parsr-config.json"
 PARSR_URL="http://localhost:3001"
 RESULTS_FILE="$SCRIPT_DIR/conversion-results.json"
+# Results are appended to the results store as they come; RESULTS_FILE is
+# exported from the run at the end.
+RESULTS_CLI="$SCRIPT_DIR/results-db.py"
 
 mkdir -p "$OUTPUT_DIR"
 
@@ -56,7 +65,7 @@ else
   FIXTURE_DIRS=("$FIXTURES_DIR"/*/)
 fi
 
-echo "[]" > "$RESULTS_FILE"
+RUN_ID=$(python3 "$RESULTS_CLI" begin --tool parsr/output --metric convert)
 
 # ── Submit a PDF and wait for result ────────────────────────────────────────
 convert_one() {
@@ -161,12 +170,8 @@ append_result() {
   local status="$2"
   local output="$3"
   local bytes="$4"
-  python3 -c "
-import json
-results = json.load(open('$RESULTS_FILE'))
-results.append({'fixture': '$fixture', 'status': '$status', 'output': '$output', 'bytes': $bytes})
-json.dump(results, open('$RESULTS_FILE','w'), indent=2)
-"
+  python3 "$RESULTS_CLI" record "$RUN_ID" "$fixture" "$status" \
+    --data "{\"output\": \"$output\", \"bytes\": $bytes}"
 }
 
 # ── Main loop ───────────────────────────────────────────────────────────────
@@ -177,8 +182,9 @@ done
 
 echo ""
 echo "[parsr] ══════════════════════════════════════════"
+python3 "$RESULTS_CLI" export "$RUN_ID" > "$RESULTS_FILE"
 echo "[parsr] Conversion complete."
-echo "[parsr] Results: $RESULTS_FILE"
+echo "[parsr] Results: $RESULTS_FILE (run $RUN_ID)"
 
 # Summary
 python3 -c "
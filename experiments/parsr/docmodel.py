@@ -0,0 +1,264 @@
+"""
+In-memory document model shared by the Markdown and HTML renderers.
+
+The markdown path used to write Markdown text out of json-to-markdown.py
+and have md-to-html.py parse it again with an external engine, losing the
+inline styles and the column regions on the way. Here a document is laid
+out once into
+
+  Document → Page → Region → Block → Line → Run
+
+where a region is a column region found by xycut.py, a block is a heading,
+a paragraph or a list, and a run is a stretch of a line in one style
+(json-to-html's BOLD / ITALIC / UNDERLINE bitmask). Both renderers are
+tree walks over it:
+
+  to_markdown(doc)  the Markdown json_to_markdown has always produced;
+                    emphasis=True adds **bold** and _italic_ markers
+  to_html(doc)      an HTML body with the same headings and paragraphs,
+                    lists as <ul>/<ol>, and inline styles kept
+
+Block kinds use the Markdown thresholds (json-to-markdown.py's), not
+json-to-html's, so the HTML matches what an engine made of the Markdown.
+"""
+from __future__ import annotations
+
+import html as htmllib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+import scriptloader
+import tracing
+import wordstore
+from wordtable import PageLayout, WordTable
+
+DEFAULT_SIZE = 12  # pt, body size when no word has one
+# (size ratio to the page body, heading level), largest first
+HEADING_RATIOS = ((2.0, 1), (1.6, 2), (1.35, 3))
+
+_LIST_ITEM = re.compile(r"^(?:[-*•◦‣]|\d+[.)])\s+")
+_MARKER = re.compile(r"^(?:[-*•◦‣]|\d+[.)])$")
+_SPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Run:
+    text: str
+    style: int = 0
+
+
+@dataclass
+class Line:
+    runs: list[Run]
+
+    @property
+    def text(self) -> str:
+        return " ".join(r.text for r in self.runs)
+
+
+@dataclass
+class Block:
+    kind: str          # "heading", "paragraph" or "list"
+    lines: list[Line]
+    level: int = 0     # heading level, 1 to 3
+    size_ratio: float = 1.0
+
+    @property
+    def text(self) -> str:
+        return " ".join(line.text for line in self.lines)
+
+
+@dataclass
+class Region:
+    blocks: list[Block] = field(default_factory=list)
+
+
+@dataclass
+class Page:
+    number: int
+    regions: list[Region] = field(default_factory=list)
+
+    def blocks(self) -> Iterable[Block]:
+        for region in self.regions:
+            yield from region.blocks
+
+
+@dataclass
+class Document:
+    title: str
+    pages: list[Page] = field(default_factory=list)
+
+
+# ── Building ────────────────────────────────────────────────────────────────
+
+def looks_list_item(text: str) -> bool:
+    return bool(_LIST_ITEM.match(text))
+
+
+def line_runs(line: np.ndarray, words: WordTable, styles: np.ndarray) -> list[Run]:
+    """Runs of one line (word indices, left to right), whitespace collapsed."""
+    if not len(line):
+        return []
+    content = words.content
+    style = styles[line]
+    bounds = (np.flatnonzero(style[1:] != style[:-1]) + 1).tolist()
+    order = line.tolist()
+    runs = []
+    for a, b in zip([0] + bounds, bounds + [len(order)]):
+        text = _SPACE.sub(" ", " ".join([content[i] for i in order[a:b]])).strip()
+        if text:
+            runs.append(Run(text, int(style[a])))
+    return runs
+
+
+def build_block(lines: list[Line], ratio: float) -> Block:
+    if looks_list_item(lines[0].text):
+        return Block("list", lines, size_ratio=ratio)
+    for threshold, level in HEADING_RATIOS:
+        if ratio >= threshold:
+            return Block("heading", lines, level, ratio)
+    return Block("paragraph", lines, size_ratio=ratio)
+
+
+def build_page(table: WordTable, fonts: dict, number: int = 0) -> Page:
+    """Lay out one page and group it into regions, blocks, lines and runs."""
+    style_masks = scriptloader.load("json-to-html").style_masks
+    page = Page(number)
+    with tracing.span("layout"):
+        layout = PageLayout.build(table)
+    words = layout.words
+    if not len(words):
+        return page
+    with tracing.span("baseline"):
+        baseline = layout.baseline_size(DEFAULT_SIZE)
+    with tracing.span("model"):
+        styles = style_masks(fonts, words.font)
+        sizes = words.sizes(baseline)
+        page.regions = [Region() for _ in layout.region_starts]
+        for start, block in zip(layout.block_starts.tolist(), layout.blocks()):
+            lines = [Line(runs) for runs in (line_runs(l, words, styles) for l in block) if runs]
+            if not lines:
+                continue
+            block_words = np.concatenate(block)
+            avg = sizes[block_words].sum() / len(block_words)
+            region = int(np.searchsorted(layout.region_starts, start, side="right")) - 1
+            page.regions[region].blocks.append(build_block(lines, avg / baseline if baseline else 1))
+    return page
+
+
+def build_document(tables: Iterable[WordTable], fonts: dict, title: str = "") -> Document:
+    doc = Document(title)
+    for number, table in enumerate(tables):
+        with tracing.span("page", page=number):
+            tracing.count("words", len(table))
+            doc.pages.append(build_page(table, fonts, number))
+    return doc
+
+
+def load_document(path: Path, title: str | None = None) -> Document:
+    """Build the model of Parsr JSON or of a word store (pack-words.py)."""
+    title = title if title is not None else path.stem
+    if wordstore.is_word_store(path):
+        with tracing.span("store-open"):
+            store = wordstore.WordStore(path)
+        return build_document(store.pages(), store.fonts, title)
+    with tracing.span("json-load"):
+        doc = json.loads(path.read_text(encoding="utf-8", errors="replace"))
+    fonts = {f["id"]: f for f in doc.get("fonts", [])}
+    return build_document((WordTable.from_page(p, i) for i, p in enumerate(doc.get("pages", []))), fonts, title)
+
+
+# ── Markdown ────────────────────────────────────────────────────────────────
+
+MD_STYLES = ((1, "**"), (2, "_"))  # BOLD, ITALIC; Markdown has no underline
+
+
+def md_line(line: Line, emphasis: bool) -> str:
+    if not emphasis:
+        return line.text
+    parts = []
+    for run in line.runs:
+        marks = "".join(mark for bit, mark in MD_STYLES if run.style & bit)
+        parts.append(f"{marks}{run.text}{marks[::-1]}")
+    return " ".join(parts)
+
+
+def block_to_markdown(block: Block, emphasis: bool = False) -> str:
+    if block.kind == "list":
+        return "\n".join(md_line(line, emphasis) for line in block.lines)
+    text = " ".join(md_line(line, emphasis) for line in block.lines)
+    if block.kind == "heading":
+        return f"{'#' * block.level} {text}"
+    return text
+
+
+def to_markdown(doc: Document, emphasis: bool = False) -> str:
+    out = []
+    with tracing.span("render-markdown"):
+        for page in doc.pages:
+            if not page.regions:
+                continue
+            out.extend(block_to_markdown(b, emphasis) for b in page.blocks())
+            out.append("")
+    return "\n\n".join(out).strip() + "\n"
+
+
+# ── HTML ────────────────────────────────────────────────────────────────────
+
+def html_runs(runs: list[Run]) -> str:
+    """Runs as inline HTML; neighbours in the same style share one set of tags."""
+    style_tags = scriptloader.load("json-to-html").STYLE_TAGS
+    out = []
+    merged: list[Run] = []
+    for run in runs:
+        if merged and merged[-1].style == run.style:
+            merged[-1] = Run(f"{merged[-1].text} {run.text}", run.style)
+        else:
+            merged.append(run)
+    for k, run in enumerate(merged):
+        if k:
+            out.append(" ")
+        tags = [tag for bit, tag in style_tags if run.style & bit]
+        out.extend(f"<{tag}>" for tag in tags)
+        out.append(htmllib.escape(run.text))
+        out.extend(f"</{tag}>" for tag in reversed(tags))
+    return "".join(out)
+
+
+def list_items(block: Block) -> list[list[Run]]:
+    """Runs of each item, markers removed; lines without a marker continue the item above."""
+    items: list[list[Run]] = []
+    for line in block.lines:
+        runs = list(line.runs)
+        match = _LIST_ITEM.match(runs[0].text)
+        if match:
+            runs[0] = Run(runs[0].text[match.end():], runs[0].style)
+        elif _MARKER.match(runs[0].text) and len(runs) > 1:
+            runs = runs[1:]  # a marker styled apart from its text
+        elif items:
+            items[-1].extend(runs)
+            continue
+        items.append([r for r in runs if r.text])
+    return items
+
+
+def block_to_html(block: Block) -> str:
+    if block.kind == "list":
+        tag = "ol" if block.lines[0].text[0].isdigit() else "ul"
+        items = "".join(f"<li>{html_runs(runs)}</li>\n" for runs in list_items(block))
+        return f"<{tag}>\n{items}</{tag}>\n"
+    runs = [run for line in block.lines for run in line.runs]
+    if block.kind == "heading":
+        return f"<h{block.level}>{html_runs(runs)}</h{block.level}>\n"
+    return f"<p>{html_runs(runs)}</p>\n"
+
+
+def to_html(doc: Document) -> str:
+    """The HTML body of the document (md-to-html.py's wrap_html makes it a page)."""
+    with tracing.span("render-html"):
+        return "".join(block_to_html(b) for page in doc.pages for b in page.blocks())
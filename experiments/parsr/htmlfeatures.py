@@ -0,0 +1,141 @@
+"""
+Single-pass HTML feature extraction with an on-disk cache for fixtures.
+
+One `html.parser` pass yields everything the comparison scripts need:
+
+- text:    visible text (script/style dropped, every tag acts as a word
+           break, entities decoded, whitespace collapsed),
+- tags:    histogram of start tags,
+- outline: preorder list of (depth, tag) for structural elements, enough to
+           rebuild a skeleton tree of headings, lists, tables, etc.
+
+The benchmark sources never change between runs, so their features are
+cached under CACHE_DIR keyed by a hash of the file content and
+EXTRACTOR_VERSION. Only the generated side is parsed on every comparison.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = ROOT / "experiments" / ".cache" / "html-features"
+EXTRACTOR_VERSION = "1"
+CHUNK_SIZE = 1 << 16
+
+SKIP_CONTENT = {"script", "style"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+STRUCTURAL_TAGS = {
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption",
+    "blockquote", "pre", "figure", "figcaption", "img", "hr",
+    "header", "footer", "section", "article", "aside", "nav", "main",
+}
+
+
+@dataclass
+class HtmlFeatures:
+    text: str
+    tags: dict[str, int] = field(default_factory=dict)
+    outline: list[tuple[int, str]] = field(default_factory=list)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "HtmlFeatures":
+        return cls(data["text"], data["tags"], [tuple(e) for e in data["outline"]])
+
+
+class _FeatureParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces: list[str] = []
+        self.tags: dict[str, int] = {}
+        self.outline: list[tuple[int, str]] = []
+        self._stack: list[str] = []
+        self._skip = 0
+
+    def _open(self, tag: str, void: bool) -> None:
+        self.pieces.append(" ")
+        self.tags[tag] = self.tags.get(tag, 0) + 1
+        if tag in SKIP_CONTENT and not void:
+            self._skip += 1
+        if tag in STRUCTURAL_TAGS:
+            self.outline.append((sum(1 for t in self._stack if t in STRUCTURAL_TAGS), tag))
+        if not void and tag not in VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, True)
+
+    def handle_endtag(self, tag):
+        self.pieces.append(" ")
+        if tag not in self._stack:
+            return  # stray end tag
+        # Close implicitly-ended children (e.g. an unclosed <li>) as well.
+        while self._stack:
+            top = self._stack.pop()
+            if top in SKIP_CONTENT:
+                self._skip -= 1
+            if top == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.pieces.append(data)
+
+    def features(self) -> HtmlFeatures:
+        text = " ".join("".join(self.pieces).split())
+        return HtmlFeatures(text, self.tags, self.outline)
+
+
+def extract_features(html: str) -> HtmlFeatures:
+    parser = _FeatureParser()
+    parser.feed(html)
+    parser.close()
+    return parser.features()
+
+
+def extract_file(path: Path) -> HtmlFeatures:
+    """Stream a file through the parser without holding it in memory."""
+    parser = _FeatureParser()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            parser.feed(chunk)
+    parser.close()
+    return parser.features()
+
+
+def content_key(path: Path) -> str:
+    h = hashlib.sha256(EXTRACTOR_VERSION.encode())
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_features(path: Path, cache_dir: Path = CACHE_DIR) -> HtmlFeatures:
+    """Features of an unchanging file (fixture source), memoized on disk."""
+    entry = cache_dir / f"{content_key(path)}.json"
+    if entry.exists():
+        try:
+            return HtmlFeatures.from_json(json.loads(entry.read_text(encoding="utf-8")))
+        except (OSError, ValueError, KeyError):
+            pass  # corrupt entry: recompute and overwrite
+    features = extract_file(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so concurrent workers never read a partial entry.
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(asdict(features), f)
+    os.replace(tmp, entry)
+    return features
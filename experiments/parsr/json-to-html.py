@@ -4,11 +4,19 @@ Convert Parsr JSON output to HTML by reconstructing document structure
 from word-level bounding boxes.
 
 Algorithm:
-1. Sort words by top coordinate, then left coordinate.
+1. Split the page into column regions (see xycut.py), then sort each region's
+   words by top coordinate, then left coordinate (columnar, see wordtable.py).
 2. Group words into lines (same top ± tolerance).
 3. Group lines into blocks (paragraphs) by vertical gap.
 4. Detect headings by font size > baseline.
-5. Render as HTML.
+5. Drop running headers/footers repeated across pages (see runningbands.py).
+6. Render as HTML.
+
+--trace=trace.json (or PDF_TO_HTML_TRACE) records each phase per page as
+Chrome trace events (see tracing.py).
+
+Wherever Parsr JSON is accepted, a word store written by pack-words.py is
+accepted too; it is read through mmap instead of parsed.
 """
 
 import json
@@ -16,97 +24,169 @@ import sys
 import html as htmllib
 from pathlib import Path
 
+import numpy as np
 
-LINE_TOLERANCE = 4   # px: words within this vertical distance share a line
-PARA_GAP_RATIO = 1.5  # a vertical gap > baseline_line_height * ratio = new block
-
-
-def parsr_json_to_html(json_path: str, title: str = "Parsr Output") -> str:
-    with open(json_path, "r", encoding="utf-8") as f:
-        doc = json.load(f)
-
-    fonts = {f["id"]: f for f in doc.get("fonts", [])}
-    body_parts = []
-
-    for page in doc.get("pages", []):
-        words = [e for e in page.get("elements", []) if e.get("type") == "word" and e.get("content", "").strip()]
-
-        if not words:
-            continue
-
-        # Sort words: top first, then left
-        words.sort(key=lambda w: (round(w["box"]["t"], 1), w["box"]["l"]))
-
-        # ── Group words into lines ──────────────────────────────────────────
-        lines = []  # list of list-of-words
-        current_line = [words[0]]
-        current_top = words[0]["box"]["t"]
-
-        for w in words[1:]:
-            if abs(w["box"]["t"] - current_top) <= LINE_TOLERANCE:
-                current_line.append(w)
-            else:
-                lines.append(current_line)
-                current_line = [w]
-                current_top = w["box"]["t"]
-        lines.append(current_line)
-
-        # ── Estimate baseline line height ───────────────────────────────────
-        if len(lines) > 1:
-            gaps = []
-            for i in range(1, len(lines)):
-                gap = lines[i][0]["box"]["t"] - lines[i-1][0]["box"]["t"]
-                gaps.append(gap)
-            baseline_gap = sorted(gaps)[len(gaps) // 2]  # median
-        else:
-            baseline_gap = 18
-
-        # ── Group lines into blocks (paragraphs) ───────────────────────────
-        blocks = []  # list of list-of-lines
-        current_block = [lines[0]]
-
-        for i in range(1, len(lines)):
-            gap = lines[i][0]["box"]["t"] - lines[i-1][0]["box"]["t"]
-            if gap > baseline_gap * PARA_GAP_RATIO:
-                blocks.append(current_block)
-                current_block = [lines[i]]
-            else:
-                current_block.append(lines[i])
-        blocks.append(current_block)
-
-        # ── Detect baseline font size ───────────────────────────────────────
-        all_sizes = [w.get("fontSize", 12) for b in blocks for l in b for w in l]
-        if all_sizes:
-            sorted_sizes = sorted(all_sizes)
-            baseline_size = sorted_sizes[len(sorted_sizes) // 2]
-        else:
-            baseline_size = 12
+import jsonstream
+import tracing
+import wordstore
+from runningbands import LOOKAHEAD, RUNNING_MODES, split_running_bands
+from wordtable import LINE_TOLERANCE, PARA_GAP_RATIO, PageLayout, WordTable  # noqa: F401
 
-        # ── Render each block ───────────────────────────────────────────────
-        for block in blocks:
-            block_text = render_block(block, fonts, baseline_size)
-            if block_text.strip():
-                body_parts.append(block_text)
 
-    body = "\n".join(body_parts)
-    return f"""<!DOCTYPE html>
+HTML_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
-  <title>{htmllib.escape(title)}</title>
+  <title>{title}</title>
 </head>
 <body>
-{body}
+"""
+HTML_TAIL = """
 </body>
 </html>
 """
 
 
-def render_block(block, fonts, baseline_size):
-    """Render a block (list of lines) as an HTML element."""
-    # Collect all words
-    all_words = [w for line in block for w in line]
-    avg_size = sum(w.get("fontSize", baseline_size) for w in all_words) / max(len(all_words), 1)
+def parsr_json_to_html(json_path: str, title: str = "Parsr Output", running: str = "strip") -> str:
+    if wordstore.is_word_store(json_path):
+        return "".join(store_to_html(json_path, title, running, lookahead=None))
+    with tracing.span("json-load"), open(json_path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+
+    fonts = {f["id"]: f for f in doc.get("fonts", [])}
+    return "".join(iter_html(doc.get("pages", []), fonts, title, running=running, lookahead=None))
+
+
+def stream_parsr_json_to_html(json_path: str, title: str = "Parsr Output", running: str = "strip"):
+    """Generator variant of parsr_json_to_html that never loads the whole document.
+
+    Fonts are read first by skipping over the pages array (Parsr writes them
+    after the pages), then pages are decoded and converted one at a time.
+    Running headers and footers are decided LOOKAHEAD pages late.
+    """
+    if wordstore.is_word_store(json_path):
+        return store_to_html(json_path, title, running)
+    with tracing.span("json-header"):
+        header = jsonstream.read_header(json_path)
+    fonts = {f["id"]: f for f in header.get("fonts", [])}
+    return iter_html(jsonstream.iter_pages(json_path), fonts, title, running=running, lookahead=LOOKAHEAD)
+
+
+def store_to_html(store_path: str, title: str = "Parsr Output", running: str = "strip", lookahead=LOOKAHEAD):
+    """Generator over the HTML of a word store (see wordstore.py / pack-words.py).
+
+    With lookahead=None every page is held, as in parsr_json_to_html, but
+    their numeric columns are views into the map rather than copies.
+    """
+    with tracing.span("store-open"):
+        store = wordstore.WordStore(store_path)
+    return iter_html(store.pages(), store.fonts, title, words_of=lambda words: words,
+                     running=running, lookahead=lookahead)
+
+
+def iter_html(pages, fonts, title, render_page=None, words_of=None, running="strip", lookahead=LOOKAHEAD):
+    """Yield the HTML document in chunks, one page's blocks at a time.
+
+    `words_of(page)` gives the page's WordTable (default: a Parsr page) and
+    `render_page(page, words, fonts)` turns it into block strings (default:
+    words_to_html). Running headers and footers are removed from `words`
+    first; with running="tag" the first of each is kept once as <header>
+    at the top and <footer> at the end, and "keep" disables detection.
+    """
+    if running not in RUNNING_MODES:
+        raise ValueError(f"running must be one of {RUNNING_MODES}, got {running!r}")
+    words_of = words_of or WordTable.from_page
+    render_page = render_page or (lambda page, words, fonts: words_to_html(words, fonts))
+
+    def page_words(page):
+        with tracing.span("words"):
+            words = words_of(page)
+            tracing.count("words", len(words))
+        return words
+
+    pairs = ((page, page_words(page)) for page in pages)
+    if running == "keep":
+        none = np.empty(0, dtype=np.intp)
+        stream = ((page, words, none, none) for page, words in pairs)
+    else:
+        stream = split_running_bands(pairs, lookahead)
+
+    yield HTML_HEAD.format(title=htmllib.escape(title))
+    first = True
+    footer_html = None
+    header_done = False
+    for index, (page, words, header, footer) in enumerate(stream):
+        with tracing.span("page", page=index):
+            blocks = []
+            if len(header) or len(footer):
+                if running == "tag":
+                    if len(header) and not header_done:
+                        blocks.append(band_html("header", words.take(header), fonts))
+                        header_done = True
+                    if len(footer) and footer_html is None:
+                        footer_html = band_html("footer", words.take(footer), fonts)
+                keep = np.ones(len(words), dtype=bool)
+                keep[header] = False
+                keep[footer] = False
+                words = words.take(np.flatnonzero(keep))
+            blocks += render_page(page, words, fonts)
+            if tracing.enabled():
+                tracing.count("chars", sum(map(len, blocks)))
+        for block_text in blocks:
+            if not first:
+                yield "\n"
+            yield block_text
+            first = False
+    if footer_html is not None:
+        yield ("\n" if not first else "") + footer_html
+    yield HTML_TAIL
+
+
+def band_html(tag, words, fonts):
+    return f"<{tag}>\n" + "".join(words_to_html(words, fonts)) + f"</{tag}>\n"
+
+
+def page_to_html(page, fonts):
+    """Render one Parsr page as a list of HTML block strings."""
+    return words_to_html(WordTable.from_page(page), fonts)
+
+
+def words_to_html(words, fonts, baseline_size=None, line_gap=None):
+    """Render the words of one page as a list of HTML block strings.
+
+    `baseline_size` and `line_gap` override the page's own body size and
+    line spacing, for callers that render a page in several pieces or use
+    document-wide statistics.
+    """
+    if not len(words):
+        return []
+
+    # ── Sort, group into lines and blocks (vectorized) ──────────────────────
+    with tracing.span("layout"):
+        layout = PageLayout.build(words, line_gap=line_gap)
+
+    # ── Detect baseline font size ───────────────────────────────────────────
+    if baseline_size is None:
+        with tracing.span("baseline"):
+            baseline_size = layout.baseline_size(12)
+
+    # ── Render each block ───────────────────────────────────────────────────
+    body_parts = []
+    with tracing.span("render"):
+        sizes = layout.words.sizes(baseline_size)
+        for block in layout.blocks():
+            block_text = render_block(block, layout.words, fonts, baseline_size, sizes[np.concatenate(block)])
+            if block_text.strip():
+                body_parts.append(block_text)
+    return body_parts
+
+
+def render_block(block, words, fonts, baseline_size, block_sizes):
+    """Render a block (list of lines of word indices into `words`) as an HTML element.
+
+    `block_sizes` holds the font size of each word in the block.
+    """
+    avg_size = block_sizes.sum() / max(len(block_sizes), 1)
 
     # Heading detection: significantly larger than baseline
     if avg_size >= baseline_size * 1.3:
@@ -121,46 +201,102 @@ def render_block(block, fonts, baseline_size):
             tag = "h4"
         else:
             tag = "h5"
-        text = render_lines(block, fonts)
+        text = render_lines(block, words, fonts)
         return f"<{tag}>{text}</{tag}>\n"
     else:
-        text = render_lines(block, fonts)
+        text = render_lines(block, words, fonts)
         return f"<p>{text}</p>\n"
 
 
-def render_lines(block, fonts):
-    """Render lines of a block as inline HTML text."""
-    line_parts = []
-    for line in block:
-        # Sort words left to right
-        line_sorted = sorted(line, key=lambda w: w["box"]["l"])
-        word_parts = []
-        for w in line_sorted:
-            txt = htmllib.escape(w.get("content", ""))
-            font = fonts.get(w.get("font"))
-            if font:
-                bold = font.get("weight", "medium") in ("bold", "Bold", "700", 700)
-                italic = font.get("isItalic", False)
-                underline = font.get("isUnderline", False)
-                if bold:
-                    txt = f"<strong>{txt}</strong>"
-                if italic:
-                    txt = f"<em>{txt}</em>"
-                if underline:
-                    txt = f"<u>{txt}</u>"
-            word_parts.append(txt)
-        line_parts.append(" ".join(word_parts))
-    return " ".join(line_parts)
+# Inline style bits; tags open outermost first, so a bold italic word reads
+# <em><strong>..</strong></em>.
+BOLD, ITALIC, UNDERLINE = 1, 2, 4
+STYLE_TAGS = ((UNDERLINE, "u"), (ITALIC, "em"), (BOLD, "strong"))
+BOLD_WEIGHTS = ("bold", "Bold", "700", 700)
+
+# (fonts, len(fonts), sorted ids, masks) of the last font table seen: one
+# document's fonts are reduced to bitmasks once, and again only if it grows.
+_style_cache = (None, 0, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8))
+
+
+def font_style(font: dict) -> int:
+    mask = 0
+    if font.get("weight", "medium") in BOLD_WEIGHTS:
+        mask |= BOLD
+    if font.get("isItalic", False):
+        mask |= ITALIC
+    if font.get("isUnderline", False):
+        mask |= UNDERLINE
+    return mask
+
+
+def style_masks(fonts, font_ids: np.ndarray) -> np.ndarray:
+    """Style bitmask of each word from its font id (0 for unknown fonts)."""
+    global _style_cache
+    cached, size, ids, masks = _style_cache
+    if cached is not fonts or size != len(fonts):
+        keys = sorted(int(k) for k in fonts)
+        ids = np.asarray(keys, dtype=np.int64)
+        masks = np.asarray([font_style(fonts[k]) for k in keys], dtype=np.int8)
+        _style_cache = (fonts, len(fonts), ids, masks)
+    if not len(ids):
+        return np.zeros(len(font_ids), dtype=np.int8)
+    pos = np.minimum(np.searchsorted(ids, font_ids), len(ids) - 1)
+    return np.where(ids[pos] == font_ids, masks[pos], 0)
+
+
+def render_lines(block, words, fonts):
+    """Render lines of a block as inline HTML text.
+
+    Lines are already ordered left to right and are joined by a space like
+    the words within them, so the block is one word sequence. Consecutive
+    words with the same style become one run: a bold sentence is a single
+    <strong>, not one per word.
+    """
+    order = np.concatenate(block) if len(block) > 1 else block[0]
+    if not len(order):
+        return ""
+    content = words.content
+    style = style_masks(fonts, words.font[order])
+    bounds = (np.flatnonzero(style[1:] != style[:-1]) + 1).tolist()
+    order = order.tolist()
+    out = []
+    for a, b in zip([0] + bounds, bounds + [len(order)]):
+        if a:
+            out.append(" ")
+        mask = int(style[a])
+        tags = [tag for bit, tag in STYLE_TAGS if mask & bit]
+        for tag in tags:
+            out.append(f"<{tag}>")
+        out.append(htmllib.escape(" ".join([content[i] for i in order[a:b]])))
+        for tag in reversed(tags):
+            out.append(f"</{tag}>")
+    return "".join(out)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(f"Usage: {sys.argv[0]} <parsr-output.json> <output.html> [title]")
+    flags = [a for a in sys.argv[1:] if a.startswith("--")]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    stream = "--stream" in flags
+    running = next((f.split("=", 1)[1] for f in flags if f.startswith("--running=")), "strip")
+    trace = next((f.split("=", 1)[1] for f in flags if f.startswith("--trace=")), None)
+    if len(args) < 2 or running not in RUNNING_MODES:
+        print(f"Usage: {sys.argv[0]} [--stream] [--running=strip|tag|keep] [--trace=trace.json] <parsr-output.json> <output.html> [title]")
         sys.exit(1)
-    json_path = sys.argv[1]
-    html_path = sys.argv[2]
-    title = sys.argv[3] if len(sys.argv) > 3 else Path(json_path).stem
-    result = parsr_json_to_html(json_path, title)
-    with open(html_path, "w", encoding="utf-8") as f:
-        f.write(result)
-    print(f"Written: {html_path} ({len(result)} chars)")
+    if trace:
+        tracing.enable(trace)
+    json_path = args[0]
+    html_path = args[1]
+    title = args[2] if len(args) > 2 else Path(json_path).stem
+    if stream:
+        written = 0
+        with open(html_path, "w", encoding="utf-8") as f:
+            for chunk in stream_parsr_json_to_html(json_path, title, running):
+                f.write(chunk)
+                written += len(chunk)
+    else:
+        result = parsr_json_to_html(json_path, title, running)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(result)
+        written = len(result)
+    print(f"Written: {html_path} ({written} chars)")
@@ -0,0 +1,161 @@
+"""
+Incremental reader for large JSON documents (stdlib only).
+
+Parsr and pdf2json both emit one top-level object whose bulk is a single
+array of pages. `iter_items` walks that object with a bounded buffer and
+yields the elements of selected arrays one at a time, so peak memory is one
+page rather than the whole document. Arrays that are not wanted can be
+skipped without being decoded.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator
+
+CHUNK_SIZE = 1 << 16
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+_STRUCT = re.compile(r'["{}\[\]]')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+
+class _Scanner:
+    """Buffered cursor over a text stream; keeps only the unconsumed tail."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # Grow geometrically so a value larger than one chunk is re-decoded
+        # only O(log n) times.
+        chunk = self._f.read(max(self._chunk_size, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> None:
+        ch = self.peek()
+        if ch != expected:
+            raise ValueError(f"expected {expected!r} at offset {self._pos}, got {ch!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self._buf, self._pos)
+                # A value that ends exactly at the buffer edge may be a
+                # truncated number; only trust it once something follows.
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def skip(self) -> None:
+        """Advance past the next value without building Python objects."""
+        if self.peek() not in "{[":
+            self.value()
+            return
+        depth = 0
+        while True:
+            m = _STRUCT.search(self._buf, self._pos)
+            if m is None:
+                self._pos = len(self._buf)
+                if not self._fill():
+                    raise ValueError("unexpected end of JSON while skipping")
+                continue
+            ch = m.group()
+            if ch == '"':
+                tail = _STRING_TAIL.match(self._buf, m.end())
+                if tail is None:
+                    self._pos = m.start()
+                    if not self._fill():
+                        raise ValueError("unterminated string in JSON")
+                    continue
+                self._pos = tail.end()
+                continue
+            self._pos = m.end()
+            depth += 1 if ch in "{[" else -1
+            if depth == 0:
+                return
+
+
+def _iter_array(scanner: _Scanner) -> Iterator[Any]:
+    scanner.take("[")
+    if scanner.peek() == "]":
+        scanner.take("]")
+        return
+    while True:
+        yield scanner.value()
+        if scanner.peek() == ",":
+            scanner.take(",")
+            continue
+        scanner.take("]")
+        return
+
+
+def iter_items(
+    path,
+    stream_keys: tuple[str, ...] = ("pages",),
+    skip_keys: tuple[str, ...] = (),
+) -> Iterator[tuple[str, Any]]:
+    """Walk the top-level object of a JSON file.
+
+    Yields `(key, value)` for ordinary keys and `(key, element)` once per
+    element for keys in `stream_keys`. Keys in `skip_keys` are stepped over
+    without decoding.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        scanner = _Scanner(f)
+        scanner.take("{")
+        if scanner.peek() == "}":
+            return
+        while True:
+            key = scanner.value()
+            scanner.take(":")
+            if key in skip_keys:
+                scanner.skip()
+            elif key in stream_keys and scanner.peek() == "[":
+                for item in _iter_array(scanner):
+                    yield key, item
+            else:
+                yield key, scanner.value()
+            if scanner.peek() == ",":
+                scanner.take(",")
+                continue
+            scanner.take("}")
+            return
+
+
+def iter_pages(path, key: str = "pages") -> Iterator[dict]:
+    """Yield the pages of a document one at a time."""
+    for k, page in iter_items(path, stream_keys=(key,)):
+        if k == key:
+            yield page
+
+
+def read_header(path, skip: tuple[str, ...] = ("pages",)) -> dict:
+    """Every top-level key except the (skipped, undecoded) page arrays."""
+    return dict(iter_items(path, stream_keys=(), skip_keys=skip))
@@ -1,13 +1,169 @@
 #!/usr/bin/env python3
 """Convert markdown to HTML with multiple fallbacks."""
 from __future__ import annotations
+import atexit
+import functools
 import html
+import importlib.util
 import json
+import queue
 import re
+import shutil
 import subprocess
 import sys
+import threading
 from pathlib import Path
 
+import tracing
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+START_TIMEOUT = 10.0   # s: for node to load marked
+RENDER_TIMEOUT = 30.0  # s: for one document; a worker that misses it is killed
+
+# Long-lived node worker: loads marked once, then answers one JSON request
+# per stdin line with one JSON response per stdout line.
+MARKED_WORKER_SCRIPT = (
+    "import { marked } from 'marked';"
+    "import { createInterface } from 'node:readline';"
+    "const rl = createInterface({ input: process.stdin, crlfDelay: Infinity });"
+    "process.stdout.write(JSON.stringify({ ready: true }) + '\\n');"
+    "rl.on('line', (line) => {"
+    "  let out;"
+    "  try { const req = JSON.parse(line); out = { id: req.id, html: marked.parse(req.md) }; }"
+    "  catch (e) { out = { id: null, error: String(e) }; }"
+    "  process.stdout.write(JSON.stringify(out) + '\\n');"
+    "});"
+)
+
+
+class MarkedWorker:
+    """One persistent `node` process rendering markdown with marked."""
+
+    def __init__(self, cwd: Path = REPO_ROOT):
+        self._proc = subprocess.Popen(
+            ["node", "--input-type=module", "-e", MARKED_WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            cwd=cwd,
+        )
+        self._next_id = 0
+        # Lines are read on a thread so that waiting for one can time out.
+        self._lines: queue.Queue[str] = queue.Queue()
+        threading.Thread(target=self._read_lines, daemon=True).start()
+        try:
+            ready = self._readline(START_TIMEOUT)
+        except RuntimeError:
+            ready = ""
+        if not ready or not json.loads(ready).get("ready"):
+            self.close()
+            raise RuntimeError("marked worker failed to start")
+
+    def _read_lines(self) -> None:
+        for line in self._proc.stdout:
+            self._lines.put(line)
+        self._lines.put("")  # EOF
+
+    def _readline(self, timeout: float) -> str:
+        try:
+            return self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self._proc.kill()
+            raise RuntimeError(f"marked worker did not answer within {timeout:.0f}s") from None
+
+    def render(self, md: str) -> str:
+        self._next_id += 1
+        self._proc.stdin.write(json.dumps({"id": self._next_id, "md": md}) + "\n")
+        self._proc.stdin.flush()
+        line = self._readline(RENDER_TIMEOUT)
+        if not line:
+            raise RuntimeError("marked worker exited")
+        reply = json.loads(line)
+        if reply.get("id") != self._next_id or "html" not in reply:
+            raise RuntimeError(reply.get("error", "marked worker protocol error"))
+        return reply["html"]
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass  # node already gone
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+
+class RendererPool:
+    """Fixed set of marked workers shared by threads; started once per process.
+
+    A worker that fails is closed and its slot left empty; the next render
+    on that slot starts a new worker.
+    """
+
+    def __init__(self, size: int = 1, cwd: Path = REPO_ROOT):
+        self._cwd = cwd
+        self._idle: queue.Queue[MarkedWorker | None] = queue.Queue()
+        self._workers = [MarkedWorker(cwd) for _ in range(size)]
+        for w in self._workers:
+            self._idle.put(w)
+
+    def render(self, md: str) -> str:
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = MarkedWorker(self._cwd)
+                self._workers.append(worker)
+            return worker.render(md)
+        except Exception:
+            if worker is not None:
+                worker.close()
+                self._workers.remove(worker)
+                worker = None
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for w in self._workers:
+            w.close()
+
+
+_pool: RendererPool | None = None
+_pool_lock = threading.Lock()
+
+
+def marked_pool(size: int = 1) -> RendererPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RendererPool(size)
+            atexit.register(_pool.close)
+        return _pool
+
+
+@functools.cache
+def available_engines() -> tuple[str, ...]:
+    """Engines usable in this process, probed once instead of on every call."""
+    found = []
+    if shutil.which("node"):
+        try:
+            marked_pool()
+            found.append("marked")
+        except Exception:
+            pass
+    if importlib.util.find_spec("markdown") is not None:
+        found.append("python-markdown")
+    if importlib.util.find_spec("markdown2") is not None:
+        found.append("markdown2")
+    if shutil.which("pandoc"):
+        found.append("pandoc")
+    return tuple(found)
+
 
 def convert_with_python_markdown(md: str) -> str | None:
     try:
@@ -41,24 +197,8 @@ def convert_with_pandoc(md: str) -> str | None:
 
 def convert_with_marked(md: str) -> str | None:
     """Use the marked (Node) parser for robust CommonMark/GFM conversion."""
-    repo_root = Path(__file__).resolve().parents[2]
-    script = (
-        "import { marked } from 'marked';"
-        "process.stdin.setEncoding('utf8');"
-        "let data='';"
-        "process.stdin.on('data', c => data += c);"
-        "process.stdin.on('end', () => process.stdout.write(marked.parse(data)));"
-    )
     try:
-        proc = subprocess.run(
-            ["node", "--input-type=module", "-e", script],
-            input=md,
-            text=True,
-            capture_output=True,
-            check=True,
-            cwd=repo_root,
-        )
-        return proc.stdout
+        return marked_pool().render(md)
     except Exception:
         return None
 
@@ -97,22 +237,58 @@ def convert_with_basic_fallback(md: str) -> str:
     return "\n".join(out)
 
 
+ENGINES = {
+    "marked": convert_with_marked,
+    "python-markdown": convert_with_python_markdown,
+    "markdown2": convert_with_markdown2,
+    "pandoc": convert_with_pandoc,
+}
+
+
 def markdown_to_html(md: str, title: str) -> tuple[str, str]:
-    for name, fn in [
-        ("marked", convert_with_marked),
-        ("python-markdown", convert_with_python_markdown),
-        ("markdown2", convert_with_markdown2),
-        ("pandoc", convert_with_pandoc),
-    ]:
-        result = fn(md)
+    tracing.count("markdown_chars", len(md))
+    for name in available_engines():
+        with tracing.span("render", engine=name):
+            result = ENGINES[name](md)
         if result:
+            tracing.count("chars", len(result))
             return result, name
-    return convert_with_basic_fallback(md), "basic-fallback"
+    with tracing.span("render", engine="basic-fallback"):
+        result = convert_with_basic_fallback(md)
+    tracing.count("chars", len(result))
+    return result, "basic-fallback"
+
+
+def wrap_html(body: str, title: str) -> str:
+    return f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n<title>{html.escape(title)}</title>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
+
+
+def title_for(md_path: Path) -> str:
+    name = md_path.name
+    for suffix in (".parsr.md", ".md"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return md_path.stem
+
+
+def convert_batch(out_dir: Path, md_paths: list[Path]) -> int:
+    """Render many markdown files with one process and one set of engines."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for in_path in md_paths:
+        title = title_for(in_path)
+        md = in_path.read_text(encoding="utf-8", errors="replace")
+        body, engine = markdown_to_html(md, title)
+        (out_dir / f"{title}.html").write_text(wrap_html(body, title), encoding="utf-8")
+        print(f"{title}\t{engine}")
+    return 0
 
 
 def main() -> int:
+    if len(sys.argv) >= 3 and sys.argv[1] == "--batch":
+        return convert_batch(Path(sys.argv[2]), [Path(p) for p in sys.argv[3:]])
     if len(sys.argv) < 3:
         print(f"Usage: {sys.argv[0]} <input.md> <output.html> [title]", file=sys.stderr)
+        print(f"       {sys.argv[0]} --batch <output-dir> <input.md> ...", file=sys.stderr)
         return 1
     in_path = Path(sys.argv[1])
     out_path = Path(sys.argv[2])
@@ -120,8 +296,7 @@ def main() -> int:
 
     md = in_path.read_text(encoding="utf-8", errors="replace")
     body, engine = markdown_to_html(md, title)
-    html_doc = f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n<title>{html.escape(title)}</title>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
-    out_path.write_text(html_doc, encoding="utf-8")
+    out_path.write_text(wrap_html(body, title), encoding="utf-8")
     print(engine)
     return 0
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+pack-words.py — Convert Parsr or pdf2json JSON into word store files.
+
+A word store (see wordstore.py) holds the words of a document as columns
+behind an mmap; json-to-html.py and json-to-markdown.py accept one wherever
+they accept Parsr JSON. Packing is done once per document: pages are
+streamed from the JSON (jsonstream.py), so the whole document is never
+held as dicts.
+
+Usage:
+  python3 pack-words.py [--output-dir DIR] [--format auto|parsr|pdf2json] <input.json> ...
+
+  Writes <output-dir>/<name>.words, where <name> is the Parsr file name
+  without .parsr.json, or the fixture directory of a pdf2json source.json.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import jsonstream
+import scriptloader
+from wordstore import SUFFIX, write_store
+from wordtable import WordTable
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PDF2JSON_DIR = SCRIPT_DIR.parent / "pdf2json"
+OUTPUT_DIR = SCRIPT_DIR.parent / ".cache" / "words"
+SNIFF_BYTES = 1 << 16
+
+
+def detect_format(path: Path) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.read(SNIFF_BYTES)
+    return "pdf2json" if '"Pages"' in head else "parsr"
+
+
+def store_name(path: Path) -> str:
+    if path.name.endswith(".parsr.json"):
+        return path.name[: -len(".parsr.json")]
+    if path.name == "source.json":
+        return path.parent.name
+    return path.stem
+
+
+def pack_parsr(path: Path, out: Path, stream: bool = True) -> dict:
+    """stream=False parses the JSON whole: several times faster, at the memory cost of the dicts."""
+    if stream:
+        # Parsr writes fonts after the pages; read_header skips the pages undecoded.
+        fonts = jsonstream.read_header(path).get("fonts", [])
+        pages = (WordTable.from_page(p, i) for i, p in enumerate(jsonstream.iter_pages(path)))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        fonts = data.get("fonts", [])
+        pages = (WordTable.from_page(p, i) for i, p in enumerate(data.get("pages", [])))
+    return write_store(out, pages, fonts, {"source": str(path), "format": "parsr"})
+
+
+def pack_pdf2json(path: Path, out: Path) -> dict:
+    reader = scriptloader.load("pdf2jsonreader", PDF2JSON_DIR)
+    styles = reader.StyleTable()
+    pages = (reader.page_words(p, styles, i) for i, p in enumerate(jsonstream.iter_pages(path, key="Pages")))
+    # Fonts are interned page by page; ask for them once every page is read.
+    return write_store(out, pages, lambda: list(styles.fonts.values()), {"source": str(path), "format": "pdf2json"})
+
+
+PACKERS = {"parsr": pack_parsr, "pdf2json": pack_pdf2json}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pack Parsr or pdf2json JSON into word store files.")
+    parser.add_argument("inputs", nargs="+", type=Path)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--format", choices=("auto",) + tuple(PACKERS), default="auto")
+    args = parser.parse_args()
+
+    for path in args.inputs:
+        fmt = detect_format(path) if args.format == "auto" else args.format
+        out = args.output_dir / f"{store_name(path)}{SUFFIX}"
+        start = time.perf_counter()
+        header = PACKERS[fmt](path, out)
+        ratio = out.stat().st_size / path.stat().st_size
+        print(f"[pack] {path.name} ({fmt}) → {out} ({header['pages']} pages, {header['words']} words, "
+              f"{ratio:.0%} of the JSON, {time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+parallel-convert.py — Convert one long document to HTML on several processes.
+
+json-to-html.py converts a document page after page on one core, and takes
+every statistic it needs from the page at hand: the body font size that
+decides headings and the line spacing that splits paragraphs. Here the
+document is converted in three steps:
+
+  1. Pre-pass (parallel). Each page is laid out without column detection,
+     which is cheap, and yields its font-size histogram, the gaps between
+     its line tops and its running header/footer candidates.
+  2. Reduce. The histograms are merged into a document body size and line
+     gap (upper medians over every word and every gap), and the band
+     candidates into one RunningBandIndex, which then decides each page's
+     running headers and footers with the whole document in view.
+  3. Convert (parallel), then reassemble. Pages are rendered with the
+     document statistics and concatenated in page order. A paragraph that
+     ends a page without closing punctuation and is followed by one that
+     starts in lower case is one paragraph split by the page break, and
+     the two are merged.
+
+The input is a word store (see wordstore.py), or Parsr / pdf2json JSON that
+is packed into a temporary one first: workers mmap the store and read only
+their pages, so nothing but page ranges and statistics crosses process
+boundaries. Packing is sequential; documents converted more than once are
+better packed once with pack-words.py. Pages go to workers in shards of
+SHARD_PAGES consecutive pages, a fixed size, so the shards, every page's
+inputs and therefore the output are the same whatever the number of
+workers.
+
+Usage:
+  python3 parallel-convert.py [--workers N] [--shard-pages N] [--running strip|tag|keep]
+                              [--trace trace.json] <input.json|input.words> <output.html> [title]
+
+  --trace records spans in-process and so runs with one worker.
+"""
+from __future__ import annotations
+
+import argparse
+import html as htmllib
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+import scriptloader
+import tracing
+from runningbands import RUNNING_MODES, PageBands, RunningBandIndex
+from wordstore import WordStore, is_word_store
+from wordtable import DEFAULT_LINE_GAP, PageLayout, WordTable
+
+SHARD_PAGES = 16              # pages per task; fixed so shards do not depend on --workers
+DEFAULT_SIZE = 12             # pt, body size when no word has one
+SENTENCE_END = ".!?:;"        # a paragraph ending in one of these is not continued
+_PARAGRAPH = re.compile(r"<p>(.*)</p>\n", re.S)
+_TAG = re.compile(r"<[^>]+>")
+
+_NO_WORDS = np.empty(0, dtype=np.intp)
+
+
+# ── Pre-pass ────────────────────────────────────────────────────────────────
+
+@dataclass
+class PageStats:
+    """What the pre-pass keeps of one page: two histograms and its band candidates."""
+
+    sizes: np.ndarray        # distinct font sizes
+    size_counts: np.ndarray  # words of each size
+    gaps: np.ndarray         # distinct gaps from a line to the next one below in its column
+    gap_counts: np.ndarray
+    bands: PageBands
+
+
+@dataclass
+class DocStats:
+    baseline_size: float
+    line_gap: float
+    running: list[tuple[np.ndarray, np.ndarray]]  # header and footer word indices per page
+
+
+def histogram(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return np.unique(values, return_counts=True)
+
+
+def weighted_upper_median(values: np.ndarray, counts: np.ndarray, default: float) -> float:
+    """Upper median of `values` each repeated `counts` times, like upper_median on the expansion."""
+    total = int(counts.sum())
+    if not total:
+        return default
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(counts[order])
+    return float(values[order][np.searchsorted(cumulative, total // 2, side="right")])
+
+
+def page_stats(words: WordTable) -> PageStats:
+    if not len(words):
+        empty = np.empty(0)
+        return PageStats(empty, empty.astype(np.int64), empty, empty.astype(np.int64), PageBands())
+    # One row-only layout serves both the line gaps and the band candidates.
+    layout = PageLayout.build(words, columns=False)
+    return PageStats(*histogram(words.sizes(DEFAULT_SIZE)), *histogram(line_gaps(layout)),
+                     RunningBandIndex().add(words, layout))
+
+
+def line_gaps(layout: PageLayout) -> np.ndarray:
+    """Distance from each line's top to the next line below it that it overlaps horizontally.
+
+    Without column detection, lines of side-by-side columns interleave, and
+    consecutive tops would measure the stagger between columns rather than
+    the spacing within one; requiring overlap keeps each gap in its column.
+    """
+    words, starts = layout.words, layout.line_starts
+    if len(starts) < 2:
+        return np.empty(0)
+    tops = words.top[starts]
+    lo = np.minimum.reduceat(words.left, starts)
+    hi = np.maximum.reduceat(words.left + words.width, starts)
+    below = (tops[None, :] > tops[:, None]) & (lo[None, :] < hi[:, None]) & (lo[:, None] < hi[None, :])
+    distance = np.where(below, tops[None, :] - tops[:, None], np.inf).min(axis=1)
+    return distance[np.isfinite(distance)]
+
+
+def merge_histograms(parts: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    values = np.concatenate([v for v, _ in parts]) if parts else np.empty(0)
+    counts = np.concatenate([c for _, c in parts]) if parts else np.empty(0, dtype=np.int64)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return distinct, np.bincount(inverse, weights=counts, minlength=len(distinct)).astype(np.int64)
+
+
+def document_stats(pages: list[PageStats], running: str = "strip") -> DocStats:
+    """Reduce the pre-pass of every page, in page order, to document statistics."""
+    sizes = merge_histograms([(p.sizes, p.size_counts) for p in pages])
+    gaps = merge_histograms([(p.gaps, p.gap_counts) for p in pages])
+    if running == "keep":
+        bands = [(_NO_WORDS, _NO_WORDS)] * len(pages)
+    else:
+        index = RunningBandIndex()
+        for p in pages:
+            index.register(p.bands)
+        bands = [index.classify(p.bands) for p in pages]
+    return DocStats(weighted_upper_median(*sizes, DEFAULT_SIZE),
+                    weighted_upper_median(*gaps, DEFAULT_LINE_GAP), bands)
+
+
+# ── Workers ─────────────────────────────────────────────────────────────────
+
+_stores: dict[str, WordStore] = {}
+
+
+def open_store(path: str) -> WordStore:
+    """One map per store and process, shared by every shard the process runs."""
+    if path not in _stores:
+        _stores[path] = WordStore(path)
+    return _stores[path]
+
+
+def prepass_shard(store_path: str, first: int, stop: int) -> list[PageStats]:
+    store = open_store(store_path)
+    with tracing.span("prepass", pages=stop - first):
+        return [page_stats(store.page(i)) for i in range(first, stop)]
+
+
+def without(words: WordTable, header: np.ndarray, footer: np.ndarray) -> WordTable:
+    if not len(header) and not len(footer):
+        return words
+    keep = np.ones(len(words), dtype=bool)
+    keep[header] = False
+    keep[footer] = False
+    return words.take(np.flatnonzero(keep))
+
+
+def convert_shard(store_path: str, first: int, stop: int, baseline_size: float, line_gap: float,
+                  running: list[tuple[np.ndarray, np.ndarray]]) -> list[list[str]]:
+    """HTML blocks of pages first..stop-1, rendered with document statistics."""
+    words_to_html = scriptloader.load("json-to-html").words_to_html
+    store = open_store(store_path)
+    pages = []
+    with tracing.span("convert", pages=stop - first):
+        for i, (header, footer) in zip(range(first, stop), running):
+            words = without(store.page(i), header, footer)
+            pages.append(words_to_html(words, store.fonts, baseline_size, line_gap))
+    return pages
+
+
+# ── Reassembly ──────────────────────────────────────────────────────────────
+
+def visible_text(block: str) -> str:
+    return htmllib.unescape(_TAG.sub("", block)).strip()
+
+
+def continues(previous: str, following: str) -> bool:
+    """Whether two paragraphs either side of a page break are one paragraph."""
+    if not (_PARAGRAPH.fullmatch(previous) and _PARAGRAPH.fullmatch(following)):
+        return False
+    end, start = visible_text(previous), visible_text(following)
+    return bool(end and start) and end[-1] not in SENTENCE_END and start[0].islower()
+
+
+def join_pages(pages: list[list[str]]) -> list[str]:
+    """Concatenate the pages' blocks, merging paragraphs split by a page break."""
+    blocks: list[str] = []
+    for page in pages:
+        if blocks and page and continues(blocks[-1], page[0]):
+            previous = _PARAGRAPH.fullmatch(blocks[-1]).group(1)
+            following = _PARAGRAPH.fullmatch(page[0]).group(1)
+            blocks[-1] = f"<p>{previous} {following}</p>\n"
+            tracing.count("continued paragraphs")
+            page = page[1:]
+        blocks.extend(page)
+    return blocks
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+def shards(pages: int, size: int = SHARD_PAGES) -> list[tuple[int, int]]:
+    return [(first, min(first + size, pages)) for first in range(0, pages, size)]
+
+
+def convert_store(store_path: str, title: str, workers: int = 1, running: str = "strip",
+                  shard_pages: int = SHARD_PAGES) -> str:
+    if running not in RUNNING_MODES:
+        raise ValueError(f"running must be one of {RUNNING_MODES}, got {running!r}")
+    j2h = scriptloader.load("json-to-html")
+    store = open_store(store_path)
+    ranges = shards(len(store), shard_pages)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = pool.map if pool else map
+    try:
+        stats = document_stats([p for part in run(prepass_shard, *zip(*[(store_path, a, b) for a, b in ranges]))
+                                for p in part], running)
+        jobs = [(store_path, a, b, stats.baseline_size, stats.line_gap, stats.running[a:b]) for a, b in ranges]
+        pages = [page for part in run(convert_shard, *zip(*jobs)) for page in part] if jobs else []
+    finally:
+        if pool:
+            pool.shutdown()
+
+    header_html = footer_html = None
+    if running == "tag":
+        # As in json-to-html: the first running header and footer, once each.
+        for i, (header, footer) in enumerate(stats.running):
+            if len(header) and header_html is None:
+                header_html = j2h.band_html("header", store.page(i).take(header), store.fonts)
+            if len(footer) and footer_html is None:
+                footer_html = j2h.band_html("footer", store.page(i).take(footer), store.fonts)
+    with tracing.span("join"):
+        blocks = join_pages(pages)
+    blocks = ([header_html] if header_html else []) + blocks + ([footer_html] if footer_html else [])
+    return j2h.HTML_HEAD.format(title=htmllib.escape(title)) + "\n".join(blocks) + j2h.HTML_TAIL
+
+
+def convert_document(path: Path, title: str, workers: int = 1, running: str = "strip",
+                     shard_pages: int = SHARD_PAGES) -> str:
+    """Convert a word store, or Parsr / pdf2json JSON packed to a temporary one."""
+    if is_word_store(path):
+        return convert_store(str(path), title, workers, running, shard_pages)
+    pack = scriptloader.load("pack-words")
+    with tempfile.TemporaryDirectory(prefix="parallel-convert-") as tmp:
+        store_path = Path(tmp) / f"{pack.store_name(path)}.words"
+        with tracing.span("pack"):
+            if pack.detect_format(path) == "parsr":
+                pack.pack_parsr(path, store_path, stream=False)
+            else:
+                pack.pack_pdf2json(path, store_path)
+        try:
+            return convert_store(str(store_path), title, workers, running, shard_pages)
+        finally:
+            _stores.pop(str(store_path), None)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert one document to HTML with page-sharded workers.")
+    parser.add_argument("input", type=Path, help="Parsr or pdf2json JSON, or a word store")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("title", nargs="?", default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-pages", type=int, default=SHARD_PAGES)
+    parser.add_argument("--running", choices=RUNNING_MODES, default="strip")
+    parser.add_argument("--trace", default=None, help="write a Chrome trace here (runs in-process)")
+    args = parser.parse_args()
+
+    workers = args.workers
+    if args.trace:
+        tracing.enable(args.trace)
+        workers = 1
+    title = args.title or args.input.stem
+    start = time.perf_counter()
+    result = convert_document(args.input, title, workers, args.running, args.shard_pages)
+    args.output.write_text(result, encoding="utf-8")
+    print(f"Written: {args.output} ({len(result)} chars, {workers} workers, "
+          f"{time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
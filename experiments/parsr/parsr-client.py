@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+parsr-client.py — Run Parsr on benchmark fixtures through its HTTP API.
+
+Asyncio replacement for the submit/poll/`docker cp` loop in convert.sh:
+
+- up to --concurrency jobs are in flight at once,
+- the queue endpoint is polled with exponential backoff over a pool of
+  keep-alive HTTP connections (no per-poll process spawn),
+- results are downloaded from /api/v1/json and /api/v1/markdown instead of
+  the container filesystem,
+- every job has a wall-clock deadline covering submit, processing and
+  download.
+
+Each job is converted to HTML as soon as its download finishes, and the
+output/ layout and conversion-results.json match convert.sh. Each result
+is appended to the results store (resultstore.py) as it completes; the
+results JSON is a snapshot of the run, written at the end.
+
+parsr-stub.py stands in for the Parsr server, so the client can be tested
+without Docker; give it an --output-dir other than output/ to keep the
+recorded outputs untouched.
+
+Usage:
+  python3 parsr-client.py [--url URL] [--concurrency N] [--deadline SEC]
+                          [--output-dir DIR] [--results FILE] [fixture ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+import uuid
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import scriptloader
+from resultstore import ResultStore, Run, tool_name
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = SCRIPT_DIR / "../../benchmark/fixtures"
+OUTPUT_DIR = SCRIPT_DIR / "output"
+CONFIG = SCRIPT_DIR / "parsr-config.json"
+RESULTS_FILE = SCRIPT_DIR / "conversion-results.json"
+PARSR_URL = "http://localhost:3001"
+
+CONCURRENCY = 4
+JOB_DEADLINE = 270.0  # s: convert.sh allowed 90 polls * 3 s
+POLL_INITIAL = 0.25   # s: first poll delay
+POLL_FACTOR = 1.6
+POLL_MAX = 3.0        # s: never wait longer than convert.sh's fixed interval
+HTTP_TIMEOUT = 60.0
+
+
+class ParsrError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections shared by all in-flight jobs.
+
+    http.client is blocking, so each round trip runs in a worker thread;
+    the pool size bounds both sockets and threads. A thread cannot be
+    cancelled: when a deadline cancels a request, its connection is
+    discarded and its slot returned only once the thread has finished.
+    """
+
+    def __init__(self, base_url: str, size: int):
+        parts = urlsplit(base_url)
+        self._cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port
+        self._prefix = parts.path.rstrip("/")
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)  # connections are opened lazily
+
+    def _connect(self) -> http.client.HTTPConnection:
+        return self._cls(self._host, self._port, timeout=HTTP_TIMEOUT)
+
+    def _roundtrip(self, conn, method, path, body, headers) -> tuple[http.client.HTTPConnection, int, bytes]:
+        """One request; on failure the connection it used is closed."""
+        for attempt in range(2):
+            if conn is None:
+                conn = self._connect()
+            try:
+                conn.request(method, self._prefix + path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                return conn, resp.status, resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; reconnect once.
+                conn.close()
+                conn = None
+                if attempt:
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+        raise AssertionError("unreachable")
+
+    async def request(self, method: str, path: str, body: bytes | None = None,
+                      headers: dict | None = None) -> tuple[int, bytes]:
+        conn = await self._idle.get()
+        roundtrip = asyncio.ensure_future(asyncio.to_thread(self._roundtrip, conn, method, path, body, headers))
+        try:
+            conn, status, data = await asyncio.shield(roundtrip)
+        except asyncio.CancelledError:
+            # The thread is still using the connection: poisoned, dropped when it returns.
+            roundtrip.add_done_callback(self._discard)
+            raise
+        except BaseException:
+            self._idle.put_nowait(None)
+            raise
+        self._idle.put_nowait(conn)
+        return status, data
+
+    def _discard(self, roundtrip: asyncio.Future) -> None:
+        if not roundtrip.cancelled() and roundtrip.exception() is None:
+            roundtrip.result()[0].close()
+        self._idle.put_nowait(None)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+def encode_multipart(fields: list[tuple[str, str, bytes, str]]) -> tuple[bytes, str]:
+    """fields: (name, filename, data, content_type). Returns (body, content-type header)."""
+    boundary = uuid.uuid4().hex
+    out = []
+    for name, filename, data, ctype in fields:
+        out.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {ctype}\r\n\r\n".encode()
+        )
+        out.append(data)
+        out.append(b"\r\n")
+    out.append(f"--{boundary}--\r\n".encode())
+    return b"".join(out), f"multipart/form-data; boundary={boundary}"
+
+
+class ParsrClient:
+    def __init__(self, pool: ConnectionPool, sleep=asyncio.sleep):
+        self.pool = pool
+        self._sleep = sleep
+
+    async def submit(self, pdf: Path, config: Path) -> str:
+        body, ctype = encode_multipart([
+            ("file", pdf.name, pdf.read_bytes(), "application/pdf"),
+            ("config", config.name, config.read_bytes(), "application/json"),
+        ])
+        status, data = await self.pool.request("POST", "/api/v1/document", body, {"Content-Type": ctype})
+        if status >= 300:
+            raise ParsrError(f"submission failed: HTTP {status}")
+        return data.decode().strip().strip('"')
+
+    async def wait(self, job_id: str) -> int:
+        """Poll the queue until the job reports done; returns the poll count."""
+        delay = POLL_INITIAL
+        polls = 0
+        while True:
+            await self._sleep(delay)
+            polls += 1
+            status, data = await self.pool.request("GET", f"/api/v1/queue/{job_id}")
+            if status >= 400:
+                raise ParsrError(f"queue lookup failed: HTTP {status}")
+            try:
+                info = json.loads(data or b"{}")
+            except json.JSONDecodeError:
+                info = {}
+            # Parsr answers with the job's status while processing and with
+            # the finished document descriptor (which carries an id) when done.
+            if isinstance(info, dict) and "id" in info:
+                return polls
+            delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+    async def fetch(self, job_id: str, kind: str) -> bytes | None:
+        status, data = await self.pool.request("GET", f"/api/v1/{kind}/{job_id}")
+        if status >= 300 or not data:
+            return None
+        return data
+
+
+def render_html(json_path: str, fixture: str) -> str:
+    """json-to-html in a worker process, off the event loop."""
+    return scriptloader.load("json-to-html").parsr_json_to_html(json_path, fixture)
+
+
+async def convert_one(client: ParsrClient, fixture_dir: Path, output_dir: Path, slots: asyncio.Semaphore,
+                      deadline: float, renderer: Executor) -> dict:
+    fixture = fixture_dir.name
+    pdf = fixture_dir / "source.pdf"
+    local_json = output_dir / f"{fixture}.parsr.json"
+    local_md = output_dir / f"{fixture}.parsr.md"
+    local_html = output_dir / f"{fixture}.html"
+    start = time.perf_counter()
+
+    def result(status: str, output: str = "", size: int = 0) -> dict:
+        return {"fixture": fixture, "status": status, "output": output, "bytes": size,
+                "duration": round(time.perf_counter() - start, 3)}
+
+    async with slots:
+        try:
+            async with asyncio.timeout(deadline):
+                try:
+                    job_id = await client.submit(pdf, CONFIG)
+                except (ParsrError, OSError, http.client.HTTPException) as e:
+                    print(f"[parsr] ERROR: submission failed for {fixture}: {e}")
+                    return result("failed", "submission-error")
+                print(f"[parsr]   {fixture}: job {job_id}")
+                polls = await client.wait(job_id)
+                print(f"[parsr]   {fixture}: done after {polls} polls")
+                json_bytes = await client.fetch(job_id, "json")
+                md_bytes = await client.fetch(job_id, "markdown")
+        except TimeoutError:
+            print(f"[parsr] TIMEOUT {fixture}")
+            return result("timeout")
+        except (ParsrError, OSError, http.client.HTTPException) as e:
+            print(f"[parsr] ERROR {fixture}: {e}")
+            return result("failed")
+
+    # The slot is released before converting so the next PDF is already
+    # submitted while this one is rendered.
+    if not json_bytes:
+        print(f"[parsr] ERROR: no JSON output for {fixture}")
+        return result("no-json")
+    local_json.write_bytes(json_bytes)
+    if md_bytes:
+        local_md.write_bytes(md_bytes)
+
+    try:
+        # Rendering is CPU-bound; in a process it does not hold up other jobs' polls and deadlines.
+        html = await asyncio.get_running_loop().run_in_executor(renderer, render_html, str(local_json), fixture)
+        local_html.write_text(html, encoding="utf-8")
+    except Exception as e:
+        print(f"[parsr] ERROR: json-to-html failed for {fixture}: {e}")
+        return result("conversion-error", str(local_html))
+
+    size = local_html.stat().st_size
+    print(f"[parsr] OK {fixture} → {fixture}.html ({size} bytes)")
+    return result("done", str(local_html), size)
+
+
+async def run(fixture_dirs: list[Path], output_dir: Path, url: str, concurrency: int, deadline: float,
+              store_run: Run) -> list[dict]:
+    pool = ConnectionPool(url, concurrency + 2)
+    client = ParsrClient(pool)
+    slots = asyncio.Semaphore(concurrency)
+    renderer = ProcessPoolExecutor(max_workers=min(concurrency, os.cpu_count() or 1))
+    try:
+        tasks = [asyncio.create_task(convert_one(client, d, output_dir, slots, deadline, renderer))
+                 for d in fixture_dirs if (d / "source.pdf").exists()]
+        results = []
+        for task in asyncio.as_completed(tasks):
+            record = await task
+            store_run.record(record["fixture"], record["status"], data=record)
+            results.append(record)
+    finally:
+        await pool.close()
+        renderer.shutdown()
+    results.sort(key=lambda r: r["fixture"])
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert fixtures through the Parsr HTTP API.")
+    parser.add_argument("fixtures", nargs="*", help="fixture names (default: all)")
+    parser.add_argument("--url", default=PARSR_URL)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--deadline", type=float, default=JOB_DEADLINE, help="per-job deadline in seconds")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixture_dirs = [FIXTURES_DIR / name for name in args.fixtures]
+    else:
+        fixture_dirs = sorted(d for d in FIXTURES_DIR.iterdir() if d.is_dir())
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    store = ResultStore()
+    store_run = store.begin(tool_name(args.output_dir), "convert")
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run(fixture_dirs, args.output_dir, args.url, args.concurrency, args.deadline, store_run))
+    finally:
+        store.close()
+    args.results.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    done = [r for r in results if r["status"] == "done"]
+    failed = [r for r in results if r["status"] != "done"]
+    print()
+    print(f"[parsr] Results: {args.results} (run {store_run.run})")
+    print(f"  done:   {len(done)}/{len(results)} in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print(f"  failed: {[(r['fixture'], r['status']) for r in failed]}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
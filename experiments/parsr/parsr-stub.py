@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+parsr-stub.py — Local stand-in for the Parsr HTTP API, to test parsr-client.py.
+
+Serves the endpoints parsr-client.py uses, without Docker or Parsr:
+
+  POST /api/v1/document       multipart upload (file, config); answers the job id
+  GET  /api/v1/queue/<id>     200 with the job's progress while it runs, then
+                              201 with the document descriptor, which has an id
+  GET  /api/v1/json/<id>      the Parsr JSON of a finished job
+  GET  /api/v1/markdown/<id>  its markdown
+
+A job runs for --job-seconds after its upload. A PDF that is one of the
+benchmark fixtures is answered with that fixture's recorded output/
+<fixture>.parsr.json and .parsr.md, so a client run against the stub
+reproduces the committed outputs; any other PDF gets a document of one
+line per page. --fail-every N answers every Nth upload with HTTP 500, and
+--stall-every N leaves every Nth job running forever, which exercises the
+client's per-job deadline.
+
+Usage:
+  python3 parsr-stub.py [--host H] [--port P] [--job-seconds S]
+                        [--fail-every N] [--stall-every N]
+  python3 parsr-client.py --url http://localhost:3001 --output-dir /tmp/parsr [fixture ...]
+"""
+from __future__ import annotations
+
+import argparse
+import email
+import email.policy
+import hashlib
+import json
+import math
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = SCRIPT_DIR / "../../benchmark/fixtures"
+RECORDED_DIR = SCRIPT_DIR / "output"
+
+HOST = "127.0.0.1"
+PORT = 3001              # Parsr's own port, so the client's default --url works
+JOB_SECONDS = 0.5        # s: from upload until the queue reports the job done
+
+_PAGE = re.compile(rb"/Type\s*/Page(?!s)")
+_PATH = re.compile(r"^/api/v1/(queue|json|markdown)/(\w+)$")
+
+
+@dataclass
+class Job:
+    name: str
+    ready_at: float      # time.monotonic(); math.inf for a stalled job
+    json: bytes
+    markdown: bytes
+
+
+def recorded_outputs(fixtures_dir: Path = FIXTURES_DIR, recorded_dir: Path = RECORDED_DIR) -> dict[str, str]:
+    """sha256 of each fixture's source.pdf -> fixture name, for fixtures with a recorded Parsr JSON."""
+    index = {}
+    for pdf in sorted(fixtures_dir.glob("*/source.pdf")):
+        fixture = pdf.parent.name
+        if (recorded_dir / f"{fixture}.parsr.json").exists():
+            index[hashlib.sha256(pdf.read_bytes()).hexdigest()] = fixture
+    return index
+
+
+def synthetic_document(pdf: bytes) -> tuple[bytes, bytes]:
+    """(JSON, markdown) of a document with one line per page of `pdf`."""
+    pages = max(len(_PAGE.findall(pdf)), 1)
+    font = {"id": 1, "name": "Stub", "size": 12, "weight": "medium", "isItalic": False,
+            "isUnderline": False, "color": "#000000", "sizeUnit": "px"}
+    doc = {"metadata": [], "fonts": [font], "pages": []}
+    for n in range(1, pages + 1):
+        words = [{"id": n * 10 + k, "type": "word", "properties": {}, "metadata": [],
+                  "box": {"l": 72 + 48 * k, "t": 72, "w": 40, "h": 12}, "font": 1, "fontSize": 12,
+                  "content": text} for k, text in enumerate(("stub", "page", str(n)))]
+        doc["pages"].append({"margins": {"l": 0, "t": 0, "r": 0, "b": 0}, "box": {"l": 0, "t": 0, "w": 612, "h": 792},
+                             "rotation": {"degrees": 0, "origin": {"x": 306, "y": 396}, "translation": {"x": 0, "y": 0}},
+                             "pageNumber": n, "elements": words})
+    markdown = "".join(f"stub page {n}\n\n" for n in range(1, pages + 1))
+    return json.dumps(doc).encode(), markdown.encode()
+
+
+def uploaded_file(body: bytes, content_type: str) -> bytes | None:
+    """The "file" part of a multipart/form-data body."""
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body,
+                                       policy=email.policy.HTTP)
+    if not message.is_multipart():
+        return None
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+    return None
+
+
+class StubParsr:
+    """Job table shared by the request threads."""
+
+    def __init__(self, job_seconds: float, fail_every: int, stall_every: int):
+        self.job_seconds = job_seconds
+        self.fail_every = fail_every
+        self.stall_every = stall_every
+        self.recorded = recorded_outputs()
+        self.jobs: dict[str, Job] = {}
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+    def submit(self, pdf: bytes) -> tuple[int, bytes]:
+        with self._lock:
+            self.uploads += 1
+            upload = self.uploads
+        if self.fail_every and upload % self.fail_every == 0:
+            return 500, b'"stub: failed upload"'
+        fixture = self.recorded.get(hashlib.sha256(pdf).hexdigest())
+        if fixture:
+            md_path = RECORDED_DIR / f"{fixture}.parsr.md"
+            job = Job(fixture, 0.0, (RECORDED_DIR / f"{fixture}.parsr.json").read_bytes(),
+                      md_path.read_bytes() if md_path.exists() else b"")
+        else:
+            job = Job(f"upload {upload}", 0.0, *synthetic_document(pdf))
+        stalled = self.stall_every and upload % self.stall_every == 0
+        job.ready_at = math.inf if stalled else time.monotonic() + self.job_seconds
+        job_id = secrets.token_hex(15)
+        with self._lock:
+            self.jobs[job_id] = job
+        print(f"[parsr-stub] job {job_id}: {job.name}{' (stalled)' if stalled else ''}")
+        return 202, json.dumps(job_id).encode()
+
+    def get(self, kind: str, job_id: str) -> tuple[int, bytes]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return 404, b'"stub: no such job"'
+        remaining = job.ready_at - time.monotonic()
+        if kind == "queue":
+            if remaining > 0:
+                progress = 0 if math.isinf(remaining) else round(100 * (1 - remaining / self.job_seconds))
+                return 200, json.dumps({"progress-percentage": progress, "status": "processing"}).encode()
+            return 201, json.dumps({"id": job_id, "fileName": "source.pdf",
+                                    "json": f"/api/v1/json/{job_id}",
+                                    "markdown": f"/api/v1/markdown/{job_id}"}).encode()
+        if remaining > 0:
+            return 404, b'"stub: job not finished"'
+        return 200, job.json if kind == "json" else job.markdown
+
+
+def handler(stub: StubParsr) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, as the client's connection pool expects
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != "/api/v1/document":
+                return self._send(404, b'"stub: unknown endpoint"')
+            pdf = uploaded_file(body, self.headers.get("Content-Type", ""))
+            if not pdf:
+                return self._send(400, b'"stub: no file part"')
+            self._send(*stub.submit(pdf))
+
+        def do_GET(self):
+            match = _PATH.match(self.path)
+            if not match:
+                return self._send(404, b'"stub: unknown endpoint"')
+            self._send(*stub.get(*match.groups()))
+
+        def _send(self, status: int, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # submissions are logged by StubParsr; polls would drown them
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Parsr HTTP API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--job-seconds", type=float, default=JOB_SECONDS, help="processing time of every job")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth upload with HTTP 500")
+    parser.add_argument("--stall-every", type=int, default=0, help="never finish every Nth job")
+    args = parser.parse_args()
+
+    stub = StubParsr(args.job_seconds, args.fail_every, args.stall_every)
+    server = ThreadingHTTPServer((args.host, args.port), handler(stub))
+    server.daemon_threads = True
+    print(f"[parsr-stub] listening on {args.host}:{args.port}; {len(stub.recorded)} recorded fixtures")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
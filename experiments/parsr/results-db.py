@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+results-db.py — Record and query the results store (resultstore.py).
+
+Queries:
+  runs        every run with its commit, result count and mean score
+  categories  mean score per fixture complexity (S / M / C, from the
+              benchmark README's fixture index), one column per tool,
+              using each tool's latest run of the metric
+  delta       per-fixture score change between two runs; by default the
+              two latest runs of --tool, or the latest runs of --tool and
+              --against, e.g. our json-to-html output against Docling's
+
+Recording, for shell scripts (convert.sh):
+  begin       start a run and print its id
+  record      append one fixture's result to a run
+  export      print a run's records as the JSON list the scripts used to write
+  import      load an existing results JSON file as a run, so the history
+              starts before the store did
+
+Usage:
+  python3 results-db.py runs [--tool TOOL] [--metric METRIC]
+  python3 results-db.py categories [--metric METRIC]
+  python3 results-db.py delta [--metric METRIC] --tool TOOL [--against TOOL] [RUN_A RUN_B]
+  python3 results-db.py begin --tool TOOL --metric METRIC [--label TEXT]
+  python3 results-db.py record RUN FIXTURE STATUS [--score X] [--data JSON]
+  python3 results-db.py export RUN
+  python3 results-db.py import FILE --tool TOOL --metric METRIC [--score-field FIELD]
+
+  The database is experiments/.cache/results.sqlite, or $RESULTS_DB.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from resultstore import DB_PATH, EXPERIMENTS_DIR, ResultStore
+
+BENCHMARK_README = EXPERIMENTS_DIR.parent / "benchmark" / "README.md"
+COMPLEXITIES = ("S", "M", "C")  # simple, medium, complex
+SCORE_FIELDS = {"evaluate": "score", "compare": "overall_score"}  # metric -> record field holding its score
+
+_INDEX_ROW = re.compile(r"^\|\s*(\d+)\s*\|\s*([a-z0-9-]+)\s*\|\s*([SMC])\s*\|", re.MULTILINE)
+
+
+def fixture_categories(readme: Path = BENCHMARK_README) -> dict[str, str]:
+    """Fixture name -> complexity, read from the README's fixture index table."""
+    if not readme.exists():
+        return {}
+    return {f"{num}-{slug}": cx for num, slug, cx in _INDEX_ROW.findall(readme.read_text(encoding="utf-8"))}
+
+
+def mean(values: list[float]) -> float | None:
+    return sum(values) / len(values) if values else None
+
+
+def fmt(value: float | None, width: int = 8) -> str:
+    return f"{value:{width}.3f}" if value is not None else f"{'-':>{width}}"
+
+
+# ── Queries ─────────────────────────────────────────────────────────────────
+
+def show_runs(store: ResultStore, tool: str | None, metric: str | None) -> int:
+    for r in store.runs(tool, metric):
+        label = f"  {r['label']}" if r["label"] else ""
+        print(f"{r['run']}  {r['metric']:8s} {r['tool']:24s} {r['git_commit']:18s} "
+              f"{r['results']:4d} results  mean {fmt(r['mean_score'])}{label}")
+    return 0
+
+
+def show_categories(store: ResultStore, metric: str) -> int:
+    categories = fixture_categories()
+    columns = {}
+    for tool in store.tools(metric):
+        latest = store.latest_runs(tool, metric)
+        if latest:
+            columns[tool] = [r for r in store.results(latest[0]) if r["score"] is not None]
+    if not columns:
+        print(f"[results] no {metric} results in {store.path}")
+        return 1
+    width = max(10, *(len(t) for t in columns))
+    print(f"{'category':10s} " + " ".join(f"{t:>{width}s}" for t in columns))
+    for category in (*COMPLEXITIES, "?", "all"):
+        cells = []
+        for rows in columns.values():
+            scores = [r["score"] for r in rows if category == "all" or categories.get(r["fixture"], "?") == category]
+            cells.append(f"{fmt(mean(scores), width - 5)} ({len(scores):2d})" if scores else f"{'-':>{width}s}")
+        if category != "?" or any(c.strip() != "-" for c in cells):
+            print(f"{category:10s} " + " ".join(cells))
+    print("latest runs: " + ", ".join(f"{t}={store.latest_runs(t, metric)[0]}" for t in columns))
+    return 0
+
+
+def show_delta(store: ResultStore, metric: str, tool: str | None, against: str | None,
+               runs: list[str]) -> int:
+    if runs:
+        if len(runs) != 2:
+            print("[results] delta takes two runs: RUN_A RUN_B", file=sys.stderr)
+            return 2
+        run_a, run_b = runs
+    elif tool and against:
+        latest = [store.latest_runs(t, metric) for t in (against, tool)]
+        if not all(latest):
+            print(f"[results] need {metric} runs of both {against} and {tool}", file=sys.stderr)
+            return 1
+        run_a, run_b = latest[0][0], latest[1][0]
+    elif tool:
+        latest = store.latest_runs(tool, metric, 2)
+        if len(latest) < 2:
+            print(f"[results] need two {metric} runs of {tool}", file=sys.stderr)
+            return 1
+        run_b, run_a = latest
+    else:
+        print("[results] delta needs --tool or two runs", file=sys.stderr)
+        return 2
+
+    a = {r["fixture"]: r["score"] for r in store.results(run_a)}
+    b = {r["fixture"]: r["score"] for r in store.results(run_b)}
+    print(f"a = {run_a}\nb = {run_b}")
+    print(f"{'fixture':32s} {'a':>8s} {'b':>8s} {'b - a':>8s}")
+    changes = []
+    for fixture in sorted(set(a) | set(b)):
+        sa, sb = a.get(fixture), b.get(fixture)
+        change = sb - sa if sa is not None and sb is not None else None
+        if change is not None:
+            changes.append(change)
+        if change != 0:
+            print(f"{fixture:32s} {fmt(sa)} {fmt(sb)} {fmt(change)}")
+    both = [f for f in a if f in b and a[f] is not None and b[f] is not None]
+    print(f"{'mean over ' + str(len(both)) + ' shared':32s} {fmt(mean([a[f] for f in both]))} "
+          f"{fmt(mean([b[f] for f in both]))} {fmt(mean(changes))}")
+    print(f"better {sum(c > 0 for c in changes)}, worse {sum(c < 0 for c in changes)}, "
+          f"unchanged {sum(c == 0 for c in changes)}")
+    return 0
+
+
+# ── Recording ───────────────────────────────────────────────────────────────
+
+def import_file(store: ResultStore, path: Path, tool: str, metric: str, score_field: str | None) -> int:
+    records = json.loads(path.read_text(encoding="utf-8"))
+    # The commit that last wrote the file is the closest thing to the run's commit.
+    log = subprocess.run(["git", "-C", str(path.parent), "log", "-1", "--abbrev=12", "--format=%h %ct", "--", path.name],
+                         capture_output=True, text=True)
+    commit, started = log.stdout.split() if log.returncode == 0 and log.stdout.strip() else ("unknown", None)
+    run = store.begin(tool, metric, label=f"import {path.name}", commit=commit,
+                      started=float(started) if started else path.stat().st_mtime)
+    field = score_field or SCORE_FIELDS.get(metric)
+    for record in records:
+        record = dict(record)
+        fixture = record.pop("fixture")
+        status = record.pop("status", "done" if field and field in record else "unknown")
+        run.record(fixture, status, record.get(field) if field else None, record)
+    print(run.run)
+    print(f"[results] imported {len(records)} records from {path} as {tool} {metric}", file=sys.stderr)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record and query per-fixture results across runs and tools.")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("runs", help="list runs")
+    p.add_argument("--tool")
+    p.add_argument("--metric")
+    p = sub.add_parser("categories", help="mean score per fixture complexity, per tool")
+    p.add_argument("--metric", default="evaluate")
+    p = sub.add_parser("delta", help="per-fixture score change between two runs")
+    p.add_argument("runs", nargs="*", metavar="RUN")
+    p.add_argument("--metric", default="evaluate")
+    p.add_argument("--tool", help="latest run of this tool (b)")
+    p.add_argument("--against", help="compared with the latest run of this tool (a); default: its previous run")
+
+    p = sub.add_parser("begin", help="start a run and print its id")
+    p.add_argument("--tool", required=True)
+    p.add_argument("--metric", required=True)
+    p.add_argument("--label", default="")
+    p = sub.add_parser("record", help="append one result to a run")
+    p.add_argument("run")
+    p.add_argument("fixture")
+    p.add_argument("status")
+    p.add_argument("--score", type=float, default=None)
+    p.add_argument("--data", default="{}", help="JSON object of further fields")
+    p = sub.add_parser("export", help="print a run's records as JSON")
+    p.add_argument("run")
+    p = sub.add_parser("import", help="load a results JSON file as a run")
+    p.add_argument("file", type=Path)
+    p.add_argument("--tool", required=True)
+    p.add_argument("--metric", required=True)
+    p.add_argument("--score-field", default=None, help="record field holding the score")
+    args = parser.parse_args()
+
+    store = ResultStore(args.db)
+    try:
+        if args.command == "runs":
+            return show_runs(store, args.tool, args.metric)
+        if args.command == "categories":
+            return show_categories(store, args.metric)
+        if args.command == "delta":
+            return show_delta(store, args.metric, args.tool, args.against, args.runs)
+        if args.command == "begin":
+            print(store.begin(args.tool, args.metric, args.label).run)
+        elif args.command == "record":
+            store.open(args.run).record(args.fixture, args.status, args.score, json.loads(args.data))
+        elif args.command == "export":
+            print(json.dumps([r["data"] for r in store.results(args.run)], indent=2))
+        elif args.command == "import":
+            return import_file(store, args.file, args.tool, args.metric, args.score_field)
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
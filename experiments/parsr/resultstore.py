@@ -0,0 +1,183 @@
+"""
+Append-only store of per-fixture results from every experiment.
+
+convert.sh, compare-with-subagents.py and docling's evaluate.py each kept
+their results in a JSON file they rewrote on every save, so each run
+replaced the last, and results from different tools could not be joined.
+Here every result is one row appended to a SQLite database, tagged with
+
+  tool     the output directory scored, relative to experiments/:
+           "parsr/output" (json-to-html), "parsr/output-markdown",
+           "docling/output", "pdf2json/output"
+  metric   what the row measures: "convert", "compare" or "evaluate"
+  run      one invocation of a script (ResultStore.begin)
+  commit   the git commit the run was made from (git_commit(), shared
+           with bench-stages.py), "-dirty" when experiments/ had
+           uncommitted edits
+
+Rows are never updated or deleted, so every earlier run stays queryable.
+Each append is a single-row transaction in WAL mode: its cost does not
+grow with the history, and a crash loses at most the row being written.
+Several processes may append at once; SQLite serializes the writers.
+
+results-db.py is the command line: it records from shell scripts, imports
+old JSON files and prints per-category averages and run-over-run deltas.
+
+Usage:
+  store = ResultStore()
+  run = store.begin("docling/output", "evaluate")
+  run.record("01-basic-paragraphs", "done", 5.0, {"text_fidelity": 2, ...})
+"""
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import sqlite3
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+EXPERIMENTS_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = Path(os.environ.get("RESULTS_DB", EXPERIMENTS_DIR / ".cache" / "results.sqlite"))
+BUSY_TIMEOUT = 30.0  # s: how long an append waits for another writer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run        TEXT PRIMARY KEY,
+    tool       TEXT NOT NULL,
+    metric     TEXT NOT NULL,
+    git_commit TEXT NOT NULL,
+    started    REAL NOT NULL,
+    label      TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS results (
+    id         INTEGER PRIMARY KEY,
+    run        TEXT NOT NULL REFERENCES runs(run),
+    tool       TEXT NOT NULL,
+    metric     TEXT NOT NULL,
+    git_commit TEXT NOT NULL,
+    fixture    TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    score      REAL,
+    recorded   REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_tool_fixture ON results(tool, fixture, run, git_commit);
+CREATE INDEX IF NOT EXISTS results_run ON results(run, fixture);
+CREATE INDEX IF NOT EXISTS results_commit ON results(git_commit, tool);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs(tool, metric, started);
+"""
+
+
+def git_commit(path: Path = EXPERIMENTS_DIR) -> str:
+    """HEAD as 12 hex digits, "-dirty" when anything under `path` is uncommitted; "unknown" outside git.
+
+    The key every experiment stores its runs under, so that runs from the
+    same tree compare across stores.
+    """
+    def git(*args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", "-C", str(path), *args], capture_output=True, text=True)
+
+    try:
+        head = git("rev-parse", "--short=12", "HEAD")
+        if head.returncode:
+            return "unknown"
+        dirty = bool(git("status", "--porcelain", "--", ".").stdout.strip())
+    except OSError:
+        return "unknown"
+    return head.stdout.strip() + ("-dirty" if dirty else "")
+
+
+def tool_name(output_dir: Path) -> str:
+    """The tool an output directory's results are stored under: its path relative to experiments/."""
+    path = output_dir.resolve()
+    try:
+        return path.relative_to(EXPERIMENTS_DIR).as_posix()
+    except ValueError:
+        return str(path)  # a scratch directory outside the tree keeps its own history
+
+
+def new_run_id() -> str:
+    """Run ids sort by start time; the random suffix separates runs started in the same second."""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(3)}"
+
+
+@dataclass(frozen=True)
+class Run:
+    store: "ResultStore"
+    run: str
+    tool: str
+    metric: str
+    commit: str
+
+    def record(self, fixture: str, status: str, score: float | None = None, data: dict | None = None) -> None:
+        """Append one fixture's result; `data` is kept as JSON alongside the indexed columns."""
+        record = {"fixture": fixture, "status": status, **(data or {})}
+        self.store.db.execute(
+            "INSERT INTO results (run, tool, metric, git_commit, fixture, status, score, recorded, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run, self.tool, self.metric, self.commit, fixture, status, score, time.time(),
+             json.dumps(record)))
+
+
+class ResultStore:
+    """The results database; open one per process."""
+
+    def __init__(self, path: Path = DB_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Autocommit: every statement is its own transaction.
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL: a crash keeps every committed row
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def begin(self, tool: str, metric: str, label: str = "", commit: str | None = None,
+              run: str | None = None, started: float | None = None) -> Run:
+        run = run or new_run_id()
+        commit = commit or git_commit()
+        self.db.execute("INSERT INTO runs (run, tool, metric, git_commit, started, label) VALUES (?, ?, ?, ?, ?, ?)",
+                        (run, tool, metric, commit, time.time() if started is None else started, label))
+        return Run(self, run, tool, metric, commit)
+
+    def open(self, run: str) -> Run:
+        """A run begun earlier, possibly by another process, to append to."""
+        row = self.db.execute("SELECT * FROM runs WHERE run = ?", (run,)).fetchone()
+        if row is None:
+            raise KeyError(f"no run {run!r} in {self.path}")
+        return Run(self, row["run"], row["tool"], row["metric"], row["git_commit"])
+
+    def runs(self, tool: str | None = None, metric: str | None = None) -> list[dict]:
+        """Runs, oldest first, with their result count and mean score."""
+        rows = self.db.execute(
+            "SELECT runs.*, COUNT(results.id) AS results, AVG(results.score) AS mean_score"
+            " FROM runs LEFT JOIN results USING (run)"
+            " WHERE (:tool IS NULL OR runs.tool = :tool) AND (:metric IS NULL OR runs.metric = :metric)"
+            " GROUP BY runs.run ORDER BY runs.started, runs.run",
+            {"tool": tool, "metric": metric})
+        return [dict(r) for r in rows]
+
+    def latest_runs(self, tool: str, metric: str, count: int = 1) -> list[str]:
+        """The `count` most recent runs of a tool that recorded results, newest first."""
+        rows = self.db.execute(
+            "SELECT run FROM runs WHERE tool = ? AND metric = ?"
+            " AND EXISTS (SELECT 1 FROM results WHERE results.run = runs.run)"
+            " ORDER BY started DESC, run DESC LIMIT ?", (tool, metric, count))
+        return [r["run"] for r in rows]
+
+    def tools(self, metric: str) -> list[str]:
+        return [r["tool"] for r in self.db.execute(
+            "SELECT DISTINCT tool FROM runs WHERE metric = ? ORDER BY tool", (metric,))]
+
+    def results(self, run: str) -> list[dict]:
+        """One row per fixture; a fixture recorded twice in a run keeps its last result."""
+        rows = self.db.execute(
+            "SELECT fixture, status, score, data FROM results WHERE run = ? ORDER BY fixture, id", (run,))
+        latest = {r["fixture"]: {**dict(r), "data": json.loads(r["data"])} for r in rows}
+        return list(latest.values())
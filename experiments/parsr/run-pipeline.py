@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+run-pipeline.py — Incremental runner for the experiment pipelines.
+
+convert.sh, convert-via-markdown.sh and docling/convert.sh rerun every step
+for every fixture. Here each step is a stage in a small DAG over per-fixture
+artifacts:
+
+  pdf ── parsr ──> parsr_json, parsr_md ── json-to-html ──> html ──────────┐
+   │                   └── json-to-markdown ──> markdown, model_html ── md-to-html ──> markdown_html
+   └── docling ──> docling_html              pdf2json ── pdf2json-to-html ──> pdf2json_html
+                                                          compare-* (vs source_html) ──> *_score
+
+A stage's key is a hash of its inputs' content, its parameters and the
+content of the scripts it runs (stagecache.py). A stage runs only when its
+key is not in the cache, so editing json-to-html.py or a threshold in
+wordtable.py reruns json-to-html and compare-html, and never Parsr or
+Docling.
+
+Container stages (parsr, docling) need the Parsr API or the Docling image.
+When they miss the cache and an output from an earlier convert.sh run
+exists, that output is adopted as the stage result (--no-adopt disables
+this), so a checkout with committed outputs never needs the containers.
+
+Usage:
+  python3 run-pipeline.py [--pipeline NAME ...] [--workers N] [--running MODE]
+                          [--no-adopt] [--output-dir DIR] [fixture ...]
+
+  Final artifacts are written to <output-dir>/<artifact>/<fixture>.<ext>
+  and per-stage records to <output-dir>/pipeline-results.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import scriptloader
+from stagecache import StageCache, file_digest, script_version, stage_key
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+EXPERIMENTS_DIR = SCRIPT_DIR.parent
+FIXTURES_DIR = (SCRIPT_DIR / "../../benchmark/fixtures").resolve()
+OUTPUT_DIR = SCRIPT_DIR / "pipeline-output"
+PARSR_OUTPUT = SCRIPT_DIR / "output"
+DOCLING_OUTPUT = EXPERIMENTS_DIR / "docling" / "output"
+DOCLING_IMAGE = "pdf-to-html-docling"
+DOCLING_MODELS = Path.home() / ".cache" / "docling-models"
+PARSR_URL = "http://localhost:3001"
+
+# Files each fixture directory provides, by artifact name.
+SOURCES = {"pdf": "source.pdf", "source_html": "source.html", "pdf2json": "source.json"}
+EXTENSIONS = {
+    "parsr_json": ".parsr.json", "parsr_md": ".parsr.md", "html": ".html", "markdown": ".md",
+    "model_html": ".html", "markdown_html": ".html", "markdown_engine": ".txt", "docling_html": ".html",
+    "pdf2json_html": ".html",
+}
+PIPELINES = {
+    "parsr": ["html_score"],
+    "parsr-markdown": ["markdown_score"],
+    "docling": ["docling_score"],
+    "pdf2json": ["pdf2json_score"],
+}
+
+
+class StageError(RuntimeError):
+    pass
+
+
+@dataclass
+class Options:
+    running: str = "strip"
+    adopt: bool = True
+    parsr_url: str = PARSR_URL
+    deadline: float = 270.0
+
+
+@dataclass
+class Stage:
+    name: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    run: Callable[[dict[str, Path], str, Options], dict[str, bytes]]
+    scripts: tuple[Path, ...] = ()
+    params: Callable[[str, Options], dict] = lambda fixture, options: {}
+    adopt: Callable[[str], dict[str, bytes] | None] | None = None
+    container: bool = False
+
+
+# ── Stage implementations ───────────────────────────────────────────────────
+
+def run_parsr(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    client_mod = scriptloader.load("parsr-client")
+
+    async def convert() -> tuple[bytes | None, bytes | None]:
+        pool = client_mod.ConnectionPool(options.parsr_url, 2)
+        client = client_mod.ParsrClient(pool)
+        try:
+            async with asyncio.timeout(options.deadline):
+                job_id = await client.submit(inputs["pdf"], client_mod.CONFIG)
+                await client.wait(job_id)
+                return await client.fetch(job_id, "json"), await client.fetch(job_id, "markdown")
+        finally:
+            await pool.close()
+
+    try:
+        json_bytes, md_bytes = asyncio.run(convert())
+    except (TimeoutError, OSError, client_mod.ParsrError) as e:
+        raise StageError(f"Parsr API: {type(e).__name__}: {e}") from e
+    if not json_bytes:
+        raise StageError("Parsr returned no JSON")
+    return {"parsr_json": json_bytes, "parsr_md": md_bytes or b""}
+
+
+def adopt_parsr(fixture: str) -> dict[str, bytes] | None:
+    json_path = PARSR_OUTPUT / f"{fixture}.parsr.json"
+    if not json_path.exists():
+        return None
+    md_path = PARSR_OUTPUT / f"{fixture}.parsr.md"
+    return {"parsr_json": json_path.read_bytes(), "parsr_md": md_path.read_bytes() if md_path.exists() else b""}
+
+
+def run_docling(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    # Same invocation as docling/convert.sh; build the image there first.
+    with tempfile.TemporaryDirectory() as work:
+        src, out = Path(work) / "in", Path(work) / "out"
+        src.mkdir()
+        out.mkdir()
+        shutil.copyfile(inputs["pdf"], src / "source.pdf")
+        DOCLING_MODELS.mkdir(parents=True, exist_ok=True)
+        cmd = ["docker", "run", "--rm", "-v", f"{src}:/workspace:ro", "-v", f"{out}:/output",
+               "-v", f"{DOCLING_MODELS}:/root/.cache/docling:rw", DOCLING_IMAGE,
+               "--to", "html", "--no-ocr", "--image-export-mode", "embedded",
+               "--output", "/output", "/workspace/source.pdf"]
+        try:
+            proc = subprocess.run(cmd, capture_output=True, timeout=options.deadline)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise StageError(f"docling: {type(e).__name__}: {e}") from e
+        if proc.returncode != 0:
+            raise StageError(f"docling exited with code {proc.returncode}")
+        produced = out / "source.html"
+        if not produced.exists():
+            produced = next(out.rglob("*.html"), None)
+        if produced is None:
+            raise StageError("docling wrote no HTML")
+        return {"docling_html": produced.read_bytes()}
+
+
+def adopt_docling(fixture: str) -> dict[str, bytes] | None:
+    path = DOCLING_OUTPUT / f"{fixture}.html"
+    return {"docling_html": path.read_bytes()} if path.exists() else None
+
+
+def run_json_to_html(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    j2h = scriptloader.load("json-to-html")
+    html = j2h.parsr_json_to_html(str(inputs["parsr_json"]), fixture, running=options.running)
+    return {"html": html.encode("utf-8")}
+
+
+def run_json_to_markdown(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    # Parsr's own markdown wins; when it is empty, recover the markdown and
+    # the HTML from one document model, as batch-convert.py --mode markdown
+    # does. model_html is empty when there is no model page.
+    md = inputs["parsr_md"].read_bytes()
+    if md:
+        return {"markdown": md, "model_html": b""}
+    md_text, page = scriptloader.load("json-to-markdown").json_to_markdown_and_html(inputs["parsr_json"], fixture)
+    return {"markdown": md_text.encode("utf-8"), "model_html": page.encode("utf-8")}
+
+
+def run_md_to_html(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    page = inputs["model_html"].read_bytes()
+    if page:
+        return {"markdown_html": page, "markdown_engine": b"docmodel"}
+    m2h = scriptloader.load("md-to-html")
+    md = inputs["markdown"].read_text(encoding="utf-8", errors="replace")
+    if not md.strip():
+        raise StageError("empty markdown")
+    body, engine = m2h.markdown_to_html(md, fixture)
+    return {"markdown_html": m2h.wrap_html(body, fixture).encode("utf-8"), "markdown_engine": engine.encode("utf-8")}
+
+
+def md_engines(fixture: str, options: Options) -> dict:
+    # Installed renderers change the output, so they are part of the key.
+    return {"title": fixture, "engines": list(scriptloader.load("md-to-html").available_engines())}
+
+
+def run_pdf2json_to_html(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+    p2h = scriptloader.load("pdf2json-to-html", EXPERIMENTS_DIR / "pdf2json")
+    html = "".join(p2h.iter_pdf2json_html(inputs["pdf2json"], fixture, options.running))
+    return {"pdf2json_html": html.encode("utf-8")}
+
+
+def compare_stage(name: str, generated: str, score: str) -> Stage:
+    def run(inputs: dict[str, Path], fixture: str, options: Options) -> dict[str, bytes]:
+        cmp = scriptloader.load("compare-with-subagents")
+        result = cmp.compare_files(fixture, inputs["source_html"], inputs[generated])
+        return {score: json.dumps(asdict(result)).encode("utf-8")}
+
+    return Stage(name, ("source_html", generated), (score,), run,
+                 scripts=(SCRIPT_DIR / "compare-with-subagents.py", SCRIPT_DIR / "htmlfeatures.py",
+                          SCRIPT_DIR / "similarity.py", SCRIPT_DIR / "treedist.py"))
+
+
+# Every module the Parsr converters import, so a change to any of them reruns their stages.
+PARSR_LIBS = tuple(SCRIPT_DIR / f for f in ("wordtable.py", "xycut.py", "runningbands.py", "jsonstream.py",
+                                            "wordstore.py", "tracing.py", "scriptloader.py"))
+
+STAGES = [
+    Stage("parsr", ("pdf",), ("parsr_json", "parsr_md"), run_parsr,
+          scripts=(SCRIPT_DIR / "parsr-config.json",), adopt=adopt_parsr, container=True),
+    Stage("docling", ("pdf",), ("docling_html",), run_docling,
+          scripts=(EXPERIMENTS_DIR / "docling" / "Dockerfile",), adopt=adopt_docling, container=True),
+    Stage("json-to-html", ("parsr_json",), ("html",), run_json_to_html,
+          scripts=(SCRIPT_DIR / "json-to-html.py",) + PARSR_LIBS,
+          params=lambda fixture, options: {"title": fixture, "running": options.running}),
+    Stage("json-to-markdown", ("parsr_json", "parsr_md"), ("markdown", "model_html"), run_json_to_markdown,
+          scripts=(SCRIPT_DIR / "json-to-markdown.py", SCRIPT_DIR / "docmodel.py", SCRIPT_DIR / "json-to-html.py",
+                   SCRIPT_DIR / "md-to-html.py") + PARSR_LIBS,
+          params=lambda fixture, options: {"title": fixture}),
+    Stage("md-to-html", ("markdown", "model_html"), ("markdown_html", "markdown_engine"), run_md_to_html,
+          scripts=(SCRIPT_DIR / "md-to-html.py", SCRIPT_DIR / "tracing.py"), params=md_engines),
+    Stage("pdf2json-to-html", ("pdf2json",), ("pdf2json_html",), run_pdf2json_to_html,
+          scripts=tuple((EXPERIMENTS_DIR / "pdf2json").glob("*.py")) + (SCRIPT_DIR / "json-to-html.py",) + PARSR_LIBS,
+          params=lambda fixture, options: {"title": fixture, "running": options.running}),
+    compare_stage("compare-html", "html", "html_score"),
+    compare_stage("compare-markdown", "markdown_html", "markdown_score"),
+    compare_stage("compare-docling", "docling_html", "docling_score"),
+    compare_stage("compare-pdf2json", "pdf2json_html", "pdf2json_score"),
+]
+BY_NAME = {s.name: s for s in STAGES}
+PRODUCER = {out: s for s in STAGES for out in s.outputs}
+
+
+def plan(targets: list[str]) -> list[str]:
+    """Names of the stages needed for `targets`, in dependency order."""
+    needed: set[str] = set()
+    pending = list(targets)
+    while pending:
+        artifact = pending.pop()
+        stage = PRODUCER.get(artifact)
+        if stage is None or stage.name in needed:
+            continue
+        needed.add(stage.name)
+        pending.extend(stage.inputs)
+    return [s.name for s in STAGES if s.name in needed]
+
+
+# ── Runner ──────────────────────────────────────────────────────────────────
+
+def run_fixture(fixture_dir: Path, stage_names: list[str], versions: dict[str, str],
+                options: Options, cache_root: Path) -> tuple[list[dict], dict[str, str]]:
+    """Run one fixture's stages; returns per-stage records and artifact digests."""
+    cache = StageCache(cache_root)
+    fixture = fixture_dir.name
+    digests: dict[str, str] = {}
+    paths: dict[str, Path] = {}
+    for artifact, filename in SOURCES.items():
+        path = fixture_dir / filename
+        if path.exists():
+            digests[artifact] = file_digest(path)
+            paths[artifact] = path
+
+    records = []
+    for name in stage_names:
+        stage = BY_NAME[name]
+        record = {"fixture": fixture, "stage": name}
+        start = time.perf_counter()
+        missing = [a for a in stage.inputs if a not in digests]
+        if missing:
+            records.append({**record, "status": "skipped", "error": f"missing {', '.join(missing)}"})
+            continue
+        key = stage_key(name, versions[name], stage.params(fixture, options),
+                        {a: digests[a] for a in stage.inputs})
+        entry = cache.lookup(key)
+        status = "hit"
+        if entry is None:
+            try:
+                outputs = stage.adopt(fixture) if stage.container and options.adopt else None
+                status = "adopted"
+                if outputs is None:
+                    outputs = stage.run({a: paths[a] for a in stage.inputs}, fixture, options)
+                    status = "run"
+            except Exception as e:
+                records.append({**record, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                                "duration": round(time.perf_counter() - start, 4)})
+                continue
+            entry = cache.store(key, name, outputs, {"fixture": fixture})
+        for artifact, digest in entry["outputs"].items():
+            digests[artifact] = digest
+            paths[artifact] = cache.blob_path(digest)
+        records.append({**record, "status": status, "key": key,
+                        "duration": round(time.perf_counter() - start, 4)})
+    return records, digests
+
+
+def materialize(cache: StageCache, output_dir: Path, fixture: str, digests: dict[str, str]) -> dict:
+    scores = {}
+    for artifact, digest in digests.items():
+        if artifact in SOURCES:
+            continue
+        blob = cache.blob_path(digest)
+        if artifact.endswith("_score"):
+            scores[artifact] = json.loads(blob.read_text(encoding="utf-8"))
+            continue
+        dest = output_dir / artifact / f"{fixture}{EXTENSIONS.get(artifact, '')}"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(blob, dest)
+    return scores
+
+
+def report(records: list[dict], stage_names: list[str]) -> None:
+    print(f"[pipeline] {'stage':18s} {'hit':>4s} {'run':>4s} {'adopt':>5s} {'fail':>4s} {'skip':>4s} "
+          f"{'hit-rate':>8s} {'time':>8s}")
+    for name in stage_names:
+        rows = [r for r in records if r["stage"] == name]
+        counts = {s: sum(1 for r in rows if r["status"] == s) for s in ("hit", "run", "adopted", "failed", "skipped")}
+        attempted = len(rows) - counts["skipped"]
+        rate = counts["hit"] / attempted if attempted else 0.0
+        spent = sum(r.get("duration", 0.0) for r in rows)
+        print(f"[pipeline] {name:18s} {counts['hit']:4d} {counts['run']:4d} {counts['adopted']:5d} "
+              f"{counts['failed']:4d} {counts['skipped']:4d} {rate:8.1%} {spent:7.2f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the experiment pipelines incrementally.")
+    parser.add_argument("fixtures", nargs="*", help="fixture names (default: all)")
+    parser.add_argument("--pipeline", action="append", choices=sorted(PIPELINES),
+                        help="pipeline to run; repeatable (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--running", choices=("strip", "tag", "keep"), default="strip")
+    parser.add_argument("--no-adopt", dest="adopt", action="store_false",
+                        help="run container stages instead of adopting existing outputs")
+    parser.add_argument("--parsr-url", default=PARSR_URL)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=StageCache().root)
+    args = parser.parse_args()
+
+    targets = [t for p in (args.pipeline or sorted(PIPELINES)) for t in PIPELINES[p]]
+    stage_names = plan(targets)
+    versions = {name: script_version(list(BY_NAME[name].scripts), name) for name in stage_names}
+    options = Options(running=args.running, adopt=args.adopt, parsr_url=args.parsr_url)
+    if args.fixtures:
+        fixture_dirs = [FIXTURES_DIR / name for name in args.fixtures]
+    else:
+        fixture_dirs = sorted(d for d in FIXTURES_DIR.iterdir() if d.is_dir())
+
+    cache = StageCache(args.cache_dir)
+    start = time.perf_counter()
+    records: list[dict] = []
+    summary: dict[str, dict] = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run_fixture, d, stage_names, versions, options, args.cache_dir): d.name
+                   for d in fixture_dirs}
+        for f in as_completed(futures):
+            fixture = futures[f]
+            fixture_records, digests = f.result()
+            records += fixture_records
+            summary[fixture] = materialize(cache, args.output_dir, fixture, digests)
+            ran = [r["stage"] for r in fixture_records if r["status"] in ("run", "adopted")]
+            failed = [r["stage"] for r in fixture_records if r["status"] == "failed"]
+            print(f"[pipeline] {fixture}: ran {ran or '-'}" + (f", FAILED {failed}" if failed else ""))
+    elapsed = time.perf_counter() - start
+
+    records.sort(key=lambda r: (r["fixture"], stage_names.index(r["stage"])))
+    results_file = args.output_dir / "pipeline-results.json"
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    results_file.write_text(json.dumps({"stages": records, "scores": dict(sorted(summary.items()))}, indent=2),
+                            encoding="utf-8")
+
+    report(records, stage_names)
+    for score in sorted({s for scores in summary.values() for s in scores}):
+        values = [v[score]["overall_score"] for v in summary.values() if score in v]
+        print(f"[pipeline] mean {score}: {sum(values) / len(values):.4f} over {len(values)} fixtures")
+    print(f"[pipeline] Results: {results_file} ({elapsed:.2f}s)")
+    return 0 if not any(r["status"] == "failed" for r in records) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
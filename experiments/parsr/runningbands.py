@@ -0,0 +1,108 @@
+"""
+Running header and footer detection across pages.
+
+The first and last BAND_LINES lines of every page are band candidates. Each
+gets a signature: which band it is in, its top quantized to POSITION_QUANTUM,
+and its text casefolded with digit runs masked, so "Page 2 of 13" and
+"Page 3 of 13" collide. Signatures go into a dict mapping signature to page
+count, so a document is processed in one pass and the cost is linear in the
+number of pages. A candidate line is a running band once its signature has
+been seen on MIN_PAGES pages.
+
+Decisions can lag the input by a fixed number of pages (`lookahead`), which
+lets streaming conversion classify page i after reading page i + lookahead
+instead of buffering the whole document.
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from wordtable import PageLayout, WordTable
+
+BAND_LINES = 2          # lines examined at the top and at the bottom of a page
+POSITION_QUANTUM = 8.0  # pt
+MIN_PAGES = 2
+LOOKAHEAD = 1           # pages of delay when streaming
+
+RUNNING_MODES = ("strip", "tag", "keep")
+
+_DIGITS = re.compile(r"\d+")
+
+
+def signature(band: str, top: float, text: str) -> str:
+    masked = _DIGITS.sub("#", " ".join(text.split()).casefold())
+    return f"{band}|{round(top / POSITION_QUANTUM)}|{masked}"
+
+
+@dataclass
+class PageBands:
+    """Band candidates of one page: (signature, word indices) per band."""
+
+    header: list[tuple[str, np.ndarray]] = field(default_factory=list)
+    footer: list[tuple[str, np.ndarray]] = field(default_factory=list)
+
+
+class RunningBandIndex:
+    def __init__(self, band_lines: int = BAND_LINES, min_pages: int = MIN_PAGES):
+        self.band_lines = band_lines
+        self.min_pages = min_pages
+        self.counts: dict[str, int] = {}
+
+    def add(self, words: WordTable, layout: PageLayout | None = None) -> PageBands:
+        """Register a page's band candidates and return them for classify().
+
+        `layout` is the page's PageLayout.build(words, columns=False), for
+        callers that have one already.
+        """
+        bands = PageBands()
+        if not len(words):
+            return bands
+        # Bands are the physically first and last lines, not the first and
+        # last in column reading order.
+        layout = layout or PageLayout.build(words, columns=False)
+        lines = layout.lines()
+        order = layout.order
+        content = layout.words.content
+        k = min(self.band_lines, len(lines) // 2)
+        for band, picked in (("header", lines[:k]), ("footer", lines[len(lines) - k:] if k else [])):
+            for line in picked:
+                text = " ".join(content[i] for i in line.tolist())
+                sig = signature(band, float(layout.words.top[line[0]]), text)
+                getattr(bands, band).append((sig, order[line]))
+        self.register(bands)
+        return bands
+
+    def register(self, bands: PageBands) -> None:
+        """Count a page's candidates; add() does this, merging pre-computed bands needs it alone."""
+        for sig in {s for s, _ in bands.header + bands.footer}:
+            self.counts[sig] = self.counts.get(sig, 0) + 1
+
+    def classify(self, bands: PageBands) -> tuple[np.ndarray, np.ndarray]:
+        """Word indices of the page's running header and footer lines."""
+        def running(candidates):
+            hits = [idx for sig, idx in candidates if self.counts.get(sig, 0) >= self.min_pages]
+            return np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+
+        return running(bands.header), running(bands.footer)
+
+
+def split_running_bands(pages, lookahead: int | None = LOOKAHEAD, index: RunningBandIndex | None = None):
+    """Yield (page, words, header_idx, footer_idx) for (page, WordTable) pairs.
+
+    With lookahead=None the whole document is indexed before the first page
+    is classified; otherwise at most lookahead + 1 pages are held.
+    """
+    index = index or RunningBandIndex()
+    pending: deque = deque()
+    for page, words in pages:
+        pending.append((page, words, index.add(words)))
+        if lookahead is not None and len(pending) > lookahead:
+            page, words, bands = pending.popleft()
+            yield (page, words, *index.classify(bands))
+    while pending:
+        page, words, bands = pending.popleft()
+        yield (page, words, *index.classify(bands))
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+scaling-report.py — Time and memory of each converter versus document length.
+
+Documents of increasing page counts are generated with synthetic-docs.py
+(same spec and seed apart from the length, reused across runs) and every
+converter runs on each in a fresh child process:
+
+  json-to-html          parsr_json_to_html (whole document in memory)
+  json-to-html-stream   stream_parsr_json_to_html
+  json-to-markdown      json_to_markdown
+  word-store-html       parsr_json_to_html on a word store (packed beforehand)
+  pdf2json-to-html      iter_pdf2json_html
+
+The child times the conversion itself, so interpreter start-up is left
+out, and the parent reads the child's peak RSS from os.wait4. Memory growth
+is the peak minus that of a child that only imports the converters.
+
+For each converter the slope of log(time) and log(memory growth) over
+log(pages) is fitted: 1.0 is linear, and anything above
+SUPERLINEAR_EXPONENT is flagged. Results go to <output-dir>/scaling-report.json
+and a log-log chart to scaling-report.svg.
+
+Usage:
+  python3 scaling-report.py [--pages 50,100,250,500,1000,2000] [--converter NAME ...]
+                            [--words-per-page N] [--columns N] [--tables F]
+                            [--headings F] [--seed N] [--output-dir DIR]
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import scriptloader
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PDF2JSON_DIR = SCRIPT_DIR.parent / "pdf2json"
+OUTPUT_DIR = SCRIPT_DIR / "scaling-output"
+PAGES = "50,100,250,500,1000,2000"
+SUPERLINEAR_EXPONENT = 1.15  # fitted log-log slope above which growth is flagged
+MIN_GROWTH_MB = 0.5          # memory growth floor, so the fit ignores noise near zero
+
+
+# ── Child: one conversion ───────────────────────────────────────────────────
+
+def _drain(chunks) -> int:
+    return sum(len(c) for c in chunks)
+
+
+def _convert(name: str, path: Path) -> int:
+    if name == "json-to-html" or name == "word-store-html":
+        return len(scriptloader.load("json-to-html").parsr_json_to_html(str(path), path.stem))
+    if name == "json-to-html-stream":
+        return _drain(scriptloader.load("json-to-html").stream_parsr_json_to_html(str(path), path.stem))
+    if name == "json-to-markdown":
+        return len(scriptloader.load("json-to-markdown").json_to_markdown(path))
+    if name == "pdf2json-to-html":
+        return _drain(scriptloader.load("pdf2json-to-html", PDF2JSON_DIR).iter_pdf2json_html(path, path.stem))
+    raise ValueError(f"unknown converter {name!r}")
+
+
+CONVERTERS = ("json-to-html", "json-to-html-stream", "json-to-markdown", "word-store-html", "pdf2json-to-html")
+
+
+def child(name: str, path: str) -> int:
+    for module in ("json-to-html", "json-to-markdown"):
+        scriptloader.load(module)
+    scriptloader.load("pdf2json-to-html", PDF2JSON_DIR)
+    start = time.perf_counter()
+    chars = _convert(name, Path(path)) if name != "noop" else 0
+    print(json.dumps({"seconds": time.perf_counter() - start, "chars": chars}))
+    return 0
+
+
+def run_child(name: str, path: Path) -> dict:
+    """Run one conversion in a fresh interpreter; adds its peak RSS in MB."""
+    proc = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--child", name, str(path)],
+                            stdout=subprocess.PIPE, cwd=SCRIPT_DIR)
+    out = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.stdout.close()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} on {path.name} exited with {proc.returncode}")
+    result = json.loads(out)
+    result["peak_mb"] = usage.ru_maxrss / 1024  # Linux reports KiB
+    return result
+
+
+# ── Report ──────────────────────────────────────────────────────────────────
+
+def exponent(pages: list[int], values: list[float]) -> float | None:
+    if len(pages) < 2:
+        return None
+    return round(float(np.polyfit(np.log(pages), np.log(values), 1)[0]), 3)
+
+
+def svg_panel(series: dict[str, list[tuple[int, float]]], x0: float, title: str, unit: str) -> list[str]:
+    """One log-log panel, 420 x 300 at x offset x0."""
+    w, h, pad = 420, 300, 50
+    xs = [x for pts in series.values() for x, _ in pts]
+    ys = [y for pts in series.values() for _, y in pts if y > 0]
+    if not xs or not ys:
+        return []
+    lx = (math.log10(min(xs)), math.log10(max(xs)) + 1e-9)
+    ly = (math.log10(min(ys)), math.log10(max(ys)) + 1e-9)
+
+    def px(x: float) -> float:
+        return x0 + pad + (math.log10(x) - lx[0]) / (lx[1] - lx[0]) * (w - 2 * pad)
+
+    def py(y: float) -> float:
+        return h - pad - (math.log10(max(y, 1e-9)) - ly[0]) / (ly[1] - ly[0]) * (h - 2 * pad)
+
+    out = [f'<text x="{x0 + w / 2}" y="20" text-anchor="middle" font-size="14">{html.escape(title)}</text>',
+           f'<rect x="{x0 + pad}" y="{pad}" width="{w - 2 * pad}" height="{h - 2 * pad}" fill="none" stroke="#999"/>',
+           f'<text x="{x0 + w / 2}" y="{h - 12}" text-anchor="middle" font-size="11">pages (log)</text>',
+           f'<text x="{x0 + 12}" y="{h / 2}" font-size="11" transform="rotate(-90 {x0 + 12} {h / 2})" '
+           f'text-anchor="middle">{html.escape(unit)} (log)</text>']
+    for x in sorted(set(xs)):
+        out.append(f'<text x="{px(x):.1f}" y="{h - pad + 14}" text-anchor="middle" font-size="9">{x}</text>')
+    for y in (min(ys), max(ys)):
+        out.append(f'<text x="{x0 + pad - 4}" y="{py(y):.1f}" text-anchor="end" font-size="9">{y:.3g}</text>')
+    colors = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b")
+    for k, (name, pts) in enumerate(series.items()):
+        color = colors[k % len(colors)]
+        points = " ".join(f"{px(x):.1f},{py(y):.1f}" for x, y in pts)
+        out.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"/>')
+        out.append(f'<text x="{x0 + pad + 6}" y="{pad + 14 + 13 * k}" font-size="10" fill="{color}">'
+                   f'{html.escape(name)}</text>')
+    return out
+
+
+def write_svg(path: Path, report: dict) -> None:
+    time_series = {c: [(r["pages"], r["seconds"]) for r in rows] for c, rows in report["converters"].items()}
+    mem_series = {c: [(r["pages"], r["growth_mb"]) for r in rows] for c, rows in report["converters"].items()}
+    parts = svg_panel(time_series, 0, "conversion time", "seconds") + \
+        svg_panel(mem_series, 440, "peak memory growth", "MB")
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg" width="860" height="300" font-family="sans-serif">\n'
+                    + "\n".join(parts) + "\n</svg>\n", encoding="utf-8")
+
+
+def main() -> int:
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        return child(sys.argv[2], sys.argv[3])
+
+    parser = argparse.ArgumentParser(description="Plot converter time and memory against page count.")
+    parser.add_argument("--pages", default=PAGES, help="comma-separated page counts")
+    parser.add_argument("--converter", action="append", choices=CONVERTERS, help="repeatable (default: all)")
+    parser.add_argument("--words-per-page", type=int, default=300)
+    parser.add_argument("--columns", type=int, default=1)
+    parser.add_argument("--tables", type=float, default=0.2)
+    parser.add_argument("--headings", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    synthetic = scriptloader.load("synthetic-docs")
+    pack = scriptloader.load("pack-words")
+    converters = args.converter or list(CONVERTERS)
+    sizes = sorted(int(n) for n in args.pages.split(","))
+    docs_dir = args.output_dir / "docs"
+
+    baseline = run_child("noop", Path(os.devnull))["peak_mb"]
+    print(f"[scaling] baseline child RSS: {baseline:.1f} MB")
+    rows: dict[str, list[dict]] = {c: [] for c in converters}
+    for pages in sizes:
+        spec = synthetic.DocSpec(pages, args.words_per_page, args.columns, args.tables, args.headings, args.seed)
+        paths = {fmt: docs_dir / f"{spec.name}.{fmt}.json" for fmt in ("parsr", "pdf2json")}
+        if not all(p.exists() for p in paths.values()):
+            synthetic.write_documents(spec, docs_dir, ("parsr", "pdf2json"))
+        store = docs_dir / f"{spec.name}.words"
+        if "word-store-html" in converters and not store.exists():
+            pack.pack_parsr(paths["parsr"], store)
+        inputs = {"pdf2json-to-html": paths["pdf2json"], "word-store-html": store}
+        for name in converters:
+            result = run_child(name, inputs.get(name, paths["parsr"]))
+            growth = max(result["peak_mb"] - baseline, 0.0)
+            rows[name].append({"pages": pages, "seconds": round(result["seconds"], 4),
+                               "ms_per_page": round(result["seconds"] / pages * 1000, 3),
+                               "peak_mb": round(result["peak_mb"], 1), "growth_mb": round(growth, 1)})
+            print(f"[scaling] {name:20s} {pages:6d} pages  {result['seconds']:8.2f}s  "
+                  f"{result['seconds'] / pages * 1000:7.2f} ms/page  +{growth:7.1f} MB")
+
+    report = {"spec": {"words_per_page": args.words_per_page, "columns": args.columns, "tables": args.tables,
+                       "headings": args.headings, "seed": args.seed},
+              "baseline_mb": round(baseline, 1), "converters": rows, "fit": {}}
+    print(f"[scaling] {'converter':20s} {'time exp':>9s} {'memory exp':>11s}")
+    for name, data in rows.items():
+        pages = [r["pages"] for r in data]
+        t_exp = exponent(pages, [max(r["seconds"], 1e-6) for r in data])
+        m_exp = exponent(pages, [max(r["growth_mb"], MIN_GROWTH_MB) for r in data])
+        flags = [label for label, e in (("time", t_exp), ("memory", m_exp))
+                 if e is not None and e > SUPERLINEAR_EXPONENT]
+        report["fit"][name] = {"time_exponent": t_exp, "memory_exponent": m_exp, "superlinear": flags}
+        print(f"[scaling] {name:20s} {t_exp if t_exp is not None else '-':>9} {m_exp if m_exp is not None else '-':>11}"
+              + (f"  SUPER-LINEAR {', '.join(flags)}" if flags else ""))
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    (args.output_dir / "scaling-report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    write_svg(args.output_dir / "scaling-report.svg", report)
+    print(f"[scaling] Report: {args.output_dir / 'scaling-report.json'}, chart: {args.output_dir / 'scaling-report.svg'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
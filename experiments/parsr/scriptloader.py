@@ -0,0 +1,29 @@
+"""Import the hyphenated converter scripts in this directory as modules."""
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def load(name: str, directory: Path = SCRIPT_DIR) -> ModuleType:
+    """Load e.g. `json-to-html` as module `json_to_html` (once per process).
+
+    `directory` selects a sibling experiment's scripts; it is put on sys.path
+    too so their own imports resolve.
+    """
+    mod_name = name.replace("-", "_")
+    module = sys.modules.get(mod_name)
+    if module is not None:
+        return module
+    for path in (SCRIPT_DIR, directory):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    spec = importlib.util.spec_from_file_location(mod_name, directory / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    spec.loader.exec_module(module)
+    return module
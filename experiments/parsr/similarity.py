@@ -0,0 +1,194 @@
+"""
+Text similarity backends for comparing extracted text with ground truth.
+
+All backends return a score in [0, 1] that approximates the character-level
+`difflib.SequenceMatcher` ratio:
+
+- legacy:  `SequenceMatcher(None, a, b).ratio()` exactly as the comparison
+           script used to call it. Its autojunk heuristic discards every
+           character that makes up more than 1% of a text longer than 200
+           characters, so results on documents are erratic.
+- exact:   the same ratio with autojunk disabled. Worst case is quadratic,
+           so it only suits short texts.
+- token:   patience alignment over word tokens. Unique shared tokens become
+           anchors (longest increasing subsequence, O(n log n)), and the gaps
+           between anchors are aligned recursively. Matched characters are
+           counted per token. Near-linear on document-sized text.
+- minhash: estimates the Jaccard similarity of word-shingle sets from fixed
+           size MinHash signatures and converts it to a Dice score. Cost is
+           linear and memory is bounded; for very large inputs.
+- auto:    exact below EXACT_MAX_CHARS, token below TOKEN_MAX_CHARS,
+           minhash above that.
+"""
+from __future__ import annotations
+
+import bisect
+import zlib
+from difflib import SequenceMatcher
+from typing import Callable
+
+import numpy as np
+
+EXACT_MAX_CHARS = 3_000        # combined length of both texts
+TOKEN_MAX_CHARS = 20_000_000
+GAP_EXACT_MAX = 250_000        # token-pair budget for aligning a gap without anchors
+SHINGLE_SIZE = 3               # words per shingle
+NUM_PERM = 256
+_MERSENNE = (1 << 61) - 1
+
+
+def legacy_ratio(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def exact_ratio(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+# ── Token alignment ──────────────────────────────────────────────────────────
+
+def unique_positions(seq: list[int] | list[str], lo: int, hi: int) -> dict:
+    """Position of every value that occurs exactly once in seq[lo:hi]."""
+    seen: dict[int, int] = {}
+    dup = set()
+    for i in range(lo, hi):
+        t = seq[i]
+        if t in seen:
+            dup.add(t)
+        else:
+            seen[t] = i
+    for t in dup:
+        del seen[t]
+    return seen
+
+
+def longest_chain(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Longest chain of pairs increasing in both coordinates (pairs sorted by a)."""
+    tails: list[int] = []
+    tail_idx: list[int] = []
+    prev = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(k)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = k
+        prev[k] = tail_idx[pos - 1] if pos else -1
+    out = []
+    k = tail_idx[-1] if tail_idx else -1
+    while k >= 0:
+        out.append(pairs[k])
+        k = prev[k]
+    out.reverse()
+    return out
+
+
+def align_tokens(a: list[int], b: list[int]) -> list[tuple[int, int]]:
+    """Matched (i, j) token index pairs, in order, by patience alignment."""
+    matches: list[tuple[int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        # Common prefix and suffix match trivially.
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo >= ahi or blo >= bhi:
+            continue
+
+        ua = unique_positions(a, alo, ahi)
+        ub = unique_positions(b, blo, bhi)
+        pairs = sorted((i, ub[t]) for t, i in ua.items() if t in ub)
+        anchors = longest_chain(pairs) if pairs else []
+        if not anchors:
+            # No unique anchors: align small gaps exactly, give up on huge ones.
+            if (ahi - alo) * (bhi - blo) <= GAP_EXACT_MAX:
+                sm = SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+                for i, j, n in sm.get_matching_blocks():
+                    matches.extend((alo + i + k, blo + j + k) for k in range(n))
+            continue
+
+        prev_i, prev_j = alo, blo
+        for i, j in anchors:
+            matches.append((i, j))
+            stack.append((prev_i, i, prev_j, j))
+            prev_i, prev_j = i + 1, j + 1
+        stack.append((prev_i, ahi, prev_j, bhi))
+    matches.sort()
+    return matches
+
+
+def token_ratio(a: str, b: str) -> float:
+    ta, tb = a.split(), b.split()
+    if not ta and not tb:
+        return 1.0
+    vocab: dict[str, int] = {}
+    ia = [vocab.setdefault(t, len(vocab)) for t in ta]
+    ib = [vocab.setdefault(t, len(vocab)) for t in tb]
+    matched = sum(len(ta[i]) for i, _ in align_tokens(ia, ib))
+    total = sum(map(len, ta)) + sum(map(len, tb))
+    return 2.0 * matched / total if total else 1.0
+
+
+# ── MinHash estimate ─────────────────────────────────────────────────────────
+
+def _shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    words = text.split()
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + k]) for i in range(len(words) - k + 1))
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+def _signature(hashes: np.ndarray, num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Multipliers stay below 2**32 so (a * h + b) fits in uint64 before the
+    # modulo; this gives a universal hash family over 32-bit inputs.
+    mul = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    add = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    sig = np.full(num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), 4096):
+        chunk = hashes[start:start + 4096]
+        vals = (np.outer(mul, chunk) + add[:, None]) % np.uint64(_MERSENNE)
+        np.minimum(sig, vals.min(axis=1), out=sig)
+    return sig
+
+
+def minhash_ratio(a: str, b: str, num_perm: int = NUM_PERM) -> float:
+    ha, hb = _shingle_hashes(a), _shingle_hashes(b)
+    if not len(ha) and not len(hb):
+        return 1.0
+    if not len(ha) or not len(hb):
+        return 0.0
+    jaccard = float(np.mean(_signature(ha, num_perm) == _signature(hb, num_perm)))
+    return 2 * jaccard / (1 + jaccard)
+
+
+def auto_ratio(a: str, b: str) -> float:
+    size = len(a) + len(b)
+    if size <= EXACT_MAX_CHARS:
+        return exact_ratio(a, b)
+    if size <= TOKEN_MAX_CHARS:
+        return token_ratio(a, b)
+    return minhash_ratio(a, b)
+
+
+BACKENDS: dict[str, Callable[[str, str], float]] = {
+    "auto": auto_ratio,
+    "legacy": legacy_ratio,
+    "exact": exact_ratio,
+    "token": token_ratio,
+    "minhash": minhash_ratio,
+}
+
+
+def text_similarity(a: str, b: str, backend: str = "auto") -> float:
+    return BACKENDS[backend](a, b)
@@ -0,0 +1,98 @@
+"""
+Content-addressed cache for pipeline stage outputs.
+
+Every stage run is identified by a key: the sha256 of the stage name, its
+version (the content of the scripts it runs), its parameters and the digests
+of its inputs. Outputs are stored once as blobs named by their own sha256,
+and an entry maps the key to the output digests:
+
+  CACHE_DIR/objects/ab/abcdef...     blob (raw bytes of one artifact)
+  CACHE_DIR/entries/<key>.json       {"stage": .., "outputs": {name: digest}, "meta": {..}}
+
+Because a stage's output digests feed the next stage's key, a change
+anywhere invalidates exactly the stages downstream of it, and identical
+outputs (e.g. an edit that does not change the HTML) stop the invalidation.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = ROOT / "experiments" / ".cache" / "stages"
+CHUNK_SIZE = 1 << 16
+
+
+def bytes_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def script_version(paths: list[Path], tag: str = "") -> str:
+    """Digest of the scripts a stage runs; any edit makes a new version."""
+    h = hashlib.sha256(tag.encode())
+    for path in sorted(paths):
+        h.update(path.name.encode() + b"\0")
+        h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+def stage_key(stage: str, version: str, params: dict, inputs: dict[str, str]) -> str:
+    payload = json.dumps({"stage": stage, "version": version, "params": params, "inputs": inputs},
+                         sort_keys=True, separators=(",", ":"))
+    return bytes_digest(payload.encode())
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    # Write-then-rename so concurrent workers never read a partial file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class StageCache:
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = root
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def put_blob(self, data: bytes) -> str:
+        digest = bytes_digest(data)
+        path = self.blob_path(digest)
+        if not path.exists():
+            _atomic_write(path, data)
+        return digest
+
+    def lookup(self, key: str) -> dict | None:
+        """The entry for `key` if it and all of its blobs are present."""
+        path = self.root / "entries" / f"{key}.json"
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        outputs = entry.get("outputs")
+        if not isinstance(outputs, dict) or not all(self.blob_path(d).exists() for d in outputs.values()):
+            return None  # blobs were pruned: treat as a miss and recompute
+        return entry
+
+    def store(self, key: str, stage: str, outputs: dict[str, bytes], meta: dict | None = None) -> dict:
+        entry = {
+            "stage": stage,
+            "outputs": {name: self.put_blob(data) for name, data in outputs.items()},
+            "meta": meta or {},
+        }
+        _atomic_write(self.root / "entries" / f"{key}.json", json.dumps(entry, indent=2).encode())
+        return entry
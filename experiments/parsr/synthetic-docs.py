@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+synthetic-docs.py — Seeded generator of large Parsr- and pdf2json-style documents.
+
+The fixtures stop at a dozen pages, while real reports run to thousands.
+This lays out a document page by page from a DocSpec: running header and
+footer, `columns` text columns, headings at `headings` of the blocks,
+`tables` ruled tables per page on average, and body words in regular,
+bold and italic runs. The same spec and seed always give the same layout,
+and both serializers write it from the same abstract page:
+
+  parsr     {"metadata", "pages": [{"box", "pageNumber", "elements": [word ...]}], "fonts"}
+            (fonts after the pages, as Parsr writes them)
+  pdf2json  {"Transcoder", "Meta", "Pages": [{"Width", "Height", "HLines",
+            "VLines", "Fills", "Texts": [run ...]}]}
+            (one run per same-style line segment, y above the baseline and
+            widths in px, inverting pdf2jsonreader.py; tables are ruled with
+            HLines/VLines, so tablegrid.py finds them)
+
+Pages are written as they are generated, so memory stays flat at any size.
+
+Usage:
+  python3 synthetic-docs.py --pages N [--words-per-page N] [--columns N]
+                            [--tables F] [--headings F] [--seed N]
+                            [--format parsr|pdf2json|both] [--output-dir DIR]
+
+  Writes <output-dir>/<name>.parsr.json and/or <name>.pdf2json.json, where
+  <name> encodes the spec.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+OUTPUT_DIR = SCRIPT_DIR / "scaling-output" / "docs"
+
+PAGE_W, PAGE_H = 612.0, 792.0  # pt: US Letter
+MARGIN = 54.0                  # pt
+GUTTER = 24.0                  # pt: between text columns
+CHAR_W = 0.5                   # average glyph width / font size
+LEADING = 1.25                 # line height / font size
+PARA_GAP = 1.2                 # extra gap before a block, in lines
+PDF2JSON_UNIT = 16.0           # pt per pdf2json page unit
+PDF2JSON_PX = 0.75             # pt per pdf2json width px
+# pdf2jsonreader: box_top = y + TOP_OFFSET - TOP_PER_SIZE * size
+PDF2JSON_TOP_OFFSET = 13.3
+PDF2JSON_TOP_PER_SIZE = 0.564
+
+# id: (name, size, weight, italic)
+FONTS = {
+    1: ("Serif", 11, "medium", False),
+    2: ("Serif-Bold", 11, "bold", False),
+    3: ("Serif-Italic", 11, "medium", True),
+    4: ("Sans-Bold", 20, "bold", False),
+    5: ("Sans-Bold", 15, "bold", False),
+    6: ("Sans", 8, "medium", False),
+    7: ("Sans", 9, "medium", False),
+}
+BODY, BOLD, ITALIC, H1, H2, RUNNING, TABLE = FONTS
+
+VOCABULARY = (
+    "data system report analysis value result process model table figure section "
+    "method design quarterly revenue growth market customer service platform network "
+    "storage policy account region total average review summary performance risk "
+    "control release version feature support security update index metric budget "
+    "the of and to in for with on by from as at is are was be this that which each"
+).split()
+
+
+@dataclass(frozen=True)
+class DocSpec:
+    pages: int
+    words_per_page: int = 300
+    columns: int = 1
+    tables: float = 0.2      # ruled tables per page, on average
+    headings: float = 0.15   # fraction of blocks that are headings
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return (f"synthetic-p{self.pages}-w{self.words_per_page}-c{self.columns}"
+                f"-t{self.tables:g}-h{self.headings:g}-s{self.seed}")
+
+
+@dataclass
+class Word:
+    text: str
+    left: float
+    top: float
+    width: float
+    font: int
+
+
+@dataclass
+class Page:
+    words: list[Word]
+    rules: list[tuple[float, float, float, float]]  # (x0, y0, x1, y1) in pt, axis-aligned
+
+
+def _size(font: int) -> float:
+    return float(FONTS[font][1])
+
+
+def _width(text: str, font: int) -> float:
+    return round(len(text) * _size(font) * CHAR_W, 2)
+
+
+class Layout:
+    """Places words into the columns of one page, top to bottom."""
+
+    def __init__(self, columns: int):
+        self.col_w = (PAGE_W - 2 * MARGIN - GUTTER * (columns - 1)) / columns
+        self.columns = columns
+        self.col = 0
+        self.y = MARGIN + 30  # below the running header
+        self.bottom = PAGE_H - MARGIN - 30
+        self.words: list[Word] = []
+        self.rules: list[tuple[float, float, float, float]] = []
+
+    @property
+    def x0(self) -> float:
+        return MARGIN + self.col * (self.col_w + GUTTER)
+
+    def room(self, height: float) -> bool:
+        """Move to the next column if `height` does not fit; False when the page is full."""
+        while self.y + height > self.bottom:
+            if self.col + 1 >= self.columns:
+                return False
+            self.col += 1
+            self.y = MARGIN + 30
+        return True
+
+    def text(self, tokens: list[tuple[str, int]], gap: float) -> int:
+        """Flow (word, font) tokens as one block; returns the words placed."""
+        size = max(_size(f) for _, f in tokens)
+        line_h = size * LEADING
+        if not self.room(gap * line_h + line_h):
+            return 0
+        self.y += gap * line_h
+        x = self.x0
+        placed = 0
+        for text, font in tokens:
+            w = _width(text, font)
+            if x > self.x0 and x + w > self.x0 + self.col_w:
+                self.y += line_h
+                x = self.x0
+                if not self.room(line_h):
+                    return placed
+            self.words.append(Word(text, round(x, 2), round(self.y, 2), w, font))
+            x += w + _size(font) * CHAR_W
+            placed += 1
+        self.y += line_h
+        return placed
+
+    def table(self, rows: list[list[str]]) -> int:
+        row_h = _size(TABLE) * 2.2
+        height = row_h * len(rows)
+        if not self.room(height + row_h):
+            return 0
+        self.y += row_h
+        x0, y0 = self.x0, self.y
+        cell_w = self.col_w / len(rows[0])
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                font = BOLD if r == 0 else TABLE
+                self.words.append(Word(cell, round(x0 + c * cell_w + 4, 2),
+                                       round(y0 + r * row_h + (row_h - _size(font)) / 2, 2), _width(cell, font), font))
+        for r in range(len(rows) + 1):
+            self.rules.append((x0, y0 + r * row_h, x0 + self.col_w, y0 + r * row_h))
+        for c in range(len(rows[0]) + 1):
+            self.rules.append((x0 + c * cell_w, y0, x0 + c * cell_w, y0 + height))
+        self.y += height
+        return sum(len(row) for row in rows)
+
+
+def generate_pages(spec: DocSpec):
+    """Yield the abstract Page of each page of `spec`."""
+    rng = random.Random(spec.seed)
+    for n in range(spec.pages):
+        layout = Layout(spec.columns)
+        # Running header and footer, repeated on every page but the number.
+        for text, top in ((f"Synthetic Report {spec.seed} — Confidential", MARGIN),
+                          (f"Page {n + 1}", PAGE_H - MARGIN)):
+            x = MARGIN
+            for token in text.split():
+                layout.words.append(Word(token, round(x, 2), top, _width(token, RUNNING), RUNNING))
+                x += _width(token, RUNNING) + 3
+        budget = spec.words_per_page
+        tables = int(spec.tables) + (rng.random() < spec.tables % 1)
+        table_at = sorted(rng.random() * budget for _ in range(tables))
+        while budget > 0:
+            if table_at and spec.words_per_page - budget >= table_at[0]:
+                table_at.pop(0)
+                cols = rng.randint(3, 5)
+                rows = [[rng.choice(VOCABULARY).title() for _ in range(cols)]]
+                rows += [[f"{rng.uniform(0, 9999):.1f}" for _ in range(cols)] for _ in range(rng.randint(3, 8))]
+                placed = layout.table(rows)
+            elif rng.random() < spec.headings:
+                font = H1 if rng.random() < 0.3 else H2
+                placed = layout.text([(w.title(), font) for w in rng.choices(VOCABULARY, k=rng.randint(2, 6))], 1.0)
+            else:
+                tokens = []
+                style = BODY
+                for _ in range(min(budget, rng.randint(30, 90))):
+                    if rng.random() < 0.08:  # style runs of a few words
+                        style = rng.choice((BOLD, ITALIC)) if style == BODY else BODY
+                    tokens.append((rng.choice(VOCABULARY), style))
+                tokens[-1] = (tokens[-1][0] + ".", tokens[-1][1])
+                placed = layout.text(tokens, PARA_GAP)
+            if not placed:
+                break  # the page is full
+            budget -= placed
+        yield Page(layout.words, layout.rules)
+
+
+# ── Serializers ─────────────────────────────────────────────────────────────
+
+def parsr_fonts() -> list[dict]:
+    return [{"id": fid, "name": name, "size": size, "weight": weight, "isItalic": italic,
+             "isUnderline": False, "color": "#000000", "sizeUnit": "px"}
+            for fid, (name, size, weight, italic) in FONTS.items()]
+
+
+def parsr_page(page: Page, number: int, next_id: int) -> dict:
+    elements = [{"id": next_id + i, "type": "word", "properties": {}, "metadata": [],
+                 "box": {"l": w.left, "t": w.top, "w": w.width, "h": _size(w.font)},
+                 "content": w.text, "font": w.font, "fontSize": _size(w.font)}
+                for i, w in enumerate(page.words)]
+    return {"margins": {"top": -1, "left": -1, "bottom": -1, "right": -1},
+            "box": {"l": 0, "t": 0, "w": PAGE_W, "h": PAGE_H},
+            "rotation": {"degrees": 0, "origin": {"x": 0, "y": 0}, "translation": {"x": 0, "y": 0}},
+            "pageNumber": number, "elements": elements}
+
+
+def pdf2json_page(page: Page) -> dict:
+    texts = []
+    words = sorted(page.words, key=lambda w: (w.top, w.left))
+    k = 0
+    while k < len(words):
+        # A run: consecutive words on one line in one font, one space apart
+        # (table cells are separate runs).
+        run = [words[k]]
+        while k + len(run) < len(words):
+            nxt, last = words[k + len(run)], run[-1]
+            if (nxt.top != last.top or nxt.font != last.font
+                    or nxt.left - (last.left + last.width) > 1.5 * CHAR_W * _size(last.font)):
+                break
+            run.append(nxt)
+        k += len(run)
+        head = run[0]
+        size = _size(head.font)
+        text = " ".join(w.text for w in run) + " "
+        width = run[-1].left + run[-1].width - head.left
+        # Spaces widen the run; keep per-character spacing close to the layout's.
+        width *= len(text) / max(len(text) - 1, 1)
+        name, _, weight, italic = FONTS[head.font]
+        texts.append({
+            "x": round(head.left / PDF2JSON_UNIT, 3),
+            "y": round((head.top - PDF2JSON_TOP_OFFSET + PDF2JSON_TOP_PER_SIZE * size) / PDF2JSON_UNIT, 3),
+            "w": round(width / PDF2JSON_PX, 3), "oc": "#000000", "sw": 0.36, "A": "left",
+            "R": [{"T": quote(text), "S": -1, "TS": [0 if "Serif" in name else 1, size,
+                                                    int(weight == "bold"), int(italic)]}],
+        })
+    h_lines = [{"x": x0 / PDF2JSON_UNIT, "y": y0 / PDF2JSON_UNIT, "w": 1.0, "l": (x1 - x0) / PDF2JSON_UNIT}
+               for x0, y0, x1, y1 in page.rules if y0 == y1]
+    v_lines = [{"x": x0 / PDF2JSON_UNIT, "y": y0 / PDF2JSON_UNIT, "w": 1.0, "l": (y1 - y0) / PDF2JSON_UNIT}
+               for x0, y0, x1, y1 in page.rules if x0 == x1]
+    return {"Width": PAGE_W / PDF2JSON_UNIT, "Height": PAGE_H / PDF2JSON_UNIT, "HLines": h_lines,
+            "VLines": v_lines, "Fills": [], "Texts": texts, "Fields": [], "Boxsets": []}
+
+
+class _ArrayWriter:
+    """Writes `{<head>, "<key>": [item, ...]<tail>}` one item at a time."""
+
+    def __init__(self, f, head: dict, key: str):
+        self._f = f
+        self._first = True
+        f.write(json.dumps(head)[:-1] + (", " if head else "") + json.dumps(key) + ": [")
+
+    def add(self, item: dict) -> None:
+        self._f.write(("" if self._first else ",\n") + json.dumps(item))
+        self._first = False
+
+    def close(self, tail: dict) -> None:
+        self._f.write("]" + "".join(f", {json.dumps(k)}: {json.dumps(v)}" for k, v in tail.items()) + "}\n")
+
+
+def write_documents(spec: DocSpec, out_dir: Path, formats: tuple[str, ...]) -> dict[str, Path]:
+    """Stream the document of `spec` in each format; returns {format: path}."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {fmt: out_dir / f"{spec.name}.{fmt}.json" for fmt in formats}
+    files = {fmt: open(path, "w", encoding="utf-8") for fmt, path in paths.items()}
+    try:
+        writers = {}
+        if "parsr" in files:
+            writers["parsr"] = _ArrayWriter(files["parsr"], {"metadata": {"generator": "synthetic-docs.py"}}, "pages")
+        if "pdf2json" in files:
+            writers["pdf2json"] = _ArrayWriter(
+                files["pdf2json"], {"Transcoder": "synthetic-docs.py", "Meta": {"Title": spec.name}}, "Pages")
+        next_id = 1
+        for number, page in enumerate(generate_pages(spec), start=1):
+            if "parsr" in writers:
+                writers["parsr"].add(parsr_page(page, number, next_id))
+            if "pdf2json" in writers:
+                writers["pdf2json"].add(pdf2json_page(page))
+            next_id += len(page.words)
+        if "parsr" in writers:
+            writers["parsr"].close({"fonts": parsr_fonts()})
+        if "pdf2json" in writers:
+            writers["pdf2json"].close({})
+    finally:
+        for f in files.values():
+            f.close()
+    return paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate large synthetic Parsr / pdf2json documents.")
+    parser.add_argument("--pages", type=int, required=True)
+    parser.add_argument("--words-per-page", type=int, default=DocSpec.words_per_page)
+    parser.add_argument("--columns", type=int, default=DocSpec.columns)
+    parser.add_argument("--tables", type=float, default=DocSpec.tables, help="ruled tables per page, on average")
+    parser.add_argument("--headings", type=float, default=DocSpec.headings, help="fraction of blocks that are headings")
+    parser.add_argument("--seed", type=int, default=DocSpec.seed)
+    parser.add_argument("--format", choices=("parsr", "pdf2json", "both"), default="both")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    spec = DocSpec(args.pages, args.words_per_page, args.columns, args.tables, args.headings, args.seed)
+    formats = ("parsr", "pdf2json") if args.format == "both" else (args.format,)
+    start = time.perf_counter()
+    paths = write_documents(spec, args.output_dir, formats)
+    for fmt, path in paths.items():
+        print(f"[synthetic] {fmt}: {path} ({path.stat().st_size / 2**20:.1f} MB)")
+    print(f"[synthetic] {spec.pages} pages in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+"""
+Opt-in span instrumentation with Chrome trace-event export.
+
+The converters mark their phases with
+
+  with tracing.span("line-grouping", page=3):
+      ...
+  tracing.count("words", n)
+
+and nothing else. Tracing is off unless PDF_TO_HTML_TRACE names an output
+file (or a CLI's --trace flag calls enable()). While it is off, span()
+returns one shared no-op context manager and count() returns at once, so
+instrumented code pays a function call per phase and no allocation.
+
+While it is on, every span becomes a complete ("ph": "X") trace event, and
+counts are added to the innermost open span's args and to process totals.
+At exit the events are written as Chrome trace-event JSON (load it in
+chrome://tracing or ui.perfetto.dev), and a summary of calls, total and self
+time per span name plus the counter totals is printed to stderr.
+
+Only the process that enabled tracing is recorded; CLIs that fan out to a
+process pool run in-process while tracing.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+TRACE_ENV = "PDF_TO_HTML_TRACE"
+CATEGORY = "pdf-to-html"
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start", "child_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.child_ns = 0
+
+    def __enter__(self):
+        self.tracer.stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        end = time.perf_counter_ns()
+        stack = self.tracer.stack()
+        stack.pop()
+        duration = end - self.start
+        if stack:
+            stack[-1].child_ns += duration
+        self.tracer.record(self, duration)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.events: list[dict] = []
+        self.totals: dict[str, list[int]] = {}  # name -> [calls, total ns, self ns, max ns]
+        self.counters: dict[str, int] = {}
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, span: Span, duration: int) -> None:
+        self.events.append({
+            "name": span.name, "cat": CATEGORY, "ph": "X",
+            "ts": (span.start - self._origin) / 1000, "dur": duration / 1000,
+            "pid": self._pid, "tid": threading.get_ident(), "args": span.args,
+        })
+        total = self.totals.setdefault(span.name, [0, 0, 0, 0])
+        total[0] += 1
+        total[1] += duration
+        total[2] += duration - span.child_ns
+        total[3] = max(total[3], duration)
+
+    def count(self, name: str, value: int) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+        stack = self.stack()
+        if stack:
+            args = stack[-1].args
+            args[name] = args.get(name, 0) + value
+
+    def write(self, path: Path) -> None:
+        payload = {"traceEvents": self.events, "displayTimeUnit": "ms",
+                   "otherData": {"counters": self.counters}}
+        path.write_text(json.dumps(payload), encoding="utf-8")
+
+    def summary(self) -> str:
+        lines = [f"{'span':24s} {'calls':>7s} {'total ms':>10s} {'self ms':>10s} {'mean ms':>9s} {'max ms':>9s}"]
+        for name, (calls, total, own, longest) in sorted(self.totals.items(), key=lambda kv: -kv[1][2]):
+            lines.append(f"{name:24s} {calls:7d} {total / 1e6:10.2f} {own / 1e6:10.2f} "
+                         f"{total / calls / 1e6:9.3f} {longest / 1e6:9.3f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:24s} {value:>7d}")
+        return "\n".join(lines)
+
+
+_tracer: Tracer | None = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def enable(path: str | Path) -> Tracer:
+    """Start recording; the trace is written to `path` at exit."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        atexit.register(finish, Path(path))
+    return _tracer
+
+
+def finish(path: Path) -> None:
+    if _tracer is None:
+        return
+    _tracer.write(path)
+    print(f"[trace] {len(_tracer.events)} spans → {path}", file=sys.stderr)
+    print(_tracer.summary(), file=sys.stderr)
+
+
+def span(name: str, **args):
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def count(name: str, value: int = 1) -> None:
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
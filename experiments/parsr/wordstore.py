@@ -0,0 +1,159 @@
+"""
+Compact columnar word files read through mmap.
+
+Parsr and pdf2json JSON spend hundreds of bytes of text, and far more as
+Python dicts, on each word. A word store keeps only what the converters
+use: per-word geometry and font ids as fixed-width little-endian arrays,
+the word texts in one string heap, and a page offset table. The file layout
+is
+
+  MAGIC (8 bytes) | version u32 | header length u32 | header JSON | sections
+
+and the header JSON describes every section as [offset, dtype, count], next
+to the document's fonts and metadata. Sections start on 8-byte boundaries:
+
+  page_words  int64[pages + 1]   first word of each page (prefix sums)
+  page_text   int64[pages + 1]   first heap byte of each page
+  top, left, width, font_size, top_key   float64[words]
+  font        int32[words]
+  heap        uint8[...]         UTF-8 word texts, each ending in NUL
+
+WordStore maps the file and wraps the sections with np.frombuffer, so
+opening costs one header parse regardless of size. page(i) returns a
+WordTable whose numeric columns are read-only views into the map; only the
+page's texts are decoded. top_key is stored precomputed, so pages read back
+identical to WordTable.from_page.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+from wordtable import WordTable
+
+MAGIC = b"PDFWORDS"
+VERSION = 1
+SUFFIX = ".words"
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 8
+_FLOAT_COLUMNS = ("top", "left", "width", "font_size", "top_key")
+
+
+def is_word_store(path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def write_store(path: Path, pages: Iterable[WordTable], fonts: list[dict] | Callable[[], list[dict]],
+                meta: dict | None = None) -> dict:
+    """Write the word tables of a document, one per page, as a word store.
+
+    `fonts` may be a callable, called once `pages` is exhausted, for readers
+    that intern fonts as they go. NUL terminates words in the heap, so a NUL
+    inside a word becomes U+FFFD. Returns the header.
+    """
+    columns: dict[str, list[np.ndarray]] = {name: [] for name in _FLOAT_COLUMNS + ("font",)}
+    page_words = [0]
+    page_text = [0]
+    heap: list[bytes] = []
+    for table in pages:
+        for name in _FLOAT_COLUMNS:
+            columns[name].append(np.asarray(getattr(table, name), dtype="<f8"))
+        columns["font"].append(np.asarray(table.font, dtype="<i4"))
+        text = "".join(c.replace("\0", "\ufffd") + "\0" for c in table.content).encode("utf-8")
+        heap.append(text)
+        page_words.append(page_words[-1] + len(table))
+        page_text.append(page_text[-1] + len(text))
+
+    arrays = {
+        "page_words": np.asarray(page_words, dtype="<i8"),
+        "page_text": np.asarray(page_text, dtype="<i8"),
+        **{name: np.concatenate(parts) if parts else np.empty(0, dtype="<f8") for name, parts in columns.items()},
+        "heap": np.frombuffer(b"".join(heap), dtype=np.uint8),
+    }
+    if not len(arrays["font"]):
+        arrays["font"] = np.empty(0, dtype="<i4")
+    if callable(fonts):
+        fonts = fonts()
+
+    # Offsets depend on the header's length, which contains them: lay out
+    # with a placeholder width, then fix the header size by padding.
+    sections: dict[str, list] = {name: [0, a.dtype.str, len(a)] for name, a in arrays.items()}
+    header = {"version": VERSION, "pages": len(page_words) - 1, "words": page_words[-1],
+              "fonts": fonts, "meta": meta or {}, "sections": sections}
+    reserve = len(json.dumps(header).encode("utf-8")) + 32 * len(arrays)
+    offset = _PREFIX.size + reserve + _pad(_PREFIX.size + reserve)
+    for name, a in arrays.items():
+        sections[name][0] = offset
+        offset += a.nbytes + _pad(a.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (reserve + _pad(_PREFIX.size + reserve) - len(header_bytes))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for a in arrays.values():
+            f.write(a.tobytes())
+            f.write(b"\0" * _pad(a.nbytes))
+    os.chmod(tmp, 0o644)  # mkstemp creates the file owner-only
+    os.replace(tmp, path)
+    return header
+
+
+class WordStore:
+    """Read-only view of a word store file."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            # The map holds its own handle to the file.
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a word store")
+        if version != VERSION:
+            raise ValueError(f"{self.path}: unsupported word store version {version}")
+        self.header = json.loads(self._map[_PREFIX.size:_PREFIX.size + header_len])
+        self.fonts = {f["id"]: f for f in self.header["fonts"]}
+        self.meta = self.header["meta"]
+        self._cols = {name: np.frombuffer(self._map, dtype=np.dtype(dtype), count=count, offset=offset)
+                      for name, (offset, dtype, count) in self.header["sections"].items()}
+
+    def __len__(self) -> int:
+        return self.header["pages"]
+
+    def page(self, index: int) -> WordTable:
+        cols = self._cols
+        a, b = int(cols["page_words"][index]), int(cols["page_words"][index + 1])
+        s, e = int(cols["page_text"][index]), int(cols["page_text"][index + 1])
+        content = bytes(cols["heap"][s:e]).decode("utf-8").split("\0")[:-1] if e > s else []
+        return WordTable(
+            content=content,
+            top=cols["top"][a:b],
+            left=cols["left"][a:b],
+            width=cols["width"][a:b],
+            font_size=cols["font_size"][a:b],
+            font=cols["font"][a:b],
+            page=np.full(b - a, index, dtype=np.int32),
+            top_key=cols["top_key"][a:b],
+        )
+
+    def pages(self) -> Iterator[WordTable]:
+        for index in range(len(self)):
+            yield self.page(index)
@@ -0,0 +1,317 @@
+"""
+Columnar word table and vectorized layout grouping for Parsr JSON.
+
+Parsr emits one dict per word (`{"box": {"t": .., "l": ..}, "font": .., ...}`).
+The converters used to sort those dicts with Python lambdas and walk them
+word by word to build lines and blocks. This module copies the geometry into
+NumPy columns once per page and does the grouping with array operations:
+
+1. Split the page into column regions (xycut.py) and sort the words of each
+   region by (round(top, 1), left).
+2. Split into lines: a word starts a new line when it is more than
+   LINE_TOLERANCE away from the first word of the current line.
+3. Estimate the baseline line gap (upper median of line-to-line gaps).
+4. Split lines into blocks where the gap exceeds baseline_gap * PARA_GAP_RATIO,
+   and where a region starts.
+
+On single-column pages the grouping reproduces the original per-word loops
+exactly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+import tracing
+from xycut import Boxes, column_regions
+
+LINE_TOLERANCE = 4    # px: words within this vertical distance share a line
+PARA_GAP_RATIO = 1.5  # a vertical gap > baseline_line_height * ratio = new block
+DEFAULT_LINE_GAP = 18
+NO_FONT = -1
+
+# Sort keys are top rounded to 0.1, so |top - key| <= 0.05. Line breaks are
+# resolved exactly inside a key window widened by this margin.
+_KEY_MARGIN = 0.2
+
+
+def is_word(element: dict) -> bool:
+    return element.get("type") == "word" and bool(element.get("content", "").strip())
+
+
+@dataclass
+class WordTable:
+    """Words of one or more pages stored column-wise.
+
+    `font_size` is NaN where the word carries no `fontSize`, since the
+    converters fall back to different defaults depending on the call site.
+    `font` is NO_FONT where the word has no font id.
+    """
+
+    content: list[str]
+    top: np.ndarray
+    left: np.ndarray
+    width: np.ndarray
+    font_size: np.ndarray
+    font: np.ndarray
+    page: np.ndarray
+    top_key: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    @classmethod
+    def from_page(cls, page: dict, page_index: int = 0) -> "WordTable":
+        words = [e for e in page.get("elements", []) if is_word(e)]
+        n = len(words)
+        top = np.fromiter((w["box"]["t"] for w in words), dtype=np.float64, count=n)
+        return cls(
+            content=[w.get("content", "") for w in words],
+            top=top,
+            left=np.fromiter((w["box"]["l"] for w in words), dtype=np.float64, count=n),
+            width=np.fromiter((w["box"].get("w", 0.0) for w in words), dtype=np.float64, count=n),
+            font_size=np.fromiter(
+                (w.get("fontSize", np.nan) for w in words), dtype=np.float64, count=n
+            ),
+            font=np.fromiter(
+                (NO_FONT if w.get("font") is None else w["font"] for w in words),
+                dtype=np.int64,
+                count=n,
+            ),
+            page=np.full(n, page_index, dtype=np.int32),
+            # Python's round() and np.round() disagree on some halfway cases;
+            # the key must match the historical sort order exactly.
+            top_key=np.fromiter((round(t, 1) for t in top.tolist()), dtype=np.float64, count=n),
+        )
+
+    @classmethod
+    def from_columns(cls, content: list[str], top, left, width, font_size, font,
+                     page_index: int = 0) -> "WordTable":
+        """Build a table from plain per-word sequences (non-Parsr readers)."""
+        n = len(content)
+        top = np.asarray(top, dtype=np.float64).reshape(n)
+        return cls(
+            content=list(content),
+            top=top,
+            left=np.asarray(left, dtype=np.float64).reshape(n),
+            width=np.asarray(width, dtype=np.float64).reshape(n),
+            font_size=np.asarray(font_size, dtype=np.float64).reshape(n),
+            font=np.asarray(font, dtype=np.int64).reshape(n),
+            page=np.full(n, page_index, dtype=np.int32),
+            top_key=np.fromiter((round(t, 1) for t in top.tolist()), dtype=np.float64, count=n),
+        )
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "WordTable":
+        tables = [cls.from_page(p, i) for i, p in enumerate(doc.get("pages", []))]
+        return cls.concat(tables)
+
+    @classmethod
+    def concat(cls, tables: list["WordTable"]) -> "WordTable":
+        if not tables:
+            return cls.empty()
+        return cls(
+            content=[c for t in tables for c in t.content],
+            top=np.concatenate([t.top for t in tables]),
+            left=np.concatenate([t.left for t in tables]),
+            width=np.concatenate([t.width for t in tables]),
+            font_size=np.concatenate([t.font_size for t in tables]),
+            font=np.concatenate([t.font for t in tables]),
+            page=np.concatenate([t.page for t in tables]),
+            top_key=np.concatenate([t.top_key for t in tables]),
+        )
+
+    @classmethod
+    def empty(cls) -> "WordTable":
+        f = np.empty(0, dtype=np.float64)
+        return cls([], f, f, f, f, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), f)
+
+    def take(self, idx: np.ndarray) -> "WordTable":
+        content = self.content
+        return WordTable(
+            content=[content[i] for i in idx.tolist()],
+            top=self.top[idx],
+            left=self.left[idx],
+            width=self.width[idx],
+            font_size=self.font_size[idx],
+            font=self.font[idx],
+            page=self.page[idx],
+            top_key=self.top_key[idx],
+        )
+
+    def pages(self):
+        """Yield (page_index, table) for each page present, in page order."""
+        if not len(self):
+            return
+        order = np.argsort(self.page, kind="stable")
+        page = self.page[order]
+        bounds = np.flatnonzero(np.diff(page)) + 1
+        for seg in np.split(order, bounds):
+            yield int(self.page[seg[0]]), self.take(seg)
+
+    def sizes(self, default: float) -> np.ndarray:
+        """Font sizes with missing values replaced by `default`."""
+        return np.where(np.isnan(self.font_size), default, self.font_size)
+
+    def boxes(self) -> Boxes:
+        """Word boxes for xycut; the font size stands in for the box height."""
+        return Boxes(self.left, self.left + self.width, self.top, self.top + self.sizes(12))
+
+
+def reading_order(table: WordTable) -> np.ndarray:
+    """Indices sorting words by (round(top, 1), left); stable like list.sort."""
+    return np.lexsort((table.left, table.top_key))
+
+
+def line_starts(top: np.ndarray, top_key: np.ndarray, tolerance: float = LINE_TOLERANCE) -> np.ndarray:
+    """Start index of every line in words already in reading order.
+
+    A word joins the current line while |top - top_of_first_word| <= tolerance.
+    For each line, binary search over the sorted keys bounds where the next
+    line can start, and only that narrow window is checked exactly.
+    """
+    n = len(top)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    lo_bound = np.searchsorted(top_key, top_key + (tolerance - _KEY_MARGIN), side="right")
+    hi_bound = np.searchsorted(top_key, top_key + (tolerance + _KEY_MARGIN), side="right")
+    starts = [0]
+    i = 0
+    while True:
+        lo = max(int(lo_bound[i]), i + 1)
+        hi = int(hi_bound[i])
+        nxt = hi
+        if lo < hi:
+            breaks = np.flatnonzero(np.abs(top[lo:hi] - top[i]) > tolerance)
+            if len(breaks):
+                nxt = lo + int(breaks[0])
+        if nxt >= n:
+            break
+        starts.append(nxt)
+        i = nxt
+    return np.asarray(starts, dtype=np.intp)
+
+
+def median_gap(line_tops: np.ndarray, default: float = DEFAULT_LINE_GAP) -> float:
+    """Upper median of the gaps between consecutive line tops."""
+    if len(line_tops) <= 1:
+        return default
+    gaps = np.sort(np.diff(line_tops))
+    return float(gaps[len(gaps) // 2])
+
+
+def block_starts(line_tops: np.ndarray, gap_base: float, ratio: float = PARA_GAP_RATIO) -> np.ndarray:
+    """Index of the first line of every block."""
+    if len(line_tops) == 0:
+        return np.empty(0, dtype=np.intp)
+    breaks = np.flatnonzero(np.diff(line_tops) > gap_base * ratio) + 1
+    return np.concatenate(([0], breaks)).astype(np.intp)
+
+
+def upper_median(values: np.ndarray, default: float) -> float:
+    if len(values) == 0:
+        return default
+    return float(np.sort(values)[len(values) // 2])
+
+
+@dataclass
+class PageLayout:
+    """Lines and blocks of one page.
+
+    `words` is in reading order and `order` maps it back to the input table
+    (`words = table.take(order)`). Lines are contiguous ranges of `words`
+    delimited by `line_starts`; blocks are contiguous ranges of lines
+    delimited by `block_starts`, and column regions are contiguous ranges of
+    lines delimited by `region_starts`. `line_order` permutes `words` so that
+    each line reads left to right.
+    """
+
+    words: WordTable
+    line_starts: np.ndarray
+    block_starts: np.ndarray
+    line_order: np.ndarray
+    baseline_gap: float
+    order: np.ndarray
+    region_starts: np.ndarray
+
+    @classmethod
+    def build(cls, table: WordTable, columns: bool = True, line_gap: float | None = None) -> "PageLayout":
+        """Lay out one page; `line_gap` replaces the page's own baseline gap (a document-wide one)."""
+        with tracing.span("xy-cut"):
+            regions = column_regions(table.boxes()) if columns and len(table) else []
+        if len(regions) <= 1:
+            with tracing.span("word-sort"):
+                order = reading_order(table)
+                words = table.take(order)
+            with tracing.span("line-grouping"):
+                starts = line_starts(words.top, words.top_key)
+            with tracing.span("block-grouping"):
+                line_tops = words.top[starts]
+                gap = median_gap(line_tops) if line_gap is None else line_gap
+                blocks = block_starts(line_tops, gap)
+            region_firsts = np.zeros(1, dtype=np.intp)
+        else:
+            with tracing.span("region-lines", regions=len(regions)):
+                order, starts, blocks, gap, region_firsts = _region_lines(table, regions, line_gap)
+                words = table.take(order)
+        with tracing.span("line-order"):
+            line_id = np.zeros(len(words), dtype=np.intp)
+            if len(starts) > 1:
+                line_id[starts[1:]] = 1
+                line_id = np.cumsum(line_id)
+            line_order = np.lexsort((words.left, line_id))
+        tracing.count("lines", len(starts))
+        tracing.count("blocks", len(blocks))
+        return cls(
+            words=words,
+            line_starts=starts,
+            block_starts=blocks,
+            line_order=line_order,
+            baseline_gap=gap,
+            order=order,
+            region_starts=region_firsts,
+        )
+
+    def baseline_size(self, default: float = 12) -> float:
+        return upper_median(self.words.sizes(default), default)
+
+    def lines(self) -> list[np.ndarray]:
+        """Word indices of each line, left to right."""
+        return np.split(self.line_order, self.line_starts[1:])
+
+    def blocks(self) -> list[list[np.ndarray]]:
+        """Lines of each block; a block is a list of word-index arrays."""
+        lines = self.lines()
+        bounds = self.block_starts.tolist() + [len(lines)]
+        return [lines[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _region_lines(table: WordTable, regions: list[np.ndarray], line_gap: float | None = None):
+    """Reading order, line starts, block starts, line gap and each region's first line.
+
+    Lines never span two regions, every region starts a block, and the
+    baseline gap is taken over consecutive lines of the same region only.
+    """
+    orders, starts, firsts = [], [], []
+    offset = n_lines = 0
+    for region in regions:
+        sub = region[reading_order(table.take(region))]
+        s = line_starts(table.top[sub], table.top_key[sub])
+        orders.append(sub)
+        starts.append(s + offset)
+        firsts.append(n_lines)
+        offset += len(sub)
+        n_lines += len(s)
+    order = np.concatenate(orders)
+    starts = np.concatenate(starts)
+    line_tops = table.top[order][starts]
+    same_region = np.ones(max(n_lines - 1, 0), dtype=bool)
+    same_region[np.asarray(firsts[1:], dtype=np.intp) - 1] = False
+    gaps = np.diff(line_tops)[same_region]
+    if line_gap is not None:
+        gap = line_gap
+    else:
+        gap = float(np.sort(gaps)[len(gaps) // 2]) if len(gaps) else DEFAULT_LINE_GAP
+    breaks = np.flatnonzero(~same_region | (np.diff(line_tops) > gap * PARA_GAP_RATIO)) + 1
+    return order, starts, np.concatenate(([0], breaks)).astype(np.intp), gap, np.asarray(firsts, dtype=np.intp)
@@ -0,0 +1,207 @@
+"""
+Column-aware reading order by recursive XY-cut on projection profiles.
+
+Sorting a page's words by (top, left) interleaves multi-column text: the
+first line of the left column is followed by the first line of the right
+one. Before lines are grouped, the page is split into regions that are each
+read top to bottom:
+
+1. X cut: project the words onto the x axis as an occupancy histogram
+   (BIN_PT buckets, built with bincount + cumsum) and look for empty runs of
+   at least MIN_GUTTER inside the region. If the pieces between the gutters
+   all look like text columns, cut there and recurse into each column.
+2. Y cut: otherwise project onto the y axis and split into horizontal
+   strips at every empty run. Consecutive strips are grouped while they
+   share a gutter (a heading spanning the columns ends a group), and each
+   group is cut recursively.
+
+Groups that end up without any column cut are merged back together, so a
+single-column page comes out as one region and reads exactly as before.
+Every level costs O(words + extent in bins), and the recursion depth is
+bounded by the nesting of columns and headings, so a page stays near-linear
+in its word count.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+BIN_PT = 1.0              # pt: histogram bucket width
+MIN_GUTTER = 12.0         # pt: narrowest empty band that separates columns
+MIN_COLUMN_LINES = 3      # lines a column needs on each side of a gutter
+MIN_WORDS_PER_LINE = 3.0  # columns of short cells are a table, not text
+# Fewest words that can hold two columns; smaller regions are never cut.
+MIN_CUT_WORDS = int(2 * MIN_COLUMN_LINES * MIN_WORDS_PER_LINE)
+
+
+class Boxes(NamedTuple):
+    """Word boxes of one page as parallel arrays (pt)."""
+
+    left: np.ndarray
+    right: np.ndarray
+    top: np.ndarray
+    bottom: np.ndarray
+
+
+def _spans(start: np.ndarray, end: np.ndarray, lo: float, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket range [first, stop) of each interval on an n-bucket axis from lo."""
+    first = np.clip(np.floor((start - lo) / BIN_PT).astype(np.intp), 0, n - 1)
+    stop = np.clip(np.ceil((end - lo) / BIN_PT).astype(np.intp), first + 1, n)
+    return first, stop
+
+
+def _occupied(first: np.ndarray, stop: np.ndarray, n: int, row: np.ndarray | None = None,
+              n_rows: int = 1) -> np.ndarray:
+    """Occupancy profile (n_rows x n booleans) from a difference array per row."""
+    row = np.zeros(len(first), dtype=np.intp) if row is None else row
+    width = n + 1
+    delta = (np.bincount(row * width + first, minlength=n_rows * width)
+             - np.bincount(row * width + stop, minlength=n_rows * width))
+    return np.cumsum(delta.reshape(n_rows, width)[:, :n], axis=1) > 0
+
+
+def _empty_runs(occupied: np.ndarray) -> list[tuple[int, int]]:
+    """(first, stop) of every run of empty buckets strictly inside the occupied extent."""
+    filled = np.flatnonzero(occupied)
+    if len(filled) < 2:
+        return []
+    inner = ~occupied[filled[0]:filled[-1] + 1]
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], inner, [False])).astype(np.int8)))
+    base = int(filled[0])
+    return [(base + a, base + b) for a, b in zip(edges[0::2].tolist(), edges[1::2].tolist())]
+
+
+def _wide_runs(occupied: np.ndarray) -> list[tuple[int, int]]:
+    min_bins = MIN_GUTTER / BIN_PT
+    return [(a, b) for a, b in _empty_runs(occupied) if b - a >= min_bins]
+
+
+def _has_gutter(occupied: np.ndarray) -> np.ndarray:
+    """Per row of a 2-D profile: is there an inner empty run of MIN_GUTTER or more?"""
+    n = occupied.shape[1]
+    pos = np.arange(n)
+    last = np.maximum.accumulate(np.where(occupied, pos, -1), axis=1)
+    end = n - 1 - np.argmax(occupied[:, ::-1], axis=1)
+    wide = (pos - last >= MIN_GUTTER / BIN_PT) & (last >= 0) & (pos < end[:, None])
+    return wide.any(axis=1)
+
+
+def _gutters(boxes: Boxes, idx: np.ndarray) -> list[float]:
+    """x positions (pt) of the centres of the gutters among the words `idx`."""
+    left, right = boxes.left[idx], boxes.right[idx]
+    lo = float(left.min())
+    n = max(int(np.ceil((float(right.max()) - lo) / BIN_PT)), 1)
+    occupied = _occupied(*_spans(left, right, lo, n), n)[0]
+    return [lo + (a + b) / 2 * BIN_PT for a, b in _wide_runs(occupied)]
+
+
+def _y_strips(boxes: Boxes, idx: np.ndarray) -> list[np.ndarray]:
+    """Horizontal strips of `idx` separated by empty rows, top to bottom."""
+    top, bottom = boxes.top[idx], boxes.bottom[idx]
+    lo = float(top.min())
+    n = max(int(np.ceil((float(bottom.max()) - lo) / BIN_PT)), 1)
+    runs = _empty_runs(_occupied(*_spans(top, bottom, lo, n), n)[0])
+    if not runs:
+        return [idx]
+    strip = np.searchsorted(np.asarray([lo + a * BIN_PT for a, _ in runs]), top, side="right")
+    order = np.argsort(strip, kind="stable")
+    bounds = np.flatnonzero(np.diff(strip[order])) + 1
+    return np.split(idx[order], bounds)
+
+
+def _words_per_line(boxes: Boxes, idx: np.ndarray) -> float:
+    """Mean words per line, or 0 below MIN_COLUMN_LINES lines.
+
+    Inside one column every text line is its own strip.
+    """
+    if len(idx) < MIN_COLUMN_LINES:
+        return 0.0
+    top, bottom = boxes.top[idx], boxes.bottom[idx]
+    lo = float(top.min())
+    n = max(int(np.ceil((float(bottom.max()) - lo) / BIN_PT)), 1)
+    n_lines = len(_empty_runs(_occupied(*_spans(top, bottom, lo, n), n)[0])) + 1
+    return len(idx) / n_lines if n_lines >= MIN_COLUMN_LINES else 0.0
+
+
+def _x_cut(boxes: Boxes, idx: np.ndarray) -> list[np.ndarray]:
+    """Columns of `idx`, left to right, or [] when there is no valid cut."""
+    cuts = _gutters(boxes, idx)
+    if not cuts:
+        return []
+    centre = (boxes.left[idx] + boxes.right[idx]) / 2
+    # Every gutter at once, else the first single gutter that yields columns.
+    for chosen in [cuts] + ([[c] for c in cuts] if len(cuts) > 1 else []):
+        column = np.searchsorted(np.asarray(chosen), centre)
+        pieces = [idx[column == k] for k in range(len(chosen) + 1)]
+        if all(_words_per_line(boxes, p) >= MIN_WORDS_PER_LINE for p in pieces):
+            return pieces
+    return []
+
+
+def _group_strips(boxes: Boxes, strips: list[np.ndarray]) -> list[tuple[np.ndarray, bool]]:
+    """Merge consecutive strips that share a gutter, or that both have none.
+
+    The x profiles of all strips are built in one bincount, so extending a
+    group is an OR of two boolean rows rather than a new histogram. Returns
+    (group, has_gutter) pairs.
+    """
+    idx = np.concatenate(strips)
+    left, right = boxes.left[idx], boxes.right[idx]
+    lo = float(left.min())
+    n = max(int(np.ceil((float(right.max()) - lo) / BIN_PT)), 1)
+    row = np.repeat(np.arange(len(strips)), [len(s) for s in strips])
+    profiles = _occupied(*_spans(left, right, lo, n), n, row, len(strips))
+    own = _has_gutter(profiles).tolist()
+
+    groups = [[strips[0]]]
+    gutter = [own[0]]
+    group_profile = profiles[0]
+    for k in range(1, len(strips)):
+        merged = group_profile | profiles[k]
+        if (gutter[-1] and _has_gutter(merged[None, :])[0]) or (not gutter[-1] and not own[k]):
+            groups[-1].append(strips[k])
+            group_profile = merged
+        else:
+            groups.append([strips[k]])
+            gutter.append(own[k])
+            group_profile = profiles[k]
+    return [(np.concatenate(g), has) for g, has in zip(groups, gutter)]
+
+
+def _cut(boxes: Boxes, idx: np.ndarray) -> tuple[list[np.ndarray], bool]:
+    """Regions of `idx` in reading order, and whether any column cut was made."""
+    if len(idx) < MIN_CUT_WORDS:
+        return [idx], False
+    columns = _x_cut(boxes, idx)
+    if columns:
+        return [r for col in columns for r in _cut(boxes, col)[0]], True
+    strips = _y_strips(boxes, idx)
+    if len(strips) == 1:
+        return [idx], False
+    groups = _group_strips(boxes, strips)
+    if len(groups) == 1:
+        return [idx], False
+
+    regions: list[np.ndarray] = []
+    any_cut = False
+    flow: list[np.ndarray] = []  # consecutive uncut groups, merged into one region
+    for group, has_gutter in groups:
+        # A group without a gutter regroups into itself: nothing to cut.
+        sub, was_cut = _cut(boxes, group) if has_gutter else ([group], False)
+        if not was_cut:
+            flow.append(group)
+            continue
+        if flow:
+            regions.append(np.concatenate(flow))
+            flow = []
+        regions += sub
+        any_cut = True
+    if flow:
+        regions.append(np.concatenate(flow))
+    return regions, any_cut
+
+
+def column_regions(boxes: Boxes) -> list[np.ndarray]:
+    """Word indices of each reading-order region of one page, in order."""
+    return _cut(boxes, np.arange(len(boxes.left)))[0]
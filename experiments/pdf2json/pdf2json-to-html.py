@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+pdf2json-to-html.py — Convert the committed pdf2json fixtures to HTML natively.
+
+No PDF parser or container is involved: benchmark/fixtures/*/source.json
+(written by scripts/pdf-to-json.js) is streamed page by page, text runs are
+rebuilt into words (see pdf2jsonreader.py), and the line, block and heading
+logic of parsr/json-to-html.py renders them. Tables are recovered from
+ruling lines and fills (see tablegrid.py) and emitted as <table> in place;
+running headers and footers are dropped as in json-to-html.py.
+
+Usage:
+  python3 pdf2json-to-html.py [--output-dir DIR] [--running strip|tag|keep] [--trace FILE] [fixture ...]
+
+  Each argument is a fixture name or a path to a pdf2json JSON file
+  (default: every fixture). Writes <output-dir>/<fixture>.html and
+  conversion-results.json. Each result is also appended to the results
+  store (parsr/resultstore.py) as it completes; the JSON is a snapshot of
+  the run, written at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PARSR_DIR = SCRIPT_DIR.parent / "parsr"
+FIXTURES_DIR = SCRIPT_DIR / "../../benchmark/fixtures"
+OUTPUT_DIR = SCRIPT_DIR / "output"
+RESULTS_FILE = SCRIPT_DIR / "conversion-results.json"
+
+sys.path.insert(0, str(PARSR_DIR))
+
+import jsonstream  # noqa: E402
+import scriptloader  # noqa: E402
+import tracing  # noqa: E402
+from resultstore import ResultStore, tool_name  # noqa: E402
+from pdf2jsonreader import StyleTable, page_words  # noqa: E402
+from tablegrid import Table, detect_tables  # noqa: E402
+from wordtable import PageLayout, upper_median  # noqa: E402
+
+
+def render_table(table: Table, words, fonts) -> str:
+    j2h = scriptloader.load("json-to-html")
+    bold = np.array([fonts.get(int(f), {}).get("weight") == "bold" for f in words.font], dtype=bool)
+    rows = []
+    for r, cells in enumerate(table.rows()):
+        header = r == 0 and all(len(c.words) and bold[c.words].all() for c in cells)
+        tag = "th" if header else "td"
+        parts = []
+        for cell in cells:
+            attrs = ""
+            if cell.colspan > 1:
+                attrs += f' colspan="{cell.colspan}"'
+            if cell.rowspan > 1:
+                attrs += f' rowspan="{cell.rowspan}"'
+            text = ""
+            if len(cell.words):
+                layout = PageLayout.build(words.take(cell.words))
+                text = j2h.render_lines(layout.lines(), layout.words, fonts)
+            parts.append(f"<{tag}{attrs}>{text}</{tag}>")
+        if parts:
+            rows.append("<tr>" + "".join(parts) + "</tr>")
+    return "<table>\n" + "\n".join(rows) + "\n</table>\n"
+
+
+def render_page(item, words, fonts) -> list[str]:
+    """Blocks of one (page_index, page) item: flowing text around the tables, top to bottom."""
+    j2h = scriptloader.load("json-to-html")
+    page = item[1]
+    tables = detect_tables(page, words) if len(words) else []
+    if not tables:
+        return j2h.words_to_html(words, fonts)
+
+    baseline = upper_median(words.sizes(12), 12)
+    in_table = np.zeros(len(words), dtype=bool)
+    for table in tables:
+        for cell in table.cells:
+            in_table[cell.words] = True
+    flow = np.flatnonzero(~in_table)
+    # Text above the first table, between tables, and below the last one.
+    band = np.searchsorted(np.array([t.top for t in tables]), words.top[flow], side="right")
+    parts = []
+    for k in range(len(tables) + 1):
+        parts += j2h.words_to_html(words.take(flow[band == k]), fonts, baseline)
+        if k < len(tables):
+            parts.append(render_table(tables[k], words, fonts))
+    return parts
+
+
+def iter_pdf2json_html(json_path: Path, title: str, running: str = "strip"):
+    """Yield the HTML for one pdf2json document, one page at a time."""
+    j2h = scriptloader.load("json-to-html")
+    styles = StyleTable()
+    pages = enumerate(jsonstream.iter_pages(json_path, key="Pages"))
+    # styles.fonts grows as pages are read; each page's fonts are interned
+    # before that page is rendered.
+    return j2h.iter_html(pages, styles.fonts, title, render_page=render_page,
+                         words_of=lambda item: page_words(item[1], styles, item[0]),
+                         running=running)
+
+
+def convert(json_path: Path, html_path: Path, fixture: str, running: str = "strip") -> dict:
+    start = time.perf_counter()
+    try:
+        with open(html_path, "w", encoding="utf-8") as f:
+            for chunk in iter_pdf2json_html(json_path, fixture, running):
+                f.write(chunk)
+    except Exception as e:
+        return {"fixture": fixture, "status": "conversion-error", "output": str(html_path), "bytes": 0,
+                "error": f"{type(e).__name__}: {e}", "duration": round(time.perf_counter() - start, 4)}
+    return {"fixture": fixture, "status": "done", "output": str(html_path),
+            "bytes": html_path.stat().st_size, "duration": round(time.perf_counter() - start, 4)}
+
+
+def resolve_inputs(names: list[str]) -> list[tuple[str, Path]]:
+    if not names:
+        return [(d.name, d / "source.json") for d in sorted(FIXTURES_DIR.iterdir())
+                if (d / "source.json").exists()]
+    inputs = []
+    for name in names:
+        p = Path(name)
+        if p.suffix == ".json" and p.exists():
+            fixture = p.parent.name if p.name == "source.json" else p.stem
+            inputs.append((fixture, p))
+        else:
+            inputs.append((name, FIXTURES_DIR / name / "source.json"))
+    return inputs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert pdf2json fixture JSON to HTML.")
+    parser.add_argument("inputs", nargs="*", help="fixture names or pdf2json JSON files (default: all)")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE)
+    parser.add_argument("--running", choices=("strip", "tag", "keep"), default="strip",
+                        help="running headers/footers: drop, emit once as <header>/<footer>, or leave in place")
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace of the conversion phases")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable(args.trace)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    store = ResultStore()
+    run = store.begin(tool_name(args.output_dir), "convert")
+    start = time.perf_counter()
+    results = []
+    try:
+        for fixture, json_path in resolve_inputs(args.inputs):
+            with tracing.span("convert", fixture=fixture):
+                record = convert(json_path, args.output_dir / f"{fixture}.html", fixture, args.running)
+            if record["status"] == "done":
+                print(f"[pdf2json] OK {fixture} ({record['bytes']} bytes, {record['duration']:.3f}s)")
+            else:
+                print(f"[pdf2json] {record['status'].upper()} {fixture}: {record['error']}")
+            run.record(fixture, record["status"], data=record)
+            results.append(record)
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    args.results.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    done = [r for r in results if r["status"] == "done"]
+    failed = [r for r in results if r["status"] != "done"]
+    print(f"[pdf2json] Results: {args.results} (run {run.run})")
+    print(f"  done:   {len(done)}/{len(results)} in {elapsed:.2f}s")
+    if failed:
+        print(f"  failed: {[(r['fixture'], r['status']) for r in failed]}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+"""
+Read pdf2json output (benchmark/fixtures/*/source.json) into WordTables.
+
+pdf2json describes each page as a list of positioned text runs:
+
+  {"x": 2.562, "y": 7.406, "w": 46.65, "R": [{"T": "Lorem%20", "TS": [2, 19, 0, 0]}]}
+
+- x/y are in page units of 1/16 pt, w is in px (3/4 pt),
+- T is URL-encoded and is often a fragment of a word ("ips" + "um ") or a
+  single letter, so words are rebuilt by gluing runs that touch on the same
+  baseline and splitting on whitespace,
+- y is a fixed distance above the baseline, so it is shifted by the font
+  size to the box top the layout thresholds expect,
+- TS is [fontFaceId, size, bold, italic]. Each distinct tuple is interned
+  once per document into a StyleTable whose fonts mimic Parsr's font
+  entries, so json-to-html's rendering code applies unchanged.
+"""
+from __future__ import annotations
+
+import math
+import re
+from urllib.parse import unquote
+
+from wordtable import WordTable
+
+UNIT_PT = 16.0       # pdf2json page unit → pt
+WIDTH_PT = 0.75      # pdf2json run width (px) → pt
+GLUE_MAX_GAP = 1.0   # pt: runs closer than this on one baseline continue a word
+# pdf2json's y sits a fixed distance above the baseline regardless of size,
+# while Parsr (and the line/block thresholds) use the glyph box top. Fitted
+# on the fixtures: box_top = y + TOP_OFFSET - TOP_PER_SIZE * TS size.
+TOP_OFFSET = 13.3    # pt
+TOP_PER_SIZE = 0.564
+SAME_LINE = 0.5      # pt: runs whose y differs less than this share a baseline
+
+_TOKEN = re.compile(r"\S+")
+
+
+class StyleTable:
+    """Document-wide interning of pdf2json TS tuples into Parsr-like fonts."""
+
+    def __init__(self):
+        self._ids: dict[tuple, int] = {}
+        self.fonts: dict[int, dict] = {}
+
+    def intern(self, run: dict) -> int:
+        key = tuple(run.get("TS") or (run.get("S", -1),))
+        font_id = self._ids.get(key)
+        if font_id is None:
+            font_id = self._ids[key] = len(self._ids)
+            self.fonts[font_id] = self._font(font_id, key)
+        return font_id
+
+    @staticmethod
+    def _font(font_id: int, key: tuple) -> dict:
+        if len(key) < 4:
+            return {"id": font_id, "name": f"style-{key[0]}"}
+        face, size, bold, italic = key[:4]
+        return {
+            "id": font_id,
+            "name": f"face-{face}",
+            "size": size,
+            "weight": "bold" if bold else "medium",
+            "isItalic": bool(italic),
+            "isUnderline": False,
+        }
+
+    def size(self, font_id: int) -> float:
+        return float(self.fonts[font_id].get("size", "nan"))
+
+
+def run_text(text: dict) -> str:
+    return "".join(unquote(r.get("T", "")) for r in text.get("R", ()))
+
+
+def page_words(page: dict, styles: StyleTable, page_index: int = 0) -> WordTable:
+    """Rebuild the words of one pdf2json page, in stream order."""
+    content: list[str] = []
+    top: list[float] = []
+    left: list[float] = []
+    right: list[float] = []
+    font: list[int] = []
+    open_word = False  # the previous run ended mid-word
+    last_y = math.nan
+
+    for text in page.get("Texts", ()):
+        runs = text.get("R")
+        if not runs:
+            continue
+        s = run_text(text)
+        x = text["x"] * UNIT_PT
+        width = text.get("w", 0.0) * WIDTH_PT
+        per_char = width / len(s) if s else 0.0
+        font_id = styles.intern(runs[0])
+        size = styles.size(font_id)
+        raw_y = text["y"] * UNIT_PT
+        y = raw_y if math.isnan(size) else raw_y + TOP_OFFSET - TOP_PER_SIZE * size
+
+        for m in _TOKEN.finditer(s):
+            start = x + m.start() * per_char
+            end = x + m.end() * per_char
+            if (open_word and m.start() == 0 and abs(raw_y - last_y) < SAME_LINE
+                    and left[-1] < start <= right[-1] + GLUE_MAX_GAP):
+                content[-1] += m.group()
+                right[-1] = end
+                continue
+            content.append(m.group())
+            top.append(y)
+            left.append(start)
+            right.append(end)
+            font.append(font_id)
+        last_y = raw_y
+        open_word = bool(s) and not s[-1].isspace() and bool(content)
+
+    sizes = [styles.size(f) for f in font]
+    widths = [r - l for l, r in zip(left, right)]
+    return WordTable.from_columns(content, top, left, widths, sizes, font, page_index)
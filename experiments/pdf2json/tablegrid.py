@@ -0,0 +1,432 @@
+"""
+Table grids from pdf2json ruling lines and fills.
+
+pdf2json reports table borders three ways: HLines/VLines (x, y, thickness w,
+length l), hairline Fills (one side thinner than RULE_MAX), and cell or
+stripe background Fills, whose edges are cell boundaries too. Fills about
+one text line high are highlights (inline code, <mark>) and are skipped.
+All of them become horizontal (y, x0, x1) and vertical (x, y0, y1)
+segments in pt.
+
+1. Sweep over x: horizontal segments enter an active list ordered by y at
+   x0 and leave at x1; each vertical segment queries the active list for the
+   y range it spans. Every hit joins the two segments in a union-find. The
+   active list is a plain sorted list, so an insert or removal shifts up to
+   a entries (a = horizontals crossing one x, a few dozen on a page), and
+   connected rulings cost O(n log n + n·a + k) for k hits instead of n²
+   comparisons.
+2. Each connected component with at least two rows and two columns is a
+   candidate table. Line positions are clustered within SNAP to give the
+   grid coordinates, and segments on each line are merged into disjoint
+   intervals. Components with the same column lines, and bare rules
+   between column lines, stacked within STACK_GAP below a table continue
+   it: striped tables often rule only their shaded rows, and border-bottom
+   rows have no verticals.
+3. An edge between two elementary cells exists when an interval covers its
+   midpoint. A missing edge merges the two cells (colspan/rowspan) when its
+   row (column) is ruled elsewhere, so the gap is deliberate, or when
+   something spans it: a line of text crossing it, or a cell fill with text
+   on at most one side (a fill behind text on both sides is a stripe). Rows
+   ruled only top and bottom (border-bottom styling) keep their columns.
+4. Words are located with a binary search on the grid coordinates (the
+   grid is its own spatial index). The table ends at its first empty row,
+   and outer columns without words are trimmed, which drops card borders
+   around it; page-sized background fills are ignored up front.
+"""
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pdf2jsonreader import SAME_LINE, UNIT_PT
+
+RULE_MAX = 3.0      # pt: a fill thinner than this is a ruling line
+SNAP = 6.0          # pt: line positions closer than this are the same grid line
+TOUCH = 1.5         # pt: slack when testing whether two segments meet
+CENTER_DROP = 0.3   # word centre = top + CENTER_DROP * font size
+STACK_GAP = 64.0    # pt: vertical gap bridged between column-aligned rulings
+WORD_GAP = 4.0      # pt: words this close on one line read as one phrase
+MIN_FILL = 18.0     # pt: shorter fills are text highlights (inline code, marks)
+PAGE_FILL_MAX = 0.5  # fills covering more of the page than this are backgrounds
+
+
+@dataclass
+class Segments:
+    horizontal: list[tuple[float, float, float]] = field(default_factory=list)  # (y, x0, x1)
+    vertical: list[tuple[float, float, float]] = field(default_factory=list)    # (x, y0, y1)
+    rects: list[tuple[float, float, float, float]] = field(default_factory=list)  # (x0, y0, x1, y1)
+
+    def add_rect(self, x: float, y: float, w: float, h: float) -> None:
+        if h < RULE_MAX and w >= RULE_MAX:
+            self.horizontal.append((y + h / 2, x, x + w))
+        elif w < RULE_MAX and h >= RULE_MAX:
+            self.vertical.append((x + w / 2, y, y + h))
+        elif w >= RULE_MAX and h >= MIN_FILL:
+            self.horizontal += [(y, x, x + w), (y + h, x, x + w)]
+            self.vertical += [(x, y, y + h), (x + w, y, y + h)]
+            self.rects.append((x, y, x + w, y + h))
+
+
+def page_segments(page: dict) -> Segments:
+    seg = Segments()
+    page_area = page.get("Width", 0.0) * page.get("Height", 0.0) * UNIT_PT * UNIT_PT
+    for line in page.get("HLines", ()):
+        x, y = line["x"] * UNIT_PT, line["y"] * UNIT_PT
+        seg.horizontal.append((y, x, x + line.get("l", 0.0) * UNIT_PT))
+    for line in page.get("VLines", ()):
+        x, y = line["x"] * UNIT_PT, line["y"] * UNIT_PT
+        seg.vertical.append((x, y, y + line.get("l", 0.0) * UNIT_PT))
+    for fill in page.get("Fills", ()):
+        w, h = fill.get("w", 0.0) * UNIT_PT, fill.get("h", 0.0) * UNIT_PT
+        if page_area and w * h > PAGE_FILL_MAX * page_area:
+            continue
+        seg.add_rect(fill["x"] * UNIT_PT, fill["y"] * UNIT_PT, w, h)
+    return seg
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, a: int) -> int:
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def connected_rulings(seg: Segments) -> list[tuple[list[int], list[int]]]:
+    """Group segments that cross or touch: [(horizontal ids, vertical ids)].
+
+    Lone vertical segments are dropped; lone horizontal ones are kept as
+    possible row rules.
+    """
+    nh = len(seg.horizontal)
+    uf = _UnionFind(nh + len(seg.vertical))
+    # Event order at equal x: insert (0), query (1), remove (2), so segments
+    # that merely touch still meet.
+    events = []
+    for i, (y, x0, x1) in enumerate(seg.horizontal):
+        events.append((x0 - TOUCH, 0, i))
+        events.append((x1 + TOUCH, 2, i))
+    for j, (x, _, _) in enumerate(seg.vertical):
+        events.append((x, 1, j))
+    events.sort()
+
+    active: list[tuple[float, int]] = []  # (y, horizontal id), sorted
+    for _, kind, idx in events:
+        if kind == 0:
+            bisect.insort(active, (seg.horizontal[idx][0], idx))
+        elif kind == 2:
+            del active[bisect.bisect_left(active, (seg.horizontal[idx][0], idx))]
+        else:
+            _, y0, y1 = seg.vertical[idx]
+            lo = bisect.bisect_left(active, (y0 - TOUCH, -1))
+            hi = bisect.bisect_right(active, (y1 + TOUCH, nh))
+            for _, h in active[lo:hi]:
+                uf.union(h, nh + idx)
+
+    groups: dict[int, tuple[list[int], list[int]]] = {}
+    for i in range(nh + len(seg.vertical)):
+        hs, vs = groups.setdefault(uf.find(i), ([], []))
+        (hs if i < nh else vs).append(i if i < nh else i - nh)
+    return [g for g in groups.values() if g[0]]
+
+
+def _within_columns(xs: list[float], table_xs: list[float]) -> bool:
+    """Every line of `xs` is a column line of the table (spanned rows skip some)."""
+    return all(any(abs(x - t) <= SNAP for t in table_xs) for x in xs)
+
+
+def _spans_columns(rule: list[float], xs: list[float]) -> bool:
+    """The rule runs from one column line to another at least two columns on."""
+    ends = [k for k, x in enumerate(xs) if abs(x - rule[0]) <= SNAP]
+    return any(abs(x - rule[1]) <= SNAP for k in ends for x in xs[k + 2:])
+
+
+def stack_components(seg: Segments, groups: list[tuple[list[int], list[int]]]) -> list[tuple[list[int], list[int]]]:
+    """Join rulings that belong to one table without touching.
+
+    Striped tables often rule only their shaded rows, and border-bottom
+    styling draws plain rows as bare horizontal lines. Walking down the
+    page, a component whose column lines are among the table's, or a rule
+    running between two of its column lines, continues the table above it if it starts
+    within STACK_GAP of that table's last line.
+    """
+    items = []  # (y0, y1, kind, xs, hs, vs); kind 0 = grid, 1 = bare rule
+    bare = []
+    for hs, vs in groups:
+        if vs:
+            ys = [seg.horizontal[i][0] for i in hs]
+            items.append((min(ys), max(ys), 0, cluster([seg.vertical[j][0] for j in vs]), hs, vs))
+        else:
+            bare.extend(hs)
+    # Rules are often drawn per cell; join abutting collinear pieces first.
+    line: list = []
+    for i in sorted(bare, key=lambda i: (seg.horizontal[i][0], seg.horizontal[i][1])):
+        y, x0, x1 = seg.horizontal[i]
+        if line and abs(y - line[0]) <= TOUCH and x0 <= line[2] + TOUCH:
+            line[2] = max(line[2], x1)
+            line[3].append(i)
+            continue
+        if line:
+            items.append((line[0], line[0], 1, [line[1], line[2]], line[3], []))
+        line = [y, x0, x1, [i]]
+    if line:
+        items.append((line[0], line[0], 1, [line[1], line[2]], line[3], []))
+    items.sort(key=lambda it: (it[0], it[2]))
+
+    tables: list[list] = []  # [y0, y1, xs, hs, vs]
+    for y0, y1, kind, xs, hs, vs in items:
+        for t in reversed(tables):
+            if not t[0] - TOUCH <= y0 <= t[1] + STACK_GAP:
+                continue
+            if _within_columns(xs, t[2]) if kind == 0 else _spans_columns(xs, t[2]):
+                t[1] = max(t[1], y1)
+                t[3] = t[3] + hs
+                t[4] = t[4] + vs
+                break
+        else:
+            if kind == 0:
+                tables.append([y0, y1, xs, list(hs), list(vs)])
+    return [(t[3], t[4]) for t in tables]
+
+
+def cluster(values: list[float], snap: float = SNAP) -> list[float]:
+    """Sorted representative positions of values closer than `snap`."""
+    out: list[list[float]] = []
+    for v in sorted(values):
+        if out and v - out[-1][-1] <= snap:
+            out[-1].append(v)
+        else:
+            out.append([v])
+    return [sum(c) / len(c) for c in out]
+
+
+def _line_intervals(lines: list[float], segments: list[tuple[float, float, float]]) -> list[list[tuple[float, float]]]:
+    """Merged (start, end) intervals of the segments lying on each grid line."""
+    per_line: list[list[tuple[float, float]]] = [[] for _ in lines]
+    for pos, a, b in segments:
+        k = bisect.bisect_left(lines, pos)
+        if k == len(lines) or (k > 0 and pos - lines[k - 1] < lines[k] - pos):
+            k -= 1
+        if abs(lines[k] - pos) <= SNAP:
+            per_line[k].append((a, b))
+    merged = []
+    for spans in per_line:
+        out: list[tuple[float, float]] = []
+        for a, b in sorted(spans):
+            if out and a <= out[-1][1] + TOUCH:
+                out[-1] = (out[-1][0], max(out[-1][1], b))
+            else:
+                out.append((a, b))
+        merged.append(out)
+    return merged
+
+
+def _covers(intervals: list[tuple[float, float]], point: float) -> bool:
+    k = bisect.bisect_right(intervals, (point, float("inf"))) - 1
+    return k >= 0 and intervals[k][1] >= point
+
+
+@dataclass
+class Cell:
+    row: int
+    col: int
+    rowspan: int
+    colspan: int
+    words: np.ndarray  # indices into the page's WordTable, reading order
+
+
+@dataclass
+class Table:
+    xs: list[float]   # column boundaries, pt
+    ys: list[float]   # row boundaries, pt
+    cells: list[Cell]
+
+    @property
+    def top(self) -> float:
+        return self.ys[0]
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.ys) - 1
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.xs) - 1
+
+    def rows(self) -> list[list[Cell]]:
+        """Cells grouped by the row they start in, left to right."""
+        out: list[list[Cell]] = [[] for _ in range(self.n_rows)]
+        for cell in sorted(self.cells, key=lambda c: (c.row, c.col)):
+            out[cell.row].append(cell)
+        return out
+
+
+def _locate(xs: list[float], ys: list[float], cx: np.ndarray, cy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    col = np.searchsorted(np.asarray(xs), cx, side="right") - 1
+    row = np.searchsorted(np.asarray(ys), cy, side="right") - 1
+    inside = (col >= 0) & (col < len(xs) - 1) & (row >= 0) & (row < len(ys) - 1)
+    return np.where(inside, row, -1), np.where(inside, col, -1)
+
+
+def _trim(xs: list[float], ys: list[float], row: np.ndarray, col: np.ndarray) -> tuple[list[float], list[float]]:
+    """Keep the first run of rows that hold words, and the columns they use.
+
+    An empty row ends the table: past it are the frame of the surrounding
+    card or page, not more rows.
+    """
+    hit = row >= 0
+    if not hit.any():
+        return xs[:1], ys[:1]
+    filled = np.zeros(len(ys) - 1, dtype=bool)
+    filled[row[hit]] = True
+    r0 = int(np.argmax(filled))
+    gaps = np.flatnonzero(~filled[r0:])
+    r1 = r0 + int(gaps[0]) - 1 if len(gaps) else len(filled) - 1
+    used = hit & (row >= r0) & (row <= r1)
+    c0, c1 = int(col[used].min()), int(col[used].max())
+    return xs[c0:c1 + 2], ys[r0:r1 + 2]
+
+
+class _SpanEvidence:
+    """Answers "does anything bridge this missing edge?" for one grid."""
+
+    def __init__(self, seg: Segments, xs: list[float], ys: list[float], row: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, top: np.ndarray):
+        rects = np.asarray(seg.rects, dtype=np.float64).reshape(-1, 4)
+        inside = ((rects[:, 0] >= xs[0] - SNAP) & (rects[:, 2] <= xs[-1] + SNAP)
+                  & (rects[:, 1] >= ys[0] - SNAP) & (rects[:, 3] <= ys[-1] + SNAP))
+        # The table's own background covers every edge and proves nothing.
+        whole = (rects[:, 0] <= xs[0] + SNAP) & (rects[:, 2] >= xs[-1] - SNAP) \
+            & (rects[:, 1] <= ys[1] + SNAP) & (rects[:, 3] >= ys[-2] - SNAP)
+        self.rects = rects[inside & ~whole]
+        order = np.argsort(row, kind="stable")
+        bounds = np.searchsorted(row[order], np.arange(len(ys)))
+        self._row_words = [order[a:b] for a, b in zip(bounds, bounds[1:])]
+        self.left, self.right, self.top = left, right, top
+
+    def filled(self, x: float, y: float) -> bool:
+        r = self.rects
+        return bool(((r[:, 0] < x - TOUCH) & (r[:, 2] > x + TOUCH)
+                     & (r[:, 1] < y - TOUCH) & (r[:, 3] > y + TOUCH)).any())
+
+    def crossed(self, row: int, x: float) -> bool:
+        """A word, or the space between two words of one line, spans x."""
+        idx = self._row_words[row]
+        left, right, top = self.left[idx], self.right[idx], self.top[idx]
+        if ((left < x - TOUCH) & (right > x + TOUCH)).any():
+            return True
+        ends = top[(right > x - WORD_GAP) & (right <= x + TOUCH)]
+        starts = top[(left >= x - TOUCH) & (left < x + WORD_GAP)]
+        return bool(len(ends) and len(starts)
+                    and (np.abs(ends[:, None] - starts[None, :]) < SAME_LINE).any())
+
+
+def build_table(seg: Segments, hs: list[int], vs: list[int], cx: np.ndarray, cy: np.ndarray,
+                left: np.ndarray, right: np.ndarray, top: np.ndarray) -> Table | None:
+    horizontal = [seg.horizontal[i] for i in hs]
+    vertical = [seg.vertical[i] for i in vs]
+    xs = cluster([s[0] for s in vertical])
+    ys = cluster([s[0] for s in horizontal])
+    if len(xs) < 3 or len(ys) < 3:
+        return None
+    xs, ys = _trim(xs, ys, *_locate(xs, ys, cx, cy))
+    n_rows, n_cols = len(ys) - 1, len(xs) - 1
+    if n_rows < 2 or n_cols < 2:
+        return None
+
+    h_lines = _line_intervals(ys, horizontal)
+    v_lines = _line_intervals(xs, vertical)
+    row, col = _locate(xs, ys, cx, cy)
+    evidence = _SpanEvidence(seg, xs, ys, row, left, right, top)
+    mid_ys = [(a + b) / 2 for a, b in zip(ys, ys[1:])]
+    mid_xs = [(a + b) / 2 for a, b in zip(xs, xs[1:])]
+    v_edge = [[_covers(v_lines[c], y) for c in range(1, n_cols)] for y in mid_ys]
+    h_edge = [[_covers(h_lines[r], x) for r in range(1, n_rows)] for x in mid_xs]
+    ruled_row = [any(edges) for edges in v_edge]
+    ruled_col = [any(edges) for edges in h_edge]
+
+    # A fill across an edge with text on both sides is a striped row or
+    # column, not a merged cell.
+    occupied = np.zeros((n_rows, n_cols), dtype=bool)
+    hit = row >= 0
+    occupied[row[hit], col[hit]] = True
+
+    uf = _UnionFind(n_rows * n_cols)
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if c + 1 < n_cols and not v_edge[r][c] and (
+                    ruled_row[r] or evidence.crossed(r, xs[c + 1])
+                    or (not (occupied[r, c] and occupied[r, c + 1]) and evidence.filled(xs[c + 1], mid_ys[r]))):
+                uf.union(r * n_cols + c, r * n_cols + c + 1)
+            if r + 1 < n_rows and not h_edge[c][r] and (
+                    ruled_col[c]
+                    or (not (occupied[r, c] and occupied[r + 1, c]) and evidence.filled(mid_xs[c], ys[r + 1]))):
+                uf.union(r * n_cols + c, (r + 1) * n_cols + c)
+
+    spans: dict[int, list[int]] = {}  # root -> [r0, c0, r1, c1]
+    for r in range(n_rows):
+        for c in range(n_cols):
+            s = spans.setdefault(uf.find(r * n_cols + c), [r, c, r, c])
+            s[0], s[1] = min(s[0], r), min(s[1], c)
+            s[2], s[3] = max(s[2], r), max(s[3], c)
+
+    members: dict[int, list[int]] = {}
+    for i in np.flatnonzero(row >= 0).tolist():
+        members.setdefault(uf.find(int(row[i]) * n_cols + int(col[i])), []).append(i)
+    cells = [Cell(r0, c0, r1 - r0 + 1, c1 - c0 + 1, np.asarray(members.get(root, []), dtype=np.intp))
+             for root, (r0, c0, r1, c1) in spans.items()]
+    # A box with a side rule or a card with a title bar also forms a grid;
+    # a table has at least one row with two filled cells.
+    filled_rows = [c.row for c in cells if len(c.words)]
+    if len(filled_rows) == len(set(filled_rows)):
+        return None
+    return Table(xs, ys, cells)
+
+
+def detect_tables(page: dict, words) -> list[Table]:
+    """Tables on one pdf2json page, top to bottom.
+
+    `words` is the page's WordTable; each cell lists the indices of the
+    words whose centre falls inside it. Tables never share words: a table
+    nested in a cell of another is left to the outer one.
+    """
+    seg = page_segments(page)
+    if not seg.horizontal or not seg.vertical:
+        return []
+    size = np.where(np.isnan(words.font_size), 0.0, words.font_size)
+    right = words.left + words.width
+    cx = words.left + words.width / 2
+    cy = words.top + CENTER_DROP * size
+    claimed = np.zeros(len(words), dtype=bool)
+
+    candidates = []
+    for hs, vs in stack_components(seg, connected_rulings(seg)):
+        x0 = min(seg.vertical[j][0] for j in vs)
+        y0 = min(seg.horizontal[i][0] for i in hs)
+        x1 = max(seg.vertical[j][0] for j in vs)
+        y1 = max(seg.horizontal[i][0] for i in hs)
+        candidates.append(((x1 - x0) * (y1 - y0), hs, vs))
+
+    tables = []
+    # Largest regions first so outer tables claim their words before nested ones.
+    for _, hs, vs in sorted(candidates, key=lambda c: -c[0]):
+        free_x = np.where(claimed, np.nan, cx)
+        table = build_table(seg, hs, vs, free_x, cy, words.left, right, words.top)
+        if table is None:
+            continue
+        for cell in table.cells:
+            claimed[cell.words] = True
+        tables.append(table)
+    tables.sort(key=lambda t: t.top)
+    return tables